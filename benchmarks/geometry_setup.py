@@ -0,0 +1,61 @@
+# Benchmark of obstacle setup time: per-cell Python loop against the vectorized rasterizer
+# Run from the repository root: python -m benchmarks.geometry_setup
+
+# LIBRARIES
+import argparse
+import time
+
+import numpy as np
+
+import geometry
+
+GRID_SIZES = [(100, 400), (200, 800), (400, 1600), (1000, 4000)]           # (Ny, Nx) lattices
+
+
+def loop_cylinder(Ny, Nx):
+    """The original lbm_cyclinder_v1 setup loop."""
+    cyclinder = np.full((Ny, Nx), False)
+    for y in range(0, Ny):
+        for x in range(0, Nx):
+            if np.sqrt((x - Nx//4)**2 + (y - Ny//2)**2) < 13:
+                cyclinder[y][x] = True
+    return cyclinder
+
+
+def timed(function, *args):
+    t0 = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Geometry setup benchmark')
+    parser.add_argument('--max-loop-cells', type=float, default=1e6, help='largest grid timed with the Python loop')
+    args = parser.parse_args()
+
+    print(f"{'grid':>12} {'loop':>10} {'circle':>10} {'cached':>10} {'polygon':>10} {'airfoil':>10} {'coverage':>10}")
+    for Ny, Nx in GRID_SIZES:
+        geometry.clear_cache()
+        x, y = geometry.lattice(Ny, Nx)
+        if Ny * Nx <= args.max_loop_cells:
+            reference, t_loop = timed(loop_cylinder, Ny, Nx)
+        else:
+            reference, t_loop = None, float('nan')
+        mask, t_circle = timed(geometry.circle, Ny, Nx, Nx//4, Ny//2, 13)
+        _, t_cached = timed(geometry.circle, Ny, Nx, Nx//4, Ny//2, 13)
+        if reference is not None and not np.array_equal(mask, reference):
+            raise RuntimeError(f"vectorized cylinder differs from the loop on {Ny}x{Nx}")
+
+        star = geometry.Polygon([(Nx/4 + Ny/4*np.cos(a)*(1 + (k % 2)), Ny/2 + Ny/4*np.sin(a)*(1 + (k % 2)))
+                                 for k, a in enumerate(np.linspace(0, 2*np.pi, 10, endpoint=False))])
+        _, t_polygon = timed(geometry.rasterize, star, x, y)
+        airfoil = geometry.JoukowskyAirfoil(0.05, 0.05, scale=Ny/4, xc=Nx/4, yc=Ny/2, aoa=10)
+        _, t_airfoil = timed(geometry.rasterize, airfoil, x, y)
+        _, t_coverage = timed(geometry.coverage, geometry.Circle(Nx//4, Ny//2, 13), x, y)
+
+        print(f"{f'{Ny}x{Nx}':>12}" + ''.join(f"{t*1e3:>8.1f}ms" for t in
+              (t_loop, t_circle, t_cached, t_polygon, t_airfoil, t_coverage)))
+
+
+if __name__ == "__main__":
+    main()
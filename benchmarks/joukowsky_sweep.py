@@ -0,0 +1,51 @@
+# Throughput of batched Joukowsky airfoil parameter sweeps
+# Run from the repository root: python -m benchmarks.joukowsky_sweep
+
+# LIBRARIES
+import argparse
+import os
+import time
+
+import numpy as np
+
+import joukowsky
+
+
+def designs(n, seed=0):
+    """n random circle centres and angles of attack in the range of the design studies."""
+    rng = np.random.RandomState(seed)
+    return rng.uniform(-0.15, 0.15, n), rng.uniform(0.0, 0.15, n), rng.uniform(-10, 15, n)
+
+
+def rate(function, n):
+    t0 = time.perf_counter()
+    function()
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Joukowsky airfoil sweep throughput')
+    parser.add_argument('--designs', type=int, default=20000, help='designs per batched sweep')
+    parser.add_argument('--loop-designs', type=int, default=500, help='designs for the one-at-a-time loop')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help='process pool size')
+    args = parser.parse_args()
+
+    s_x, s_y, AoA = designs(args.designs)
+    n_loop = min(args.loop_designs, args.designs)
+
+    def loop(fields):
+        for i in range(n_loop):
+            joukowsky.evaluate(s_x[i], s_y[i], AoA[i], fields=fields)
+
+    print(f"{'mode':>28}{'designs/s':>14}")
+    for fields in (True, False):
+        label = 'fields' if fields else 'surface only'
+        print(f"{'loop, ' + label:>28}{rate(lambda: loop(fields), n_loop):>14.0f}")
+        print(f"{'batched, ' + label:>28}"
+              f"{rate(lambda: joukowsky.evaluate(s_x, s_y, AoA, fields=fields), args.designs):>14.0f}")
+        print(f"{f'{args.processes} processes, ' + label:>28}"
+              f"{rate(lambda: joukowsky.evaluate(s_x, s_y, AoA, fields=fields, processes=args.processes), args.designs):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Benchmark of the LBM collision operators: cost per step and lowest stable relaxation time
+# Run from the repository root: python -m benchmarks.lbm_collision
+
+# LIBRARIES
+import argparse
+import time
+
+import numpy as np
+
+import lbm_engine
+from benchmarks.lbm_stream_collide import mlups, setup
+
+OPERATORS = tuple(lbm_engine.COLLISIONS)
+TAUS = [0.53, 0.52, 0.515, 0.51, 0.507, 0.505, 0.503, 0.502, 0.501]        # descending relaxation times tried
+DIAMETER = 26                                                               # cylinder of radius 13
+
+
+def cost(Ny, Nx, collision, steps, layout):
+    """ms per fused step with the given collision operator."""
+    F, cyclinder = setup(Ny, Nx)
+    engine = lbm_engine.StreamCollideEngine(F, cyclinder, 0.53, layout, bounce_back='halfway', collision=collision)
+    engine.step()                                                           # first touch of the buffers
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        engine.step()
+    return 1e3 * (time.perf_counter() - t0) / steps
+
+
+def stable_steps(F, cyclinder, tau, collision, steps, check_every=100, max_speed=1.0):
+    """Steps survived before the velocity turns non-finite or exceeds max_speed, at most `steps`."""
+    engine = lbm_engine.StreamCollideEngine(F, cyclinder, tau, 'soa', bounce_back='halfway', collision=collision)
+    with np.errstate(all='ignore'):                                         # overflow is the expected failure
+        for step in range(1, steps + 1):
+            engine.step()
+            if step % check_every == 0 or step == steps:
+                speed = np.sqrt(engine.ux**2 + engine.uy**2).max()
+                if not np.isfinite(speed) or speed > max_speed:
+                    return step
+    return steps
+
+
+def lowest_stable_tau(F, cyclinder, collision, steps):
+    """Smallest tau of TAUS, going down, before the first run that blows up, and where that run failed."""
+    lowest, failure = None, None
+    for tau in TAUS:
+        survived = stable_steps(F, cyclinder, tau, collision, steps)
+        if survived < steps:
+            failure = (tau, survived)
+            break
+        lowest = tau
+    return lowest, failure
+
+
+def bgk_difference(Ny, Nx, tau, steps):
+    """Max population difference to BGK of MRT with every rate 1/tau and of TRT with tau_odd = tau."""
+    F, cyclinder = setup(Ny, Nx)
+    rate = 1/tau
+    engines = [lbm_engine.StreamCollideEngine(F, cyclinder, tau, 'soa', bounce_back='node', collision=collision,
+                                              collision_parameters=parameters)
+               for collision, parameters in (('bgk', None), ('mrt', {'s_e': rate, 's_eps': rate, 's_q': rate}),
+                                             ('trt', {'magic': (tau - 0.5)**2}))]
+    for _ in range(steps):
+        for engine in engines:
+            engine.step()
+    return [np.abs(engine.F - engines[0].F).max() for engine in engines[1:]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BGK, TRT, MRT and regularized collision: cost and stability')
+    parser.add_argument('--grids', type=int, nargs='+', default=[100, 200], help='Ny of (Ny, 4*Ny) lattices timed')
+    parser.add_argument('--steps', type=int, default=50, help='timed steps per operator')
+    parser.add_argument('--layout', default='soa', help="population layout, 'aos' or 'soa'")
+    parser.add_argument('--stability-ny', type=int, default=100, help='Ny of the (Ny, 4*Ny) stability lattice')
+    parser.add_argument('--stability-steps', type=int, default=2000, help='steps a run must survive')
+    args = parser.parse_args()
+
+    # COST PER STEP
+    print(f"{'grid':>10} {'operator':>12} {'ms/step':>9} {'MLUPS':>7} {'vs bgk':>7}")
+    for Ny in args.grids:
+        Nx = 4 * Ny
+        times = {collision: cost(Ny, Nx, collision, args.steps, args.layout) for collision in OPERATORS}
+        for collision, ms in times.items():
+            print(f"{f'{Ny}x{Nx}':>10} {collision:>12} {ms:>9.2f} {mlups(Ny, Nx, 1, ms / 1e3):>7.1f} "
+                  f"{ms / times['bgk']:>6.2f}x")
+
+    # LOWEST STABLE RELAXATION TIME
+    Ny, Nx = args.stability_ny, 4 * args.stability_ny
+    F, cyclinder = setup(Ny, Nx)
+    rho = F.sum(axis=2)
+    velocity = ((F * lbm_engine.CXS).sum(axis=2) / rho).mean()              # mean initial x velocity
+    print(f"\n{'operator':>12} {'lowest tau':>11} {'viscosity':>10} {'Re':>7} {'first failure':>22}")
+    for collision in OPERATORS:
+        lowest, failure = lowest_stable_tau(F, cyclinder, collision, args.stability_steps)
+        failed = 'none' if failure is None else f'tau {failure[0]} at step {failure[1]}'
+        if lowest is None:
+            print(f"{collision:>12} {'-':>11} {'-':>10} {'-':>7} {failed:>22}")
+            continue
+        viscosity = (lowest - 0.5) / 3
+        print(f"{collision:>12} {lowest:>11} {viscosity:>10.5f} {velocity * DIAMETER / viscosity:>7.0f} {failed:>22}")
+
+    mrt, trt = bgk_difference(50, 200, 0.53, 200)
+    print(f"\nmax |F - F_bgk| after 200 steps with all rates 1/tau: mrt {mrt:.1e}, trt {trt:.1e}")
+
+    print(f'\nStability on the {Ny}x{Nx} cylinder case with half-way bounce-back, noisy initial populations '
+          f'and mean inflow {velocity:.3f}: a tau counts as stable when the velocity stays finite and below 1 '
+          f'for {args.stability_steps} steps; the sweep stops at the first failure. Re uses the cylinder '
+          'diameter. The moment-space operators pay one equilibrium over all directions and a 9x9 matrix '
+          'product per node. TRT with magic 1/4 damps its odd modes very weakly near tau 1/2 (tau_odd 13 at '
+          'tau 0.52) and the regularized operator has no extra bulk damping; only the separate energy and '
+          'flux rates of MRT extend the range at this inflow Mach number.')
+
+
+if __name__ == "__main__":
+    main()
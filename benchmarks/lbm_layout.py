@@ -0,0 +1,63 @@
+# Benchmark of LBM population layouts (AoS/SoA) and precisions (float64/float32)
+# Run from the repository root: python -m benchmarks.lbm_layout
+
+# LIBRARIES
+import argparse
+import time
+
+import numpy as np
+
+import lbm_engine
+from benchmarks.lbm_stream_collide import GRID_SIZES, mlups, setup
+
+VARIANTS = [('aos', np.float64), ('soa', np.float64), ('aos', np.float32), ('soa', np.float32)]
+
+
+def throughput(F, cyclinder, layout, dtype, steps, tau=0.53):
+    engine = lbm_engine.StreamCollideEngine(F, cyclinder, tau, layout, dtype)
+    engine.step()                                                           # warm up caches
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        engine.step()
+    return mlups(*F.shape[:2], steps, time.perf_counter() - t0), engine.lattice.nbytes
+
+
+def accuracy(Ny, Nx, steps, tau=0.53):
+    """Relative L2 error of density and velocity of float32 SoA against float64 after `steps`."""
+    F, cyclinder = setup(Ny, Nx)
+    exact = lbm_engine.StreamCollideEngine(F, cyclinder, tau, 'soa', np.float64)
+    single = lbm_engine.StreamCollideEngine(F, cyclinder, tau, 'soa', np.float32)
+    for _ in range(steps):
+        exact.step()
+        single.step()
+    speed = np.hypot(exact.ux, exact.uy)
+    error_rho = np.linalg.norm(single.rho - exact.rho) / np.linalg.norm(exact.rho)
+    error_u = np.linalg.norm(np.hypot(single.ux, single.uy) - speed) / np.linalg.norm(speed)
+    return error_rho, error_u
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LBM layout and precision benchmark')
+    parser.add_argument('--steps', type=int, default=20, help='time steps per grid size')
+    parser.add_argument('--max-cells', type=float, default=4e6, help='skip grids larger than this')
+    parser.add_argument('--accuracy-steps', type=int, nargs='+', default=[100, 1000, 3000],
+                        help='time steps after which float32 is compared to float64')
+    args = parser.parse_args()
+
+    header = ''.join(f"{layout + '/' + np.dtype(dtype).name:>16}" for layout, dtype in VARIANTS)
+    print(f"{'MLUPS':>12}{header}")
+    for Ny, Nx in GRID_SIZES:
+        if Ny * Nx > args.max_cells:
+            continue
+        F, cyclinder = setup(Ny, Nx)
+        row = [throughput(F, cyclinder, layout, dtype, args.steps) for layout, dtype in VARIANTS]
+        print(f"{f'{Ny}x{Nx}':>12}" + ''.join(f"{m:>9.2f} ({b/2**20:.0f}M)" for m, b in row))
+
+    print(f"\n{'steps':>12}{'rho rel. L2':>16}{'|u| rel. L2':>16}   (float32 vs float64, 100x400)")
+    for steps in args.accuracy_steps:
+        error_rho, error_u = accuracy(100, 400, steps)
+        print(f"{steps:>12}{error_rho:>16.2e}{error_u:>16.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Strong scaling benchmark of the slab-parallel LBM engine
+# Run from the repository root: python -m benchmarks.lbm_parallel
+
+# LIBRARIES
+import argparse
+import os
+import time
+
+import numpy as np
+
+import lbm_engine
+import lbm_parallel
+from benchmarks.lbm_stream_collide import GRID_SIZES, mlups, setup
+
+
+def worker_counts(limit):
+    """1, 2, 4, ... up to limit, with limit itself appended."""
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != limit:
+        counts.append(limit)
+    return counts
+
+
+def throughput(engine, Ny, Nx, steps):
+    engine.step()                                                           # warm up caches and threads
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        engine.step()
+    return mlups(Ny, Nx, steps, time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Strong scaling of the slab-parallel LBM engine')
+    parser.add_argument('--steps', type=int, default=20, help='time steps per measurement')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count(), help='largest worker count')
+    parser.add_argument('--max-cells', type=float, default=4e6, help='skip grids larger than this')
+    parser.add_argument('--layout', default='soa', choices=lbm_engine.Lattice.LAYOUTS)
+    parser.add_argument('--float32', action='store_true', help='single precision populations')
+    args = parser.parse_args()
+    dtype = np.float32 if args.float32 else np.float64
+    counts = worker_counts(args.max_workers)
+
+    print(f"{'grid':>12}{'serial':>10}" + ''.join(f'{n:>10}' for n in counts) + f"{'identical':>11}")
+    for Ny, Nx in GRID_SIZES:
+        if Ny * Nx > args.max_cells:
+            continue
+        F, cyclinder = setup(Ny, Nx)
+        serial = lbm_engine.StreamCollideEngine(F, cyclinder, 0.53, args.layout, dtype)
+        base = throughput(serial, Ny, Nx, args.steps)
+
+        row, identical = [], True
+        for workers in counts:
+            with lbm_parallel.ParallelStreamCollideEngine(F, cyclinder, 0.53, args.layout, dtype,
+                                                          workers=workers) as engine:
+                row.append(throughput(engine, Ny, Nx, args.steps))
+                reference = lbm_engine.StreamCollideEngine(F, cyclinder, 0.53, args.layout, dtype)
+                for _ in range(args.steps + 1):
+                    reference.step()
+                identical &= bool(np.array_equal(reference.F, engine.F))
+        print(f"{f'{Ny}x{Nx}':>12}{base:>10.2f}" + ''.join(f'{m:>10.2f}' for m in row) + f'{str(identical):>11}')
+
+    print('\nMLUPS per worker count; speedup is the ratio to the serial column.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark of the fused LBM stream-collide engine against the original loop
+# Run from the repository root: python -m benchmarks.lbm_stream_collide
+
+# LIBRARIES
+import argparse
+import time
+
+import numpy as np
+
+import lbm_engine
+
+GRID_SIZES = [(100, 400), (200, 800), (400, 1600), (1000, 4000)]           # (Ny, Nx) lattices
+
+
+def setup(Ny, Nx, seed=0):
+    """Initial populations and cylinder obstacle matching lbm_cyclinder_v1."""
+    rng = np.random.RandomState(seed)
+    F = np.ones((Ny, Nx, lbm_engine.NL)) + 0.1*rng.randn(Ny, Nx, lbm_engine.NL)
+    F[:, :, 3] = 2.3
+    y, x = np.mgrid[0:Ny, 0:Nx]
+    cyclinder = np.sqrt((x - Nx//4)**2 + (y - Ny//2)**2) < 13
+    return F, cyclinder
+
+
+def mlups(Ny, Nx, steps, seconds):
+    """Million lattice updates per second."""
+    return Ny * Nx * steps / seconds / 1e6
+
+
+def run(Ny, Nx, steps, tau=0.53):
+    F, cyclinder = setup(Ny, Nx)
+
+    t0 = time.perf_counter()
+    F_ref = F
+    for _ in range(steps):
+        F_ref, _, _, _ = lbm_engine.reference_step(F_ref, cyclinder, tau)
+    t_ref = time.perf_counter() - t0
+
+    engine = lbm_engine.StreamCollideEngine(F, cyclinder, tau)
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        engine.step()
+    t_fused = time.perf_counter() - t0
+
+    return {
+        'grid': f'{Ny}x{Nx}',
+        'reference': mlups(Ny, Nx, steps, t_ref),
+        'fused': mlups(Ny, Nx, steps, t_fused),
+        'identical': bool(np.array_equal(F_ref, engine.F)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LBM stream-collide benchmark')
+    parser.add_argument('--steps', type=int, default=20, help='time steps per grid size')
+    parser.add_argument('--max-cells', type=float, default=4e6, help='skip grids larger than this')
+    args = parser.parse_args()
+
+    print(f"{'grid':>12} {'reference':>12} {'fused':>12} {'speedup':>8} {'identical':>10}")
+    for Ny, Nx in GRID_SIZES:
+        if Ny * Nx > args.max_cells:
+            continue
+        r = run(Ny, Nx, args.steps)
+        print(f"{r['grid']:>12} {r['reference']:>9.2f} MLUPS {r['fused']:>6.2f} MLUPS"
+              f" {r['fused']/r['reference']:>7.2f}x {str(r['identical']):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Time to steady state of the staggered pipe with explicit and semi-implicit viscous diffusion
+# Run from the repository root: python -m benchmarks.pipe_diffusion
+
+# LIBRARIES
+import argparse
+import contextlib
+import io
+import itertools
+import time
+
+import numpy as np
+
+from solvers import StaggeredPipeSolver
+
+
+def steady(points_y, scheme, viscosity, end_time):
+    """Solver run to its steady state with the diffusion `scheme`, and the seconds it took."""
+    solver = StaggeredPipeSolver(n_points_y=points_y, viscosity=viscosity, diffusion=scheme, end_time=end_time,
+                                 max_steps=10**7, poisson_solver='dct', diagnostics_every=0).setup()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):                         # convergence notice of the monitor
+        solver.run()
+    return solver, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Explicit vs semi-implicit diffusion of the staggered pipe solver')
+    parser.add_argument('--points-y', type=int, nargs='+', default=[15, 31, 61, 121], help='N_POINTS_Y values')
+    parser.add_argument('--viscosity', type=float, nargs='+', default=[0.01, 0.05])
+    parser.add_argument('--schemes', nargs='+', default=['explicit', 'crank_nicolson', 'backward_euler'])
+    parser.add_argument('--end-time', type=float, default=50.0, help='upper bound on the simulated time')
+    args = parser.parse_args()
+
+    print(f"{'nu':>5} {'N_Y':>5} {'scheme':>15} {'steps':>7} {'t steady':>9} {'dt':>9} {'D':>7} {'seconds':>8} "
+          f"{'speedup':>8} {'vs explicit':>12}")
+    for viscosity, points_y in itertools.product(args.viscosity, args.points_y):
+        reference = None
+        for scheme in args.schemes:
+            solver, seconds = steady(points_y, scheme, viscosity, args.end_time)
+            if reference is None:
+                reference = solver, seconds
+            difference = np.max(np.abs(solver.velocity_x - reference[0].velocity_x)) / np.max(solver.velocity_x)
+            state = f'{solver.time:>9.3f}' if solver.monitor.converged else f"{'> ' + f'{solver.time:g}':>9}"
+            print(f"{viscosity:>5g} {points_y:>5} {scheme:>15} {solver.iteration:>7} {state} {solver.controller.dt:>9.2e} "
+                  f"{solver.controller.diffusion:>7.3f} {seconds:>8.2f} {reference[1] / seconds:>7.2f}x "
+                  f"{difference:>12.1e}")
+
+    print('\nAdaptive time steps, DCT pressure solver. A run is steady once the '
+          'convergence tolerances of StaggeredPipeSolver hold for three checks; "vs explicit" is the largest '
+          'difference of the steady velocity_x from the explicit run relative to its peak, which is bounded by '
+          'those tolerances. The explicit step is limited by the diffusion number D = nu dt / h**2 <= 1/4, which '
+          'shrinks dt with h**2. The semi-implicit schemes solve the viscous term with cached tridiagonal line '
+          'factorizations along x and y. Their dt follows the convective limits, CFL and U**2 dt / (2 nu), so the '
+          'gain grows with the resolution and the viscosity. They need somewhat more simulated time to meet the '
+          'tolerances, but far fewer steps. On coarse grids the convective limit binds for all schemes and the '
+          'line solves are pure overhead.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Benchmark of batched pipe flow ensembles against running the members one by one
+# Run from the repository root: python -m benchmarks.pipe_ensemble
+
+# LIBRARIES
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from solvers import PeriodicPipeEnsemble, PeriodicPipeSolver, StaggeredPipeEnsemble, StaggeredPipeSolver
+
+
+def member_parameters(case, members):
+    """Per-member parameter lists spreading viscosity and the driving of the flow."""
+    viscosity = list(np.linspace(0.01, 0.05, members))
+    if case == 'staggered':
+        return {'viscosity': viscosity, 'inlet_velocity': list(np.linspace(0.5, 1.5, members))}
+    return {'viscosity': viscosity, 'pressure_gradient': [(g, 0.0) for g in np.linspace(-2.0, -0.5, members)]}
+
+
+def single(case, parameters, member, steps, grid):
+    """Final state and seconds of one member run on its own."""
+    values = {name: value[member] for name, value in parameters.items()}
+    if case == 'staggered':
+        solver = StaggeredPipeSolver(n_points_y=grid, poisson_solver='dct', **values, **FIXED_STEPS)
+    else:
+        solver = PeriodicPipeSolver(n_points=grid, **values, **FIXED_STEPS)
+    solver.setup()
+    solver.step(WARMUP)                                                     # transform plans and caches
+    t0 = time.perf_counter()
+    solver.step(steps)
+    return solver.state(), time.perf_counter() - t0
+
+
+def ensemble(case, parameters, steps, grid):
+    """Final state and seconds of all members advanced as one batch."""
+    if case == 'staggered':
+        solver = StaggeredPipeEnsemble(n_points_y=grid, **parameters, **FIXED_STEPS)
+    else:
+        solver = PeriodicPipeEnsemble(n_points=grid, **parameters, **FIXED_STEPS)
+    solver.setup()
+    solver.step(WARMUP)
+    t0 = time.perf_counter()
+    solver.step(steps)
+    return solver.state(), time.perf_counter() - t0
+
+
+FIXED_STEPS = {'end_time': 1e9, 'max_steps': 10**9, 'stop_at_steady_state': False, 'timers': False}
+WARMUP = 5                                                                  # untimed steps before each run
+FIELDS = {'staggered': ('velocity_x', 'velocity_y', 'pressure'), 'periodic': ('Vx',)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched ensemble vs sequential pipe flow members')
+    parser.add_argument('--members', type=int, nargs='+', default=[1, 8, 64, 256], help='ensemble sizes')
+    parser.add_argument('--steps', type=int, default=200, help='time steps per run')
+    parser.add_argument('--points-y', type=int, default=15, help='N_POINTS_Y of the staggered pipe')
+    parser.add_argument('--points', type=int, default=11, help='N of the periodic pipe')
+    args = parser.parse_args()
+
+    print(f"{'case':>10} {'members':>8} {'sequential':>11} {'ensemble':>10} {'member-steps/s':>15} "
+          f"{'speedup':>8} {'identical':>10}")
+    for case, grid in (('staggered', args.points_y), ('periodic', args.points)):
+        for members in args.members:
+            parameters = member_parameters(case, members)
+            with contextlib.redirect_stdout(io.StringIO()):                 # convergence notices of the monitors
+                batch, seconds = ensemble(case, parameters, args.steps, grid)
+
+                # SEQUENTIAL TIME EXTRAPOLATED FROM THREE MEMBERS, EACH CHECKED AGAINST THE BATCH
+                checked = sorted({0, members // 2, members - 1})
+                identical, sequential = True, 0.0
+                for member in checked:
+                    state, elapsed = single(case, parameters, member, args.steps, grid)
+                    sequential += elapsed
+                    identical &= all(np.array_equal(batch[name][member], state[name]) for name in FIELDS[case])
+            sequential *= members / len(checked)
+            print(f"{case:>10} {members:>8} {sequential:>10.3f}s {seconds:>9.3f}s "
+                  f"{members * args.steps / seconds:>15.0f} {sequential / seconds:>7.1f}x {str(identical):>10}")
+
+    print('\nEach member has its own viscosity and inlet velocity or pressure gradient and its own adaptive time '
+          'step. sequential: one solver per member (dct Poisson backend for both), extrapolated from the members '
+          'checked. identical: the checked members equal their single runs bit for bit.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Benchmark of the pressure correction Poisson backends on the pipe_flow_inout_v1 grid
+# Run from the repository root: python -m benchmarks.poisson_solvers
+
+# LIBRARIES
+import argparse
+import time
+
+import numpy as np
+
+import poisson
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pressure Poisson solver benchmark')
+    parser.add_argument('--points-y', type=int, nargs='+', default=[15, 33, 65, 129], help='N_POINTS_Y values')
+    parser.add_argument('--aspect-ratio', type=int, default=10)
+    parser.add_argument('--tol', type=float, default=1e-6)
+    parser.add_argument('--solves', type=int, default=5, help='repeated solves per backend (factorizations amortized)')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    print(f"{'N_POINTS_Y':>10} {'solver':>10} {'setup':>10} {'per solve':>10} {'iterations':>10} {'residual':>10}")
+    for n_points_y in args.points_y:
+        cell_lenght = 1.0 / (n_points_y - 1)
+        n_points_x = (n_points_y - 1) * args.aspect_ratio + 1
+        shape = (n_points_y + 1, n_points_x + 1)
+        rhs = rng.randn(n_points_y - 1, n_points_x - 1)
+        for name in poisson.SOLVERS:
+            options = {} if name == 'jacobi' else {'tol': args.tol}
+            if name == 'sor':
+                options['warm_start'] = False                               # same rhs every solve, see below
+            t0 = time.perf_counter()
+            solver = poisson.make_solver(name, shape, cell_lenght, **options)
+            t_setup = time.perf_counter() - t0
+            out = np.zeros(shape)
+            solver.solve(rhs, out=out)                                      # warm up transform plans
+            t0 = time.perf_counter()
+            for _ in range(args.solves):
+                solver.solve(rhs, out=out)
+            t_solve = (time.perf_counter() - t0) / args.solves
+            print(f"{n_points_y:>10} {name:>10} {t_setup*1e3:>8.1f}ms {t_solve*1e3:>8.2f}ms"
+                  f" {solver.stats.iterations:>10} {solver.stats.residual:>10.1e}")
+
+    # WARM START ON A SLOWLY CHANGING RIGHT HAND SIDE
+    print(f"\n{'N_POINTS_Y':>10} {'sor start':>10} {'sweeps/solve':>14} {'per solve':>10}")
+    for n_points_y in args.points_y:
+        cell_lenght = 1.0 / (n_points_y - 1)
+        n_points_x = (n_points_y - 1) * args.aspect_ratio + 1
+        shape = (n_points_y + 1, n_points_x + 1)
+        y, x = np.mgrid[0:n_points_y - 1, 0:n_points_x - 1]
+        for warm_start in (False, True):
+            solver = poisson.make_solver('sor', shape, cell_lenght, tol=args.tol, warm_start=warm_start)
+            out = np.zeros(shape)
+            sweeps = 0
+            t0 = time.perf_counter()
+            for k in range(args.solves):
+                rhs = np.sin(2*np.pi*x/x.shape[1] + 0.01*k) * np.cos(np.pi*y/y.shape[0])
+                solver.solve(rhs, out=out)
+                sweeps += solver.stats.iterations
+            t_solve = (time.perf_counter() - t0) / args.solves
+            print(f"{n_points_y:>10} {'warm' if warm_start else 'cold':>10} {sweeps/args.solves:>14.0f}"
+                  f" {t_solve*1e3:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Benchmark of solver throughput with and without rendering
+# Run from the repository root: python -m benchmarks.rendering
+
+# LIBRARIES
+import argparse
+import os
+import tempfile
+import time
+
+import lbm_engine
+import frame_writer
+from benchmarks.lbm_stream_collide import setup
+from lbm_cyclinder_v1 import render_frame
+
+
+def curl_snapshot(engine, it, steps):
+    ux, uy = engine.ux, engine.uy
+    curl = (ux[2:, 1:-1] - ux[0:-2, 1:-1]) - (uy[1:-1, 2:] - uy[1:-1, 0:-2])
+    return {'it': it, 'Nt': steps, 'curl': curl}
+
+
+def run(mode, Ny, Nx, steps, plot_every, directory):
+    F, cyclinder = setup(Ny, Nx)
+    engine = lbm_engine.StreamCollideEngine(F, cyclinder, 0.53, 'soa')
+    writer = None
+    if mode.startswith('async'):
+        _, policy, backend = mode.split(':')
+        writer = frame_writer.FrameWriter(render_frame, directory, figsize=(8, 2.5), policy=policy, backend=backend)
+    elif mode == 'inline':
+        render = frame_writer.FrameRenderer(render_frame, directory, (8, 2.5), 100)
+
+    t0 = time.perf_counter()
+    for it in range(steps):
+        engine.step()
+        if mode != 'none' and it % plot_every == 0:
+            snapshot = curl_snapshot(engine, it, steps)
+            if writer is not None:
+                writer.submit(snapshot)
+            else:
+                render((it, snapshot))                                      # rendering on the solver thread
+    t_loop = time.perf_counter() - t0
+    dropped = 0
+    if writer is not None:
+        writer.close()
+        dropped = writer.dropped
+    return steps / t_loop, time.perf_counter() - t0, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rendering overhead benchmark')
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--plot-every', type=int, default=10)
+    parser.add_argument('--grid', type=int, nargs=2, default=[100, 400], metavar=('NY', 'NX'))
+    args = parser.parse_args()
+
+    print(f"{'mode':>28} {'steps/s in loop':>16} {'total incl. flush':>18} {'dropped':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('none', 'inline', 'async:block:thread', 'async:drop-oldest:thread',
+                     'async:block:process', 'async:drop-oldest:process'):
+            rate, total, dropped = run(mode, *args.grid, args.steps, args.plot_every, os.path.join(directory, mode))
+            print(f"{mode:>28} {rate:>16.1f} {total:>17.2f}s {dropped:>8}")
+
+
+if __name__ == "__main__":
+    main()
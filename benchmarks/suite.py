@@ -0,0 +1,275 @@
+# Regression and performance suite of the four solvers
+# Regression checks compare fixed-seed runs against the golden outputs in
+# benchmarks/golden.npz and against analytic solutions; timing cases measure
+# steps per second, million point updates per second and peak memory across grid
+# sizes. Results can be written as JSON and compared against a stored baseline.
+# Run from the repository root: python -m benchmarks.suite [--json results.json] [--baseline baseline.json]
+
+# LIBRARIES
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from solvers import JoukowskyModel, LBMSolver, PeriodicPipeSolver, StaggeredPipeSolver
+
+GOLDEN = os.path.join(os.path.dirname(__file__), 'golden.npz')
+LBM_CASE = {'ny': 40, 'nx': 120, 'seed': 0, 'max_steps': 200, 'stop_at_steady_state': False, 'diagnostics_every': 0}
+LBM_VARIANTS = {'soa': {}, 'aos': {'layout': 'aos'}, 'workers': {'workers': 2}}  # all must match one golden output
+AIRFOILS = {'s_x': np.linspace(-0.1, 0.1, 5)[:, None], 's_y': np.linspace(0.0, 0.1, 5)[:, None, None],
+            'aoa': np.linspace(-5, 15, 9)}                                  # 225 designs, broadcast
+MEMORY_STEPS = 5                                                            # steps traced for the peak memory
+MEMORY_SLACK = 2**16                                                        # bytes of peak growth never counted
+
+
+def _quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):                         # convergence notices of the monitors
+        return function(*args, **kwargs)
+
+
+# REGRESSION CHECKS: EACH RETURNS ANALYTIC CHECKS AND OUTPUTS TO COMPARE WITH THE GOLDEN ONES
+def check(name, value, limit):
+    """Check record, passed when value <= limit."""
+    return {'name': name, 'value': float(value), 'limit': float(limit), 'passed': bool(value <= limit)}
+
+
+def regression_lbm():
+    """Fields of the cylinder lattice after a fixed number of steps, with every engine variant."""
+    outputs = []
+    for label, options in LBM_VARIANTS.items():
+        with LBMSolver(**LBM_CASE, **options) as solver:
+            solver.setup().run()
+            state = solver.state()
+            fields = {f'lbm_{name}': state[name].copy() for name in ('rho', 'ux', 'uy')}
+            outputs.append((f'lbm_fields_{label}', fields))
+    return [], outputs
+
+
+def regression_periodic_pipe():
+    """Steady periodic pipe against the Hagen-Poiseuille profile."""
+    solver = PeriodicPipeSolver(end_time=1000.0, tolerances={'change_linf': 1e-8}).setup()
+    _quiet(solver.run)
+    error = np.max(np.abs(solver.Vx - solver.Vx_exact)) / np.max(solver.Vx_exact)
+    checks = [check('periodic_pipe_poiseuille_error', error, 1e-6)]
+    return checks, [('periodic_pipe_fields', {'periodic_pipe_Vx': solver.Vx})]
+
+
+def regression_staggered_pipe():
+    """Steady in/out pipe: the volume flux through every cross section equals the inflow."""
+    solver = StaggeredPipeSolver(diagnostics_every=0).setup()
+    _quiet(solver.run)
+    flux = solver.velocity_x[1:-1].sum(axis=0) * solver.cell_lenght         # per face column
+    checks = [check('staggered_pipe_mass_error', np.max(np.abs(flux / flux[0] - 1)), 1e-10),
+              check('staggered_pipe_divergence', solver.divergence(), 1e-5)]
+    arrays = {f'staggered_pipe_{name}': getattr(solver, name) for name in ('velocity_x', 'velocity_y', 'pressure')}
+    return checks, [('staggered_pipe_fields', arrays)]
+
+
+def regression_pipe_workspace(steps=300, restart=150):
+    """Allocation-free pipe kernels against the reference scheme, straight through and across a restart."""
+    names = ('velocity_x', 'velocity_y', 'pressure', 'velocity_y_tent')
+    runs = {}
+    for workspace in (False, True):
+        options = dict(workspace=workspace, max_steps=steps, stop_at_steady_state=False, diagnostics_every=0)
+        solver = StaggeredPipeSolver(**options).setup()
+        _quiet(solver.step, restart)
+        saved = {key: np.array(value) if isinstance(value, np.ndarray) else value
+                 for key, value in solver.state().items()}
+        _quiet(solver.run)
+        restarted = StaggeredPipeSolver(**options).setup()
+        restarted.load_state(saved)
+        _quiet(restarted.run)
+        runs[workspace] = (solver, restarted)
+    pairs = [(runs[False][0], runs[True][0]), (runs[False][1], runs[True][1]), (runs[True][0], runs[True][1])]
+    different = sum(not np.array_equal(getattr(a, name), getattr(b, name)) for a, b in pairs for name in names)
+    return [check('staggered_pipe_workspace_mismatch', different, 0)], []
+
+
+def regression_joukowsky():
+    """Integrated surface pressure of the airfoil sweep against the Kutta-Joukowski lift."""
+    model = JoukowskyModel(**AIRFOILS, fields=False).setup()
+    model.step()
+    results = model.state()
+    valid = results['surface_valid']
+    lift, drag, lift_kj = (results[f'surface_{name}'][valid] for name in ('lift', 'drag', 'lift_kj'))
+    scale = np.max(np.abs(lift_kj))
+    checks = [check('joukowsky_kutta_lift_error', np.max(np.abs(lift - lift_kj)) / scale, 1e-9),
+              check('joukowsky_drag', np.max(np.abs(drag)) / scale, 1e-9)]
+    coefficients = {f'joukowsky_{name}': results[f'surface_{name}'] for name in ('cl', 'cm')}
+    return checks, [('joukowsky_coefficients', coefficients)]
+
+
+REGRESSIONS = [regression_lbm, regression_periodic_pipe, regression_staggered_pipe, regression_pipe_workspace,
+               regression_joukowsky]
+
+
+def deviation(arrays, golden):
+    """Largest deviation of the arrays from their golden counterparts, relative to the golden peak."""
+    if not all(key in golden for key in arrays):
+        return np.inf
+    return max(np.max(np.abs(value - golden[key])) / max(np.max(np.abs(golden[key])), 1e-300)
+               for key, value in arrays.items())
+
+
+def run_regressions(golden_path, rtol, update=False):
+    """All regression checks; with update the golden outputs are rewritten from this run first."""
+    results = [regression() for regression in REGRESSIONS]
+    if update:
+        golden = {}
+        for _, outputs in results:
+            for _, arrays in outputs:
+                for key, value in arrays.items():
+                    golden.setdefault(key, value)                           # the first variant is the reference
+        np.savez_compressed(golden_path, **golden)
+    golden = {}
+    if os.path.exists(golden_path):
+        with np.load(golden_path) as stored:
+            golden = dict(stored)
+    checks = []
+    for analytic, outputs in results:
+        checks.extend(analytic)
+        checks.extend(check(f'{name}_golden', deviation(arrays, golden), rtol) for name, arrays in outputs)
+    return checks
+
+
+# TIMING CASES: (solver, label, solver factory, time steps, grid points per step), smallest size first
+def timing_cases():
+    unbounded = {'max_steps': 10**9, 'stop_at_steady_state': False}
+    cases = []
+    for ny in (50, 100, 200):
+        cases.append(('lbm', f'lbm {ny}x{4*ny}', lambda ny=ny: LBMSolver(
+            ny=ny, nx=4*ny, seed=0, diagnostics_every=0, **unbounded), 100, 4*ny*ny))
+    for n in (15, 31, 61):
+        cases.append(('staggered_pipe', f'staggered_pipe N_Y={n}', lambda n=n: StaggeredPipeSolver(
+            n_points_y=n, end_time=1e9, diagnostics_every=0, **unbounded), 200, 10*n*n))
+    for n in (11, 41, 161):
+        cases.append(('periodic_pipe', f'periodic_pipe N={n}', lambda n=n: PeriodicPipeSolver(
+            n_points=n, end_time=1e9, **unbounded), 500, n*n))
+    for designs in (1, 100, 2500):
+        cases.append(('joukowsky', f'joukowsky {designs} designs', lambda designs=designs: JoukowskyModel(
+            aoa=np.linspace(-5, 15, designs), fields=False), 1, 256*designs))
+    return cases
+
+
+def time_case(factory, steps, repeat, min_seconds):
+    """Best seconds per step over `repeat` timed runs, and the peak traced memory of a short run.
+
+    A timed run steps fresh solvers `steps` steps at a time until it has
+    lasted min_seconds, so that the fast cases are not timed on a few calls.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        taken, seconds = 0, 0.0
+        while seconds < min_seconds or not taken:
+            with factory() as solver:
+                solver.setup()
+                t0 = time.perf_counter()
+                taken += _quiet(solver.step, steps)
+                seconds += time.perf_counter() - t0
+        best = min(best, seconds / taken)
+    tracemalloc.start()                                                     # setup allocations included
+    with factory() as solver:
+        solver.setup()
+        _quiet(solver.step, min(steps, MEMORY_STEPS))
+        peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def run_timings(repeat, min_seconds, quick=False):
+    benchmarks = []
+    cases = timing_cases()
+    if quick:                                                               # smallest size of every solver
+        smallest = {}
+        for case in cases:
+            smallest.setdefault(case[0], case)
+        cases = list(smallest.values())
+    for solver, label, factory, steps, points in cases:
+        seconds, peak = time_case(factory, steps, repeat, min_seconds)
+        benchmarks.append({'case': label, 'solver': solver, 'steps': steps, 'points': points,
+                           'seconds_per_step': seconds, 'steps_per_second': 1 / seconds,
+                           'mlups': points / seconds / 1e6, 'peak_bytes': peak})
+    return benchmarks
+
+
+def compare(benchmarks, baseline, threshold):
+    """Relative slowdown and memory growth of every case against the baseline; regressed beyond threshold."""
+    reference = {record['case']: record for record in baseline.get('benchmarks', [])}
+    for record in benchmarks:
+        base = reference.get(record['case'])
+        if base is None:
+            continue
+        record['slowdown'] = base['steps_per_second'] / record['steps_per_second'] - 1
+        record['memory_growth'] = record['peak_bytes'] / base['peak_bytes'] - 1
+        grown = record['peak_bytes'] > base['peak_bytes'] * (1 + threshold) + MEMORY_SLACK
+        record['regressed'] = record['slowdown'] > threshold or grown
+    return [record for record in benchmarks if record.get('regressed')]
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regression checks and timings of the four solvers')
+    parser.add_argument('--suites', nargs='+', choices=('regression', 'timing'), default=['regression', 'timing'])
+    parser.add_argument('--json', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare the timings against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown or peak memory growth counted as a regression')
+    parser.add_argument('--rtol', type=float, default=1e-9, help='largest deviation from a golden output, relative')
+    parser.add_argument('--golden', default=GOLDEN, help='golden outputs file')
+    parser.add_argument('--update-golden', action='store_true', help='rewrite the golden outputs from this run')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the best counts')
+    parser.add_argument('--min-seconds', type=float, default=0.5, help='shortest timed run, short cases are repeated')
+    parser.add_argument('--quick', action='store_true', help='time only the smallest size of every solver')
+    args = parser.parse_args()
+
+    results = {'environment': environment(), 'threshold': args.threshold, 'checks': [], 'benchmarks': []}
+    failed = []
+    if 'regression' in args.suites:
+        results['checks'] = run_regressions(args.golden, args.rtol, args.update_golden)
+        print(f"{'check':>34} {'value':>10} {'limit':>10} {'status':>7}")
+        for record in results['checks']:
+            print(f"{record['name']:>34} {record['value']:>10.2e} {record['limit']:>10.2e} "
+                  f"{'ok' if record['passed'] else 'FAILED':>7}")
+        failed += [record['name'] for record in results['checks'] if not record['passed']]
+
+    if 'timing' in args.suites:
+        results['benchmarks'] = run_timings(args.repeat, args.min_seconds, args.quick)
+        if args.baseline is not None:
+            with open(args.baseline) as file:
+                failed += [record['case'] for record in compare(results['benchmarks'], json.load(file), args.threshold)]
+        print(f"\n{'case':>26} {'steps/s':>10} {'MLUPS':>8} {'peak MB':>8} {'slowdown':>9} {'memory':>8} "
+              f"{'status':>10}")
+        for record in results['benchmarks']:
+            versus = (f"{record['slowdown']:>+9.1%} {record['memory_growth']:>+8.1%} "
+                      f"{'REGRESSED' if record['regressed'] else 'ok':>10}") if 'slowdown' in record else ''
+            print(f"{record['case']:>26} {record['steps_per_second']:>10.1f} {record['mlups']:>8.2f} "
+                  f"{record['peak_bytes'] / 1e6:>8.2f} {versus}")
+
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    print(f"\nGolden outputs are fixed-seed runs compared with a relative tolerance of {args.rtol:g}; the LBM variants "
+          'must all reproduce the serial SoA fields. MLUPS counts million lattice nodes or grid cells (surface '
+          'samples for the airfoil) updated per second, from the best of the timed runs; peak MB is the largest '
+          'traced allocation over setup and the first steps. Timings are compared with --baseline, slower or '
+          f'larger (beyond {MEMORY_SLACK // 1024} kB) by more than {args.threshold:.0%} counts as a regression. On '
+          'a shared or throttled machine raise --repeat and --min-seconds before trusting small thresholds.')
+    if failed:
+        print(f"failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
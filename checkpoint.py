@@ -0,0 +1,120 @@
+# Checkpoint and restart of solver state
+# A checkpoint is one file: an 8 byte header length, a JSON header describing the
+# arrays, then the raw array buffers at 64 byte aligned offsets. Buffers are
+# written straight from the arrays' memory, the file is written next to its
+# destination and renamed into place so a crash never leaves a torn checkpoint.
+
+# LIBRARIES
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'FLOWCKPT'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def rng_state():
+    """NumPy global RNG state split into a JSON part and its key array."""
+    name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    return {'name': name, 'position': int(position), 'has_gauss': int(has_gauss),
+            'cached_gaussian': float(cached_gaussian)}, keys
+
+
+def set_rng_state(state, keys):
+    np.random.set_state((state['name'], keys, state['position'], state['has_gauss'], state['cached_gaussian']))
+
+
+def save_checkpoint(path, arrays, state):
+    """Atomically write named arrays and a JSON-serializable state dict to path."""
+    arrays = {name: np.asarray(array) for name, array in arrays.items()}
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({'format': FORMAT_VERSION, 'arrays': entries, 'state': state}).encode()
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for name, array in arrays.items():
+            file.seek(data_start + entries[name]['offset'])
+            if not array.flags.c_contiguous:
+                array = np.ascontiguousarray(array)                         # strided views need one copy
+            file.write(memoryview(array).cast('B'))                         # zero-copy buffer dump
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)                                                 # persist the rename
+    finally:
+        os.close(directory)
+
+
+def load_checkpoint(path, mmap=False):
+    """Arrays and state saved by save_checkpoint; mmap=True maps the arrays read-only."""
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a checkpoint file")
+        (length,) = struct.unpack('<Q', file.read(8))
+        header = json.loads(file.read(length))
+        if header['format'] != FORMAT_VERSION:
+            raise ValueError(f"unsupported checkpoint format {header['format']} in {path}")
+        data_start = _aligned(len(MAGIC) + 8 + length)
+
+        arrays = {}
+        for name, entry in header['arrays'].items():
+            dtype, shape = np.dtype(entry['dtype']), tuple(entry['shape'])
+            offset = data_start + entry['offset']
+            if mmap:
+                arrays[name] = np.memmap(path, dtype, 'r', offset, shape)
+            else:
+                file.seek(offset)
+                arrays[name] = np.fromfile(file, dtype, int(np.prod(shape))).reshape(shape)
+    return arrays, header['state']
+
+
+def check_config(saved, current):
+    """Raise ValueError if the configuration a checkpoint was written with differs from the current one."""
+    mismatched = {key: (saved.get(key), value) for key, value in current.items() if saved.get(key) != value}
+    if mismatched:
+        details = ', '.join(f'{key}: checkpoint {old!r}, now {new!r}' for key, (old, new) in mismatched.items())
+        raise ValueError(f"checkpoint was written with a different configuration ({details})")
+
+
+class Checkpointer:
+    """Saves a checkpoint every `every` completed steps to one path, replacing the previous one."""
+
+    def __init__(self, path, every):
+        self.path = path
+        self.every = every
+
+    def due(self, completed_steps):
+        return self.path is not None and completed_steps % self.every == 0
+
+    def save(self, completed_steps, arrays, config, **state):
+        rng, keys = rng_state()
+        save_checkpoint(self.path, dict(arrays, rng_keys=keys),
+                        dict(state, iteration=completed_steps, rng=rng, config=config))
+
+
+def restart(path, config):
+    """Load a checkpoint, verify its configuration and restore the global RNG.
+
+    Returns the saved arrays and the state dict, whose 'iteration' is the
+    number of completed steps.
+    """
+    arrays, state = load_checkpoint(path)
+    check_config(state['config'], config)
+    set_rng_state(state['rng'], arrays.pop('rng_keys'))
+    return arrays, state
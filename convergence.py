@@ -0,0 +1,184 @@
+# Steady-state convergence monitoring for the time-marching solvers
+# Tracks the rate of change of the solution fields plus any scalar residuals a
+# solver reports, keeps the history and tells the time loop when to stop.
+
+# LIBRARIES
+import json
+
+import numpy as np
+
+import timestep
+
+
+def poiseuille_profile(y, height, viscosity, pressure_gradient):
+    """Analytic Hagen-Poiseuille velocity between no-slip walls at y = 0 and y = height, driven by -dp/dx."""
+    return -pressure_gradient / (2 * viscosity) * y * (height - y)
+
+
+class ConvergenceMonitor:
+    """Decides when a time loop has reached its steady state.
+
+    `tolerances` maps metric names to upper bounds. Every `every` steps
+    update() receives the solution fields and scalar metrics; from the fields
+    it derives 'change_l2' (RMS) and 'change_linf' (max) of the field change
+    per unit time since the previous check. The run counts as converged once
+    every metric with a tolerance has stayed below it for `patience`
+    consecutive checks and at least `min_steps` steps were taken; a metric
+    that is not finite never counts as within its tolerance, and a field that
+    turns non-finite raises timestep.DivergenceError. Each check is appended
+    to `history`; log_every > 0 prints every log_every-th check.
+    """
+
+    def __init__(self, tolerances, every=1, patience=3, min_steps=0, log_every=0):
+        self.tolerances = dict(tolerances)
+        self.every = every
+        self.patience = patience
+        self.min_steps = min_steps
+        self.log_every = log_every
+        self.history = []                                                   # one dict of metrics per check
+        self.converged = False
+        self._previous = None                                               # field copies of the last check
+        self._previous_time = None
+        self._streak = 0                                                    # consecutive checks within tolerance
+
+    def due(self, step):
+        return step % self.every == 0
+
+    def _change(self, fields, step, time):
+        if self._previous is None or self._previous_time == time:
+            self._previous = {name: np.array(field, dtype=float) for name, field in fields.items()}
+            self._previous_time = time
+            return np.nan, np.nan
+        elapsed = time - self._previous_time
+        square_sum, count, peak = 0.0, 0, 0.0
+        diverged = []
+        for name, field in fields.items():
+            change = np.subtract(field, self._previous[name])
+            square_sum += float(np.sum(change**2))
+            count += change.size
+            largest = float(np.max(np.abs(change)))                         # NaN or inf once the field is
+            if not np.isfinite(largest):
+                diverged.append(name)
+            peak = np.maximum(peak, largest)
+            np.copyto(self._previous[name], field)
+        self._previous_time = time
+        if diverged:
+            raise timestep.DivergenceError(
+                f"solution diverged at step {step}, t = {time:.4g}: non-finite {', '.join(diverged)}"
+            )
+        return np.sqrt(square_sum / count) / elapsed, peak / elapsed
+
+    def update(self, step, time, fields=None, **metrics):
+        """Record one check at `step` and physical `time`, returns True once converged."""
+        record = {'step': int(step), 'time': float(time)}
+        if fields:
+            record['change_l2'], record['change_linf'] = self._change(fields, step, time)
+        record.update((name, float(value)) for name, value in metrics.items())
+        self.history.append(record)
+
+        values = {name: record.get(name, np.nan) for name in self.tolerances}
+        within = all(np.isfinite(values[name]) and values[name] <= tol for name, tol in self.tolerances.items())
+        self._streak = self._streak + 1 if within else 0
+        converged = self._streak >= self.patience and step >= self.min_steps
+        newly_converged = converged and not self.converged
+        self.converged = converged
+        if (self.log_every and (len(self.history) - 1) % self.log_every == 0) or newly_converged:
+            print(self.report(record))
+        return self.converged
+
+    def report(self, record=None):
+        record = record or self.history[-1]
+        values = ', '.join(f'{name} {value:.2e}' for name, value in record.items() if name not in ('step', 'time'))
+        state = ', converged' if self.converged else ''
+        return f"check at step {record['step']}, t = {record['time']:.4g}: {values}{state}"
+
+    def save(self, path):
+        """Write the tolerances and the check history as JSON."""
+        with open(path, 'w') as file:
+            json.dump({'tolerances': self.tolerances, 'converged': self.converged, 'history': self.history},
+                      file, indent=1)
+
+
+class EnsembleConvergenceMonitor:
+    """ConvergenceMonitor applied to each member of a batch on its own.
+
+    Same tolerances, `every`, `patience` and `min_steps`. update() receives
+    the indices of the members checked, their times, their fields with the
+    members on the leading axis and scalar metrics as arrays over them.
+    `converged` is a flag per member and `converged_step` the step at which
+    it was raised (-1 before). Each history record holds the number of
+    members checked and the worst value of every metric among them.
+    """
+
+    def __init__(self, members, tolerances, every=1, patience=3, min_steps=0, log_every=0):
+        self.members = members                                              # batch size
+        self.tolerances = dict(tolerances)
+        self.every = every
+        self.patience = patience
+        self.min_steps = min_steps
+        self.log_every = log_every
+        self.history = []
+        self.converged = np.zeros(members, dtype=bool)
+        self.converged_step = np.full(members, -1)
+        self._previous = {}                                                 # field copies of the last check, per member
+        self._previous_time = np.full(members, np.nan)
+        self._streak = np.zeros(members, dtype=int)
+
+    def due(self, step):
+        return step % self.every == 0
+
+    def _change(self, members, fields, time):
+        elapsed = time - self._previous_time[members]                       # NaN at the first check
+        square_sum, count, peak = 0.0, 0, 0.0
+        for name, field in fields.items():
+            if name not in self._previous:
+                self._previous[name] = np.full((self.members,) + field.shape[1:], np.nan)
+            change = np.subtract(field, self._previous[name][members])
+            axes = tuple(range(1, change.ndim))
+            square_sum = square_sum + np.sum(change**2, axis=axes)
+            count += change[0].size
+            peak = np.maximum(peak, np.max(np.abs(change), axis=axes))
+            self._previous[name][members] = field
+        self._previous_time[members] = time
+        valid = elapsed > 0
+        elapsed = np.where(valid, elapsed, 1.0)
+        return (np.where(valid, np.sqrt(square_sum / count) / elapsed, np.nan),
+                np.where(valid, peak / elapsed, np.nan))
+
+    def update(self, step, time, members, fields=None, **metrics):
+        """Record one check of `members` at `step`, returns their converged flags."""
+        members = np.asarray(members)
+        time = np.asarray(time, dtype=float)
+        values = dict(metrics)
+        if fields:
+            values['change_l2'], values['change_linf'] = self._change(members, fields, time)
+
+        within = np.ones(len(members), dtype=bool)
+        for name, tol in self.tolerances.items():
+            within &= np.asarray(values.get(name, np.nan)) <= tol
+        self._streak[members] = np.where(within, self._streak[members] + 1, 0)
+        converged = (self._streak[members] >= self.patience) & (step >= self.min_steps)
+        newly_converged = members[converged & ~self.converged[members]]
+        self.converged[members] = converged
+        self.converged_step[newly_converged] = step
+
+        record = {'step': int(step), 'time': float(np.max(time)), 'members': len(members)}
+        record.update((name, float(np.max(value))) for name, value in values.items())
+        record['converged'] = int(np.count_nonzero(self.converged))
+        self.history.append(record)
+        if (self.log_every and (len(self.history) - 1) % self.log_every == 0) or len(newly_converged):
+            print(self.report(record))
+        return converged
+
+    def report(self, record=None):
+        record = record or self.history[-1]
+        values = ', '.join(f'{name} {value:.2e}' for name, value in record.items()
+                           if name not in ('step', 'time', 'members', 'converged'))
+        return (f"check of {record['members']} members at step {record['step']}, t <= {record['time']:.4g}: "
+                f"worst {values}, {record['converged']} of {self.members} converged")
+
+    def save(self, path):
+        """Write the tolerances, the flags and step of convergence per member and the history as JSON."""
+        with open(path, 'w') as file:
+            json.dump({'tolerances': self.tolerances, 'converged': self.converged.tolist(),
+                       'converged_step': self.converged_step.tolist(), 'history': self.history}, file, indent=1)
@@ -0,0 +1,177 @@
+# Streaming diagnostics of the time-marching solvers
+# Scalar time series (forces, probe velocities, wall shear, shedding frequency)
+# appended every step into a preallocated buffer and flushed to CSV in blocks, so
+# the per-step cost is a few scalar updates instead of a full-field output.
+
+# LIBRARIES
+import collections
+
+import numpy as np
+
+
+class TimeSeriesLog:
+    """Rows of named scalars, one per append(), kept in memory and optionally written to CSV.
+
+    Rows go into a preallocated (flush_every, columns) block; a full block is
+    copied to `chunks` and, with a `path`, appended to the CSV file, whose
+    header line is written on creation. close() flushes the partial block.
+    """
+
+    def __init__(self, columns, path=None, flush_every=1000):
+        self.columns = list(columns)
+        self.path = path
+        self.chunks = []                                                    # full blocks of rows
+        self._block = np.empty((flush_every, len(self.columns)))
+        self._rows = 0                                                      # rows in the current block
+        if path is not None:
+            with open(path, 'w') as file:
+                file.write(','.join(self.columns) + '\n')
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks) + self._rows
+
+    def append(self, row):
+        """Add one row, a sequence of len(columns) numbers."""
+        self._block[self._rows] = row
+        self._rows += 1
+        if self._rows == len(self._block):
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        rows = self._block[:self._rows].copy()
+        self.chunks.append(rows)
+        self._rows = 0
+        if self.path is not None:
+            with open(self.path, 'a') as file:
+                np.savetxt(file, rows, fmt='%.10g', delimiter=',')
+
+    def close(self):
+        self.flush()
+
+    def last(self):
+        """The latest row as {column: value}, empty before the first append."""
+        if self._rows:
+            row = self._block[self._rows - 1]
+        elif self.chunks:
+            row = self.chunks[-1][-1]
+        else:
+            return {}
+        return dict(zip(self.columns, row.tolist()))
+
+    def data(self):
+        """{column: values} over all rows appended so far."""
+        rows = np.concatenate(self.chunks + [self._block[:self._rows]])
+        return {name: rows[:, k] for k, name in enumerate(self.columns)}
+
+
+def read_log(path):
+    """{column: values} of a TimeSeriesLog CSV file."""
+    with open(path) as file:
+        columns = file.readline().strip().split(',')
+    rows = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    return {name: rows[:, k] for k, name in enumerate(columns)}
+
+
+class ZeroCrossingFrequency:
+    """Running frequency of an oscillating signal from its upward crossings of a mean level.
+
+    update(time, value) costs a few scalar operations. Samples are first
+    smoothed by an exponential average over `smoothing` samples, which should
+    stay well below the period, to suppress fluctuations faster than the
+    oscillation. The level is reset to
+    the midpoint of the maximum and minimum of every completed period and
+    relaxes towards the signal over about `window` samples in between, so it
+    follows a drifting mean at any period. A crossing counts only after the
+    signal fell `hysteresis` mean absolute deviations below the level, which
+    keeps noise around it from being counted. Crossing times are interpolated
+    linearly between samples; `frequency` is the number of periods over the
+    time spanned by the last `periods` + 1 crossings (NaN before the second).
+    """
+
+    def __init__(self, window=500, periods=4, hysteresis=1.0, smoothing=50):
+        self.alpha = 1.0 / window
+        self.beta = 1.0 / smoothing
+        self.hysteresis = hysteresis
+        self.crossings = collections.deque(maxlen=periods + 1)              # times of the latest upward crossings
+        self.level = None
+        self.value = None                                                   # smoothed signal
+        self.deviation = 0.0                                                # mean absolute offset from the level
+        self._high = self._low = None                                       # extremes since the last crossing
+        self._armed = False                                                 # signal was well below the level
+        self._previous = None                                               # (time, value) of the last sample
+
+    def update(self, time, value):
+        """Add one sample, returns the current frequency."""
+        if self.level is None:
+            self.level = self._high = self._low = self.value = value
+        self.value += self.beta * (value - self.value)
+        value = self.value
+        self._high, self._low = max(self._high, value), min(self._low, value)
+        self.level += self.alpha * (value - self.level)
+        offset = value - self.level
+        self.deviation += self.alpha * (abs(offset) - self.deviation)
+        if offset < -self.hysteresis * self.deviation:
+            self._armed = True
+        elif offset >= 0 and self._armed:
+            time_0, value_0 = self._previous
+            offset_0 = value_0 - self.level
+            self.crossings.append(time_0 + (time - time_0) * offset_0 / (offset_0 - offset))
+            self._armed = False
+            self.level = (self._high + self._low) / 2                       # mean of the period just completed
+            self._high = self._low = value
+        self._previous = (time, value)
+        return self.frequency
+
+    @property
+    def frequency(self):
+        if len(self.crossings) < 2:
+            return np.nan
+        return (len(self.crossings) - 1) / (self.crossings[-1] - self.crossings[0])
+
+
+def dominant_frequency(values, dt=1.0):
+    """Frequency of the largest spectral peak of evenly sampled values, refined by a parabola through three bins."""
+    spectrum = np.abs(np.fft.rfft(values - np.mean(values)))
+    k = int(np.argmax(spectrum[1:])) + 1
+    if 1 <= k < len(spectrum) - 1:
+        a, b, c = np.log(spectrum[k - 1:k + 2] + 1e-300)
+        k = k + 0.5 * (a - c) / (a - 2*b + c)
+    return k / (len(values) * dt)
+
+
+class Probes:
+    """Bilinear interpolation of grid fields at fixed points, weights computed once.
+
+    `points` are (x, y) pairs; node (row j, column i) of a field with `shape`
+    lies at (origin_x + i spacing, origin_y + j spacing). Points outside the
+    nodes raise ValueError. `rows`, `columns` and `weights` are (points, 4)
+    arrays of the surrounding nodes.
+    """
+
+    def __init__(self, points, shape, origin=(0.0, 0.0), spacing=1.0):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        ny, nx = shape
+        x = (points[:, 0] - origin[0]) / spacing
+        y = (points[:, 1] - origin[1]) / spacing
+        outside = (x < 0) | (x > nx - 1) | (y < 0) | (y > ny - 1)
+        if outside.any():
+            raise ValueError(f"probe points {points[outside].tolist()} lie outside the {ny}x{nx} nodes")
+        i = np.minimum(np.floor(x).astype(int), max(nx - 2, 0))             # lower left node
+        j = np.minimum(np.floor(y).astype(int), max(ny - 2, 0))
+        fx, fy = x - i, y - j
+        self.points = points
+        self.rows = np.stack([j, j, j + 1, j + 1], axis=1).clip(max=ny - 1)
+        self.columns = np.stack([i, i + 1, i, i + 1], axis=1).clip(max=nx - 1)
+        self.weights = np.stack([(1-fx)*(1-fy), fx*(1-fy), (1-fx)*fy, fx*fy], axis=1)
+
+    def __len__(self):
+        return len(self.points)
+
+    def interpolate(self, values):
+        """Probe values from the (points, 4) field values at rows, columns."""
+        return np.sum(values * self.weights, axis=1)
+
+    def sample(self, field):
+        return self.interpolate(field[self.rows, self.columns])
@@ -0,0 +1,197 @@
+# Background frame writer for headless runs
+# The solver loop hands snapshots to a worker thread or process through a bounded
+# queue; the worker renders them with matplotlib's Agg canvas and writes PNG frames.
+
+# LIBRARIES
+import glob
+import os
+import pickle
+import queue
+import threading
+import traceback
+import multiprocessing
+
+POLICIES = ('block', 'drop-newest', 'drop-oldest')
+_STOP = None                                                                # end of stream marker
+
+
+def _portable(error):
+    """The exception itself if it survives pickling (process backend), else a RuntimeError describing it."""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(f'{type(error).__name__}: {error}')
+
+
+def _worker_loop(items, handle, counts, errors):
+    failed = False
+    while True:
+        item = items.get()
+        if item is _STOP:
+            break
+        if failed:                                                          # drain, the producer must not block
+            continue
+        try:
+            handle(item)
+        except Exception as error:
+            failed = True
+            errors.put((_portable(error), traceback.format_exc()))
+            continue
+        with counts.get_lock():
+            counts.value += 1
+
+
+class BoundedWorker:
+    """Consumes submitted items on a background thread or process through a bounded queue.
+
+    When the queue is full the policy decides what happens: 'block' makes
+    submit() wait (backpressure on the solver), 'drop-newest' discards the
+    incoming item and 'drop-oldest' discards the oldest queued item, so the
+    solver never stalls. `handle` must be picklable for backend='process'.
+
+    If handle raises, the worker stops handling items but keeps draining the
+    queue, and the next submit() or close() raises RuntimeError from the
+    error, with the worker's traceback in the message.
+    """
+
+    def __init__(self, handle, maxsize=8, policy='block', backend='thread'):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown queue policy {policy!r}, expected one of {POLICIES}")
+        if backend not in ('thread', 'process'):
+            raise ValueError(f"unknown worker backend {backend!r}, expected 'thread' or 'process'")
+        self.policy = policy
+        self.submitted = 0                                                  # items accepted into the queue
+        self.dropped = 0                                                    # items discarded by the policy
+        self._counts = multiprocessing.Value('l', 0)                        # items handled by the worker
+        self._failure = None                                                # (error, traceback) of the worker
+        self._reported = False
+
+        if backend == 'process':
+            self._queue = multiprocessing.Queue(maxsize)
+            self._errors = multiprocessing.Queue()
+            self._worker = multiprocessing.Process(target=_worker_loop,
+                                                   args=(self._queue, handle, self._counts, self._errors))
+        else:
+            self._queue = queue.Queue(maxsize)
+            self._errors = queue.Queue()
+            self._worker = threading.Thread(target=_worker_loop, args=(self._queue, handle, self._counts, self._errors))
+        self._worker.daemon = True
+        self._worker.start()
+
+    @property
+    def handled(self):
+        return self._counts.value
+
+    def _raise_failure(self):
+        if self._failure is None:
+            try:
+                self._failure = self._errors.get_nowait()
+            except queue.Empty:
+                return
+        self._reported = True
+        error, trace = self._failure
+        raise RuntimeError(f'background worker failed, later items were discarded:\n{trace}') from error
+
+    def submit(self, item):
+        """Queue item for the worker, returns False if it was dropped."""
+        self._raise_failure()
+        if self.policy == 'block':
+            self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                if self.policy == 'drop-newest':
+                    self.dropped += 1
+                    return False
+                try:
+                    self._queue.get_nowait()                                # make room for the newest item
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                self._queue.put(item)
+        self.submitted += 1
+        return True
+
+    def close(self):
+        """Wait until every queued item is handled and stop the worker."""
+        self._queue.put(_STOP)
+        self._worker.join()
+        if not self._reported:
+            self._raise_failure()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FrameRenderer:
+    """Renders a snapshot on a private Agg figure and saves it as a numbered PNG."""
+
+    def __init__(self, render, directory, figsize=(8, 4), dpi=100):
+        os.makedirs(directory, exist_ok=True)
+        self.render = render
+        self.directory = directory
+        self.figsize = figsize
+        self.dpi = dpi
+
+    def __call__(self, item):
+        from matplotlib.figure import Figure                                # pyplot-free, safe off the main thread
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        index, snapshot = item
+        figure = Figure(figsize=self.figsize)
+        FigureCanvasAgg(figure)
+        self.render(figure, snapshot)
+        figure.savefig(os.path.join(self.directory, f'frame_{index:06d}.png'), dpi=self.dpi)
+
+
+class FrameWriter(BoundedWorker):
+    """Writes one PNG per submitted snapshot, rendered by render(figure, snapshot) in the background.
+
+    Snapshots must not be modified after submission: pass copies of solver buffers.
+    """
+
+    def __init__(self, render, directory, figsize=(8, 4), dpi=100, maxsize=8, policy='block', backend='thread'):
+        self.directory = directory
+        self._index = 0
+        super().__init__(FrameRenderer(render, directory, figsize, dpi), maxsize, policy, backend)
+
+    def submit(self, snapshot):
+        accepted = super().submit((self._index, snapshot))
+        self._index += 1
+        return accepted
+
+
+def encode_movie(directory, output, fps=20):
+    """Encode the PNG frames of directory into an MP4 (needs ffmpeg) or GIF (pillow) file."""
+    frames = sorted(glob.glob(os.path.join(directory, 'frame_*.png')))
+    if not frames:
+        raise FileNotFoundError(f"no frames found in {directory}")
+
+    if output.lower().endswith('.gif'):
+        from PIL import Image
+        images = [Image.open(frame) for frame in frames]
+        images[0].save(output, save_all=True, append_images=images[1:], duration=int(1000/fps), loop=0)
+        return output
+
+    from matplotlib import animation, image
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    if not animation.FFMpegWriter.isAvailable():
+        raise RuntimeError("MP4 encoding needs ffmpeg on the PATH, write a .gif instead")
+    first = image.imread(frames[0])
+    height, width = first.shape[:2]
+    figure = Figure(figsize=(width/100, height/100), dpi=100)
+    FigureCanvasAgg(figure)
+    axes = figure.add_axes([0, 0, 1, 1])
+    axes.axis('off')
+    artist = axes.imshow(first)
+    writer = animation.FFMpegWriter(fps=fps)
+    with writer.saving(figure, output, dpi=100):
+        for frame in frames:
+            artist.set_data(image.imread(frame))
+            writer.grab_frame()
+    return output
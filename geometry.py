@@ -0,0 +1,259 @@
+# Obstacle geometry for the lattice and potential flow simulations
+# Shapes are rasterized onto a grid in one vectorized pass through their signed distance functions
+
+# LIBRARIES
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# SHAPES
+# Every shape provides sdf(x, y): negative inside, positive outside, zero on
+# the boundary. Only the sign is needed for masks and coverage fractions, so
+# shapes without a closed-form distance use an implicit function of the same sign.
+
+class Circle:
+    def __init__(self, xc, yc, r):
+        self.xc, self.yc, self.r = xc, yc, r
+
+    def sdf(self, x, y):
+        return np.sqrt((x - self.xc)**2 + (y - self.yc)**2) - self.r
+
+    def key(self):
+        return ('circle', self.xc, self.yc, self.r)
+
+
+class Ellipse:
+    """Ellipse with semi-axes a, b rotated by angle (radians); first-order distance estimate."""
+
+    def __init__(self, xc, yc, a, b, angle=0.0):
+        self.xc, self.yc, self.a, self.b, self.angle = xc, yc, a, b, angle
+
+    def sdf(self, x, y):
+        c, s = np.cos(self.angle), np.sin(self.angle)
+        u = ((x - self.xc)*c + (y - self.yc)*s) / self.a
+        v = (-(x - self.xc)*s + (y - self.yc)*c) / self.b
+        return (np.sqrt(u**2 + v**2) - 1) * min(self.a, self.b)
+
+    def key(self):
+        return ('ellipse', self.xc, self.yc, self.a, self.b, self.angle)
+
+
+class Rectangle:
+    """Axis-aligned box x0 < x < x1, y0 < y < y1."""
+
+    def __init__(self, x0, y0, x1, y1):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+
+    def sdf(self, x, y):
+        return np.maximum(np.maximum(self.x0 - x, x - self.x1), np.maximum(self.y0 - y, y - self.y1))
+
+    def key(self):
+        return ('rectangle', self.x0, self.y0, self.x1, self.y1)
+
+
+class Polygon:
+    """Simple polygon from an (n, 2) array of vertices, exact signed distance."""
+
+    def __init__(self, vertices):
+        self.vertices = np.asarray(vertices, dtype=float)
+
+    def sdf(self, x, y):
+        x, y = np.broadcast_arrays(x, y)
+        v = self.vertices
+        distance = np.full(x.shape, np.inf)
+        inside = np.zeros(x.shape, dtype=bool)
+        for (ax, ay), (bx, by) in zip(v, np.roll(v, -1, axis=0)):          # one array pass per edge
+            ex, ey = bx - ax, by - ay
+            wx, wy = x - ax, y - ay
+            t = np.clip((wx*ex + wy*ey) / (ex**2 + ey**2), 0.0, 1.0)
+            np.minimum(distance, (wx - ex*t)**2 + (wy - ey*t)**2, out=distance)
+            crosses = (ay > y) != (by > y)                                  # even-odd crossing rule
+            with np.errstate(divide='ignore', invalid='ignore'):
+                inside ^= crosses & (x < ax + ex*(y - ay)/ey)
+        return np.where(inside, -1.0, 1.0) * np.sqrt(distance)
+
+    def key(self):
+        return ('polygon', self.vertices.tobytes())
+
+
+class JoukowskyAirfoil:
+    """Image of the circle |zeta - s| = r under J(zeta) = zeta + lambda**2/zeta, with lambda = r - s.
+
+    The airfoil is scaled by `scale`, rotated clockwise by `aoa` degrees and
+    placed with the origin of the mapped plane at (xc, yc). A point is inside
+    when both preimages under J lie inside the circle.
+    """
+
+    def __init__(self, s_x, s_y, r=0.5, scale=1.0, xc=0.0, yc=0.0, aoa=0.0):
+        self.s_x, self.s_y, self.r = s_x, s_y, r
+        self.scale, self.xc, self.yc, self.aoa = scale, xc, yc, aoa
+
+    def sdf(self, x, y):
+        s = self.s_x + 1j*self.s_y
+        lambda_ = self.r - s
+        z = ((x - self.xc) + 1j*(y - self.yc)) / self.scale * np.exp(1j*np.radians(self.aoa))
+        root = np.sqrt(z**2 - 4*lambda_**2)
+        zeta = np.abs(np.stack([(z + root)/2, (z - root)/2]) - s)           # both preimages
+        return (zeta.max(axis=0) - self.r) * self.scale
+
+    def key(self):
+        return ('joukowsky', self.s_x, self.s_y, self.r, self.scale, self.xc, self.yc, self.aoa)
+
+
+class SDF:
+    """User signed distance function f(x, y); `name` must identify it uniquely for caching."""
+
+    def __init__(self, function, name):
+        self.function, self.name = function, name
+
+    def sdf(self, x, y):
+        return self.function(x, y)
+
+    def key(self):
+        return ('sdf', self.name)
+
+
+class Union:
+    def __init__(self, shapes):
+        self.shapes = list(shapes)
+
+    def sdf(self, x, y):
+        distance = self.shapes[0].sdf(x, y)
+        for shape in self.shapes[1:]:
+            distance = np.minimum(distance, shape.sdf(x, y))
+        return distance
+
+    def key(self):
+        return ('union',) + tuple(shape.key() for shape in self.shapes)
+
+
+SHAPES = {
+    'circle': Circle,
+    'ellipse': Ellipse,
+    'rectangle': Rectangle,
+    'polygon': Polygon,
+    'joukowsky': JoukowskyAirfoil,
+}
+
+# RASTERIZATION
+CACHE_SIZE = 32                                                             # rasterized grids kept in memory
+_cache = OrderedDict()
+
+
+def lattice(Ny, Nx):
+    """Cell-centre coordinates of an Ny x Nx lattice with unit spacing."""
+    return np.arange(Nx), np.arange(Ny)
+
+
+def _cached(key, compute):
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()
+    if digest in _cache:
+        _cache.move_to_end(digest)
+        return _cache[digest]
+    result = compute()
+    result.setflags(write=False)                                            # shared between callers
+    _cache[digest] = result
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
+
+
+def _grid_key(x, y):
+    x, y = np.asarray(x), np.asarray(y)
+    return (x.dtype.str, x.tobytes(), y.dtype.str, y.tobytes())
+
+
+def rasterize(shape, x, y, include_boundary=False):
+    """Boolean (len(y), len(x)) mask of the cell centres inside shape, cached per grid and shape."""
+    def compute():
+        distance = shape.sdf(np.asarray(x)[None, :], np.asarray(y)[:, None])
+        return distance <= 0 if include_boundary else distance < 0
+    return _cached(('mask', shape.key(), _grid_key(x, y), include_boundary), compute)
+
+
+def coverage(shape, x, y, samples=4):
+    """Fraction of each cell covered by shape, from samples x samples points per cell.
+
+    Cells are centred on the uniform coordinates x, y; each sub-sample is
+    one vectorized pass over the whole grid.
+    """
+    def compute():
+        xs, ys = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        dx = xs[1] - xs[0] if xs.size > 1 else 1.0
+        dy = ys[1] - ys[0] if ys.size > 1 else 1.0
+        offsets = (np.arange(samples) + 0.5) / samples - 0.5
+        inside = np.zeros((ys.size, xs.size))
+        for oy in offsets:
+            for ox in offsets:
+                inside += shape.sdf(xs[None, :] + ox*dx, ys[:, None] + oy*dy) < 0
+        return inside / samples**2
+    return _cached(('coverage', shape.key(), _grid_key(x, y), samples), compute)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+# LATTICE OBSTACLES
+
+def circle(Ny, Nx, xc, yc, r):
+    """Cells whose centre lies strictly within distance r of (xc, yc)."""
+    return rasterize(Circle(xc, yc, r), *lattice(Ny, Nx))
+
+
+def rectangle(Ny, Nx, x0, y0, x1, y1):
+    """Cells with x0 <= x < x1 and y0 <= y < y1, like slicing the lattice (Rectangle itself is open)."""
+    x, y = lattice(Ny, Nx)
+    return ((y >= y0) & (y < y1))[:, None] & ((x >= x0) & (x < x1))[None, :]
+
+
+def obstacle_from_shapes(Ny, Nx, shapes):
+    """Union of analytic shapes given as (name, *parameters) tuples, e.g. ('circle', 100, 50, 13).
+
+    Rectangles cover the half-open node ranges of rectangle(); the other
+    shapes are rasterized together through their signed distances.
+    """
+    obstacle = np.zeros((Ny, Nx), dtype=bool)
+    built = []
+    for name, *params in shapes:
+        if name not in SHAPES:
+            raise ValueError(f"unknown shape {name!r}, expected one of {tuple(SHAPES)}")
+        if name == 'rectangle':
+            obstacle |= rectangle(Ny, Nx, *params)
+        else:
+            built.append(SHAPES[name](*params))
+    if built:
+        obstacle |= rasterize(Union(built), *lattice(Ny, Nx))
+    return obstacle
+
+
+def load_obstacle(path, threshold=0.5):
+    """Solid mask from an array file (.npy, .npz, .txt, .csv) or an image.
+
+    Array files are read as-is, non-zero entries are solid. Images are
+    converted to grey levels in [0, 1] and dark pixels (below `threshold`)
+    are solid; the first image row becomes lattice row 0.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        data = np.load(path)
+    elif extension == '.npz':
+        with np.load(path) as archive:
+            data = archive[archive.files[0]]
+    elif extension in ('.txt', '.csv', '.dat'):
+        data = np.loadtxt(path, delimiter=',' if extension == '.csv' else None)
+    else:
+        from matplotlib import image                                        # only needed for image input
+        pixels = np.asarray(image.imread(path), dtype=float)
+        if pixels.max() > 1:
+            pixels = pixels / 255
+        if pixels.ndim == 3:
+            pixels = pixels[:, :, :3].mean(axis=2)                          # grey level, alpha ignored
+        return pixels < threshold
+
+    data = np.asarray(data)
+    if data.ndim != 2:
+        raise ValueError(f"obstacle array in {path} must be 2D, got shape {data.shape}")
+    return data.astype(bool)
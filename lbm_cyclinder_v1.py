@@ -1,89 +1,154 @@
 # Lattice-Boltzmann Fluid Simulation
 
 # LIBRARIES
+import argparse
+
 import numpy as np
 from matplotlib import pyplot 
 
-# FUNCTION FOR DISTANCE CALCULATION
-def distance(x1, y1, x2, y2):
-    return np.sqrt((x2-x1)**2 + (y2-y1)**2)
+import checkpoint
+import frame_writer
+import live_viewer
+import snapshots
+from solvers import LBMSolver
+
+# FUNCTION FOR RENDERING A SNAPSHOT
+def render_frame(figure, snapshot):
+    axes = figure.add_subplot()
+    axes.imshow(snapshot['curl'], cmap="bwr")                               # plotting curl
+    axes.set_title(f"Iteration {snapshot['it']}/{snapshot['Nt']}")          # iteration counter
+
+    # VELOCITY GRADIENT
+    # axes.imshow(snapshot['speed'])                                        # plotting velocity
+
+# FUNCTION FOR THE CURL OF THE INTERIOR NODES
+def vorticity(ux, uy):
+    dfydx = ux[2: ,1:-1] - ux[0:-2, 1:-1]                                   # calculating difference in x direction
+    dfxdy = uy[1:-1, 2:] - uy[1:-1, 0:-2]                                   # calculating difference in y direction
+    return dfydx - dfxdy                                                    # calculating curl
 
 # MAIN FUNCTION FOR THE SIMULATION
-def main():
+def main(headless=False, frame_directory='frames', frame_policy='block', snapshot_directory=None,
+         checkpoint_path=None, checkpoint_every=500, restart_path=None, workers=1, history_path=None,
+         diagnostics_path=None, live=False):
     # CONSTANTS
     Nx = 400                                                                # number of lattices in x direction
     Ny = 100                                                                # number of lattices in y direction
     tau = 0.53                                                              # kinematic viscoty
     Nt = 3000                                                               # number of iterations
+    layout = 'soa'                                                          # population layout, 'aos' or 'soa'
+    precision = np.float64                                                  # population precision
+    bounce_back = 'halfway'                                                 # wall treatment, 'node' or 'halfway'
+    collision = 'bgk'                                                       # 'bgk', 'trt', 'mrt' or 'regularized'
+    refinement = None                                                       # nested patch [y0, y1, x0, x1] or None
+    obstacle_file = None                                                    # optional obstacle image or array file
+    snapshot_every = 50                                                     # field output cadence
+    snapshot_dtype = np.float32                                             # precision of the stored fields
+    convergence_every = 50                                                  # steady state check cadence
+    tolerances = {'change_linf': 1e-6}                                      # max velocity change per lattice step
+    stop_at_steady_state = True                                             # end the run once converged
+    probes = [(150, 50), (200, 50), (300, 35)]                              # (x, y) wake velocity probes
+    live_every = 10                                                         # live viewer frame cadence
+
+    config = {                                                              # configuration stored with checkpoints
+        'Nx': Nx, 'Ny': Ny, 'tau': tau, 'layout': layout, 'precision': np.dtype(precision).name,
+        'bounce_back': bounce_back, 'collision': collision, 'refinement': refinement,
+        'obstacle_file': obstacle_file,
+    }
+
+    # LATTICE, OBSTACLE AND FUSED STREAM-COLLIDE ENGINE
+    solver = LBMSolver(
+        nx=Nx, ny=Ny, tau=tau, max_steps=Nt, layout=layout, precision=np.dtype(precision).name,
+        bounce_back=bounce_back, collision=collision, refinement=refinement, obstacle_file=obstacle_file,
+        workers=workers,
+        convergence_every=convergence_every, tolerances=tolerances, stop_at_steady_state=stop_at_steady_state,
+        log_every=10, probes=probes, diagnostics_file=diagnostics_path
+    ).setup()
+    if restart_path is not None:                                            # resume a checkpointed run
+        arrays, state = checkpoint.restart(restart_path, config)
+        solver.load_state(dict(arrays, **state))
+
+    # VISUALIZATION
+    if headless:                                                            # render frames off the solver thread
+        writer = frame_writer.FrameWriter(render_frame, frame_directory, figsize=(8, 2.5), policy=frame_policy)
+    if live:                                                                # curl in shared memory for a viewer
+        publisher = live_viewer.FramePublisher((Ny - 2, Nx - 2))
+        print(f'live curl in shared memory {publisher.name}, attach more viewers with '
+              f'python -m live_viewer {publisher.name}')
+        live_viewer.launch(publisher.name, cmap='bwr')
+
+    # FIELD OUTPUT
+    if snapshot_directory is not None:                                      # written by a background thread
+        snapshot_writer = snapshots.SnapshotWriter(
+            snapshot_directory, snapshot_every, snapshot_dtype,
+            attributes={'layout': layout, 'tau': tau, 'Nx': Nx, 'Ny': Ny}
+        )
+
+    checkpointer = checkpoint.Checkpointer(checkpoint_path, checkpoint_every)
 
-    # LATTICE SPEEDS AND WEIGHTS
-    NL = 9                                                                  # number of discrete velocities
-    cxs = np.array([0, 0, 1, 1, 1, 0,-1,-1,-1])                             # discrete velocity locations in x
-    cys = np.array([0, 1, 1, 0,-1,-1,-1, 0, 1])                             # discrete velocity locations in y
-    weights = np.array([4/9, 1/9, 1/36, 1/9, 1/36, 1/9, 1/36, 1/9, 1/36])   # discrete velocity weights
-
-    # INITIAL CONDITIONS
-    F = np.ones((Ny, Nx, NL)) + 0.1*np.random.randn(Ny, Nx, NL)             # mesoscopic velocity
-    F[:, :, 3] = 2.3                                                        # constant right hand side velocity
+    # MAIN LOOP
+    while not solver.finished:                                              # time interval loop
+        it = solver.iteration                                               # index of the step about to run
 
-    # BOUNDARIES
-    cyclinder = np.full((Ny, Nx), False)                                    # definition of non boundary cells
+        # STREAMING, BOUNDARY AND COLLISION
+        solver.step()                                                       # fused in-place lattice update
 
-    for y in range(0, Ny):                                                  # loop all cells in y direction
-        for x in range(0, Nx):                                              # loop all cells in x direction
-            if (distance(Nx//4, Ny//2, x, y)<13):                           # measure distance
-                cyclinder[y][x] = True                                      # definition of boundary cells
+        if checkpointer.due(solver.iteration):                              # populations hold the full state
+            arrays = {'F': solver.engine.F}
+            if refinement is not None:
+                arrays['F_fine'] = solver.engine.fine.F                     # and those of the nested patch
+            checkpointer.save(solver.iteration, arrays, config)
 
-    # MAIN LOOP
-    for it in range(Nt):                                                    # time interval loop
-        # print(it)                                                           # print iterations for debugging
-
-        # ABSORBING BOUNDARIES
-        F[:, -1, [6, 7, 8]] = F[:, -2, [6, 7, 8]]                           # right end velocity absorbtion
-        F[:, 0, [2, 3, 4]] = F[:, 1, [2, 3, 4]]                             # right end velocity absorbtion
-
-        # STREAMING
-        for i, cx, cy in zip(range(NL), cxs, cys):                          # streaming loop into neighbour cells
-            F[:, :, i] = np.roll(F[:, :, i], cx, axis=1)                    # rolling velocity in x direction
-            F[:, :, i] = np.roll(F[:, :, i], cy, axis=0)                    # rolling velocity in y direction
-
-        # BOUNDARY
-        bndryF = F[cyclinder, :]                                            # checking the collision
-        bndryF = bndryF[:, [0, 5, 6, 7, 8, 1, 2, 3, 4]]                     # inversing the velocity
-
-        # FLUID VARIABLES
-        rho = np.sum(F, 2)                                                  # calculating density
-        ux = np.sum(F*cxs, 2) / rho                                         # calculating x velocity
-        uy = np.sum(F*cys, 2) / rho                                         # calculating y velocity
-
-        F[cyclinder, :] = bndryF                                            # setting velocities inside the boundary
-        ux[cyclinder] = 0                                                   # omiting x velocities inside the boundary
-        uy[cyclinder] = 0                                                   # omiting x velocities inside the boundary
-
-        # COLLISION
-        Feq = np.zeros(F.shape)                                             # defining force equillibrium
-        for i, cx, cy, w in zip(range(NL), cxs, cys, weights):              # iterating each cell
-            Feq[:, :, i] = rho * w * (                                      # calculating force equillibrium
-                1 + 3*(cx*ux+cy*uy) + (9*(cx*ux+cy*uy)**2)/2 - 3*(ux**2+uy**2)/2
-            )
-        F = F + -(1/tau) * (F-Feq)                                          # calculating force in next step
+        if snapshot_directory is not None and snapshot_writer.due(it):
+            state = solver.state()
+            snapshot_writer.write(it, F=state['F'], rho=state['rho'], ux=state['ux'], uy=state['uy'])
         
         # PLOTTING
-        if (it%50 == 0):                                                    # plot in periodic steps
+        if live and it % live_every == 0:                                   # never waits for the viewer
+            publisher.publish(vorticity(solver.engine.ux, solver.engine.uy), step=it, time=it)
+        if (it%50 == 0) and (headless or not live):                         # plot in periodic steps unless live
             # CURL GRADIENT
-            dfydx = ux[2: ,1:-1] - ux[0:-2, 1:-1]                           # calculating difference in x direction
-            dfxdy = uy[1:-1, 2:] - uy[1:-1, 0:-2]                           # calculating difference in y direction
-            curl = dfydx - dfxdy                                            # calculating curl
-            pyplot.imshow(curl, cmap="bwr")                                 # plotting curl
-            pyplot.title(f'Iteration {it}/{Nt}')                            # iteration counter
-            pyplot.pause(0.01)                                              # pausing the visualization
-            pyplot.cla()                                                    # clear the image
-
-            # VELOCITY GRADIENT
-            # pyplot.imshow(np.sqrt(ux**2 + uy**2))                           # plotting velocity
-            # pyplot.title(f'Iteration {it}/{Nt}')                            # iteration counter
-            # pyplot.pause(0.01)                                              # pausing the visualization
-            # pyplot.cla()                                                    # clear the image
+            curl = vorticity(solver.engine.ux, solver.engine.uy)            # from the fluid velocities
+            snapshot = {'it': it, 'Nt': Nt, 'curl': curl}                   # fields handed to the renderer
+
+            if headless:
+                writer.submit(snapshot)                                     # queued for the background writer
+            else:
+                render_frame(pyplot.gcf(), snapshot)                        # plotting curl
+                pyplot.pause(0.01)                                          # pausing the visualization
+                pyplot.clf()                                                # clear the image
+
+    if headless:
+        writer.close()                                                      # flush the remaining frames
+        print(f'{writer.handled} frames written to {frame_directory}, {writer.dropped} dropped')
+    if live:
+        publisher.close()                                                   # viewers see the run has ended
+    if snapshot_directory is not None:
+        snapshot_writer.close()                                             # flush the remaining snapshots
+    print(solver.timers.report())
+    if history_path is not None:
+        solver.monitor.save(history_path)                                   # convergence history as JSON
+    last = solver.diagnostics.last()                                        # drag, lift and shedding of the last step
+    print(f"drag coefficient {last['cd']:.3f}, lift coefficient {last['cl']:.3f}, "
+          f"Strouhal number {last['strouhal']:.3f}")
+    solver.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Lattice-Boltzmann flow around a cylinder')
+    parser.add_argument('--headless', action='store_true', help='write PNG frames instead of showing a window')
+    parser.add_argument('--frames', default='frames', help='frame directory in headless mode')
+    parser.add_argument('--frame-policy', default='block', choices=frame_writer.POLICIES,
+                        help='what to do when the frame queue is full')
+    parser.add_argument('--snapshots', help='directory for periodic F/rho/ux/uy snapshots')
+    parser.add_argument('--checkpoint', help='checkpoint file, rewritten periodically')
+    parser.add_argument('--checkpoint-every', type=int, default=500, help='time steps between checkpoints')
+    parser.add_argument('--restart', help='resume from this checkpoint file')
+    parser.add_argument('--workers', type=int, default=1, help='threads advancing x slabs of the lattice')
+    parser.add_argument('--history', help='write the convergence history to this JSON file')
+    parser.add_argument('--diagnostics', help='write the per-step drag, lift, Strouhal and probes to this CSV file')
+    parser.add_argument('--live', action='store_true',
+                        help='show the curl in a viewer process fed through shared memory, never slowing the run')
+    args = parser.parse_args()
+    main(args.headless, args.frames, args.frame_policy, args.snapshots,
+         args.checkpoint, args.checkpoint_every, args.restart, args.workers, args.history, args.diagnostics,
+         args.live)
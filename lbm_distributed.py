@@ -0,0 +1,363 @@
+# Distributed D2Q9 Lattice-Boltzmann engine by 2D block domain decomposition
+# Each process owns a block of rows and columns stored with a one node halo ring and
+# never holds the global lattice. Before every step a block receives, from each of
+# its eight neighbours, only the populations that stream into it: through shared
+# memory between processes of one machine or as messages of the message_passing
+# layer, which also runs under mpiexec. Diagnostics are reduced, not gathered.
+# Run from the repository root: python -m lbm_distributed --processes 4
+
+# LIBRARIES
+import argparse
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import geometry
+import message_passing
+from lbm_engine import BOUNCE_BACK, CXS, CYS, NL, Lattice, StreamCollideEngine, make_collision
+
+OFFSETS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if (dy, dx) != (0, 0)]    # neighbour blocks
+RIGHTWARD = (2, 3, 4)                                                       # directions absorbed at the left end
+LEFTWARD = (6, 7, 8)                                                        # directions absorbed at the right end
+TRANSPORTS = ('shared', 'message')
+
+
+def outgoing(dy, dx):
+    """Directions that stream from a block into its neighbour at offset (dy, dx)."""
+    return [i for i in range(NL) if (dx == 0 or CXS[i] == dx) and (dy == 0 or CYS[i] == dy)]
+
+
+def block_grid(processes, Ny, Nx):
+    """(py, px) blocks per column and row for `processes` ranks, with the shortest total halo length."""
+    grids = [(py, processes // py) for py in range(1, processes + 1) if processes % py == 0]
+    return min(grids, key=lambda grid: grid[0] * Nx + grid[1] * Ny)
+
+
+def split_blocks(Ny, Nx, py, px):
+    """(y0, y1, x0, x1) of every block of near equal size, rank = by * px + bx."""
+    rows = [Ny * k // py for k in range(py + 1)]
+    cols = [Nx * k // px for k in range(px + 1)]
+    return [(rows[by], rows[by + 1], cols[bx], cols[bx + 1]) for by in range(py) for bx in range(px)]
+
+
+def _edge(n, d):
+    """Interior nodes of a padded axis of n owned nodes next to side d."""
+    return {-1: slice(1, 2), 0: slice(1, n + 1), 1: slice(n, n + 1)}[d]
+
+
+def _halo(n, d):
+    """Halo nodes of a padded axis of n owned nodes on side d."""
+    return {-1: slice(0, 1), 0: slice(1, n + 1), 1: slice(n + 1, n + 2)}[d]
+
+
+def _strip_shape(block, offset):
+    """(directions, rows, columns) of the populations a block sends to its neighbour at offset."""
+    y0, y1, x0, x1 = block
+    dy, dx = offset
+    return (len(outgoing(dy, dx)), 1 if dy else y1 - y0, 1 if dx else x1 - x0)
+
+
+class NoisyInflow:
+    """Initial populations of lbm_cyclinder_v1 for one block: one plus 10 % noise, constant rightward population.
+
+    Each block draws its noise from a generator seeded by (seed, y0, x0), so
+    no process needs the global array; results depend on the decomposition.
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def __call__(self, y0, y1, x0, x1):
+        random = np.random.RandomState([self.seed, y0, x0])
+        F = np.ones((y1 - y0, x1 - x0, NL)) + 0.1*random.randn(y1 - y0, x1 - x0, NL)
+        F[:, :, 3] = 2.3                                                    # constant right hand side velocity
+        return F
+
+
+class _Block(StreamCollideEngine):
+    """Rows y0:y1 and columns x0:x1 of the lattice plus a halo ring, lbm_parallel._Slab in two dimensions.
+
+    Moments and collision run on the whole padded block, the halo results are
+    discarded. Bounce-back indices are restricted to the owned nodes.
+    """
+
+    def __init__(self, F, obstacle, tau, block, layout, dtype, bounce_back, collision, collision_parameters):
+        y0, y1, x0, x1 = block
+        self.ny, self.nx = y1 - y0, x1 - x0
+        padded = np.ones((self.ny + 2, self.nx + 2, NL))                    # halos stay finite
+        padded[1:-1, 1:-1] = F
+        self.lattice = Lattice(self.ny + 2, self.nx + 2, layout, dtype)
+        self.tau = tau
+        self.F = self.lattice.from_aos(padded)
+        self._F_next = self.lattice.from_aos(padded)
+
+        # MACROSCOPIC FIELDS AND SCRATCH BUFFERS ON THE PADDED BLOCK
+        self.rho = self.lattice.field()
+        self.ux = self.lattice.field()
+        self.uy = self.lattice.field()
+        self._tmp = self.lattice.field()
+
+        region = np.zeros(obstacle.shape, dtype=bool)
+        region[1:-1, 1:-1] = True
+        self.boundary = BOUNCE_BACK[bounce_back](obstacle, self.lattice.dtype, region)
+        self.collision = make_collision(collision, tau, self.lattice, collision_parameters)
+
+    def step(self):
+        """Advance the owned nodes by one time step, halos must be current."""
+        src = self.lattice.directions(self.F)
+        dst = self.lattice.directions(self._F_next)
+        ny, nx = self.ny, self.nx
+        for i in range(NL):
+            cx, cy = CXS[i], CYS[i]
+            np.copyto(dst[i][1:ny + 1, 1:nx + 1], src[i][1 - cy:ny + 1 - cy, 1 - cx:nx + 1 - cx])
+        self.boundary.after_streaming(dst, src)
+        self._moments(dst)
+        self.boundary.after_moments(dst, self.ux, self.uy)
+        self.collision.collide(self._F_next, self.rho, self.ux, self.uy)
+        self.F, self._F_next = self._F_next, self.F
+
+    def pack(self, offset, out):
+        """Populations streaming towards the neighbour at offset into out, shaped like _strip_shape."""
+        dy, dx = offset
+        f = self.lattice.directions(self.F)
+        rows, cols = _edge(self.ny, dy), _edge(self.nx, dx)
+        for k, i in enumerate(outgoing(dy, dx)):
+            out[k] = f[i][rows, cols]
+
+    def unpack(self, offset, data):
+        """Store what the neighbour at offset sent into the halo on that side."""
+        dy, dx = offset
+        f = self.lattice.directions(self.F)
+        rows, cols = _halo(self.ny, dy), _halo(self.nx, dx)
+        for k, i in enumerate(outgoing(-dy, -dx)):
+            f[i][rows, cols] = data[k]
+
+
+class MessageHalos:
+    """Halo exchange as one sendrecv per neighbour offset, valid for any communicator."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._buffers = {offset: np.empty(_strip_shape(engine.block, offset), engine.lattice.dtype)
+                         for offset in OFFSETS}
+
+    def exchange(self):
+        engine, comm = self.engine, self.engine.comm
+        for tag, (dy, dx) in enumerate(OFFSETS):
+            buffer = self._buffers[(dy, dx)]
+            engine.local.pack((dy, dx), buffer)
+            received = comm.sendrecv(buffer, engine.neighbours[(dy, dx)], engine.neighbours[(-dy, -dx)], tag)
+            engine.local.unpack((-dy, -dx), received)
+
+    def close(self):
+        pass
+
+
+class SharedMemoryHalos:
+    """Halo exchange through shared memory between the ranks of one message_passing.launch.
+
+    Every rank writes its outgoing edges into its own outbox segment and reads
+    those of its neighbours after a barrier. The outbox is double-buffered by
+    step parity, so a rank may write the next step while slower neighbours
+    still read the current one: one barrier per step.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        comm = engine.comm
+        dtype = engine.lattice.dtype
+        layouts = [self._layout(block) for block in engine.blocks]          # per rank: offset -> slice, size
+        size = layouts[comm.rank][1]
+        self._segment = shared_memory.SharedMemory(create=True, size=2 * size * dtype.itemsize)
+        names = comm.allgather(self._segment.name)
+        segments = {comm.rank: self._segment}
+        for rank in set(engine.neighbours.values()) - {comm.rank}:
+            segments[rank] = shared_memory.SharedMemory(name=names[rank])
+        self._attached = [segment for rank, segment in segments.items() if rank != comm.rank]
+        self._outboxes = {}                                                 # rank -> offset -> (parity, strip) views
+        for rank, segment in segments.items():
+            slices, total = layouts[rank]
+            flat = np.ndarray((2, total), dtype=dtype, buffer=segment.buf)
+            self._outboxes[rank] = {offset: flat[:, part].reshape((2,) + _strip_shape(engine.blocks[rank], offset))
+                                    for offset, part in slices.items()}
+        self._parity = 0
+
+    @staticmethod
+    def _layout(block):
+        slices, start = {}, 0
+        for offset in OFFSETS:
+            size = int(np.prod(_strip_shape(block, offset)))
+            slices[offset] = slice(start, start + size)
+            start += size
+        return slices, start
+
+    def exchange(self):
+        engine, parity = self.engine, self._parity
+        for offset, strip in self._outboxes[engine.comm.rank].items():
+            engine.local.pack(offset, strip[parity])
+        engine.comm.barrier()                                               # every outbox of this step written
+        for (dy, dx), rank in engine.neighbours.items():
+            engine.local.unpack((dy, dx), self._outboxes[rank][(-dy, -dx)][parity])
+        self._parity = 1 - parity
+
+    def close(self):
+        self.engine.comm.barrier()                                          # no neighbour reads any more
+        self._outboxes = {}
+        for segment in self._attached:
+            segment.close()
+        self._segment.close()
+        self._segment.unlink()
+
+
+class DistributedStreamCollideEngine:
+    """One rank's block of an Ny x Nx lattice split into a py x px grid over comm.size processes.
+
+    comm is a message_passing communicator. `initial(y0, y1, x0, x1)` returns
+    the block's (rows, columns, NL) populations (default NoisyInflow()) and
+    `shape` is a geometry shape rasterized on the block's nodes (default the
+    cylinder of lbm_cyclinder_v1), so no rank ever holds a global array.
+    transport='shared' exchanges halos through shared memory and needs ranks
+    from message_passing.launch; 'message' works with any communicator. With
+    the same initial populations the blocks together reproduce
+    StreamCollideEngine bit for bit. tau, layout, dtype, bounce_back and the
+    collision options are those of StreamCollideEngine.
+    """
+
+    def __init__(self, comm, Ny, Nx, tau, initial=None, shape=None, layout='aos', dtype=np.float64,
+                 bounce_back='node', collision='bgk', collision_parameters=None, grid=None, transport='shared'):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"unknown halo transport {transport!r}, expected one of {TRANSPORTS}")
+        if transport == 'shared' and not isinstance(comm, message_passing.LocalCommunicator):
+            raise ValueError("the shared memory transport needs ranks started by message_passing.launch")
+        if bounce_back not in BOUNCE_BACK:
+            raise ValueError(f"unknown bounce-back scheme {bounce_back!r}, expected one of {tuple(BOUNCE_BACK)}")
+        self.comm = comm
+        self.Ny, self.Nx = Ny, Nx
+        self.grid = tuple(grid or block_grid(comm.size, Ny, Nx))
+        py, px = self.grid
+        if py * px != comm.size:
+            raise ValueError(f"a {py}x{px} block grid needs {py * px} processes, got {comm.size}")
+        if Ny < 2 * py or Nx < 2 * px:
+            raise ValueError(f"a {py}x{px} block grid needs at least {2 * py}x{2 * px} nodes, the lattice has {Ny}x{Nx}")
+        self.blocks = split_blocks(Ny, Nx, py, px)
+        self.block = self.blocks[comm.rank]
+        by, bx = divmod(comm.rank, px)
+        self._first_column, self._last_column = bx == 0, bx == px - 1
+        self.neighbours = {(dy, dx): ((by + dy) % py) * px + (bx + dx) % px for dy, dx in OFFSETS}
+
+        # BLOCK POPULATIONS AND OBSTACLE ON THE PADDED NODES, PERIODIC LIKE np.roll
+        y0, y1, x0, x1 = self.block
+        initial = NoisyInflow() if initial is None else initial
+        shape = geometry.Circle(Nx//4, Ny//2, 13) if shape is None else shape
+        x = (np.arange(x0 - 1, x1 + 1) % Nx).astype(float)
+        y = (np.arange(y0 - 1, y1 + 1) % Ny).astype(float)
+        self.local = _Block(initial(y0, y1, x0, x1), geometry.rasterize(shape, x, y), tau, self.block, layout,
+                            dtype, bounce_back, collision, collision_parameters)
+        self.lattice = self.local.lattice
+        self.halos = SharedMemoryHalos(self) if transport == 'shared' else MessageHalos(self)
+        self.iteration = 0
+        self._previous = None                                               # velocities at the last diagnostics
+
+    def step(self):
+        """Advance the whole lattice by one time step; every rank must call it."""
+        f = self.lattice.directions(self.local.F)
+        if self._first_column:
+            for i in RIGHTWARD:
+                f[i][1:-1, 1] = f[i][1:-1, 2]                               # left end velocity absorbtion
+        if self._last_column:
+            for i in LEFTWARD:
+                f[i][1:-1, -2] = f[i][1:-1, -3]                             # right end velocity absorbtion
+        self.halos.exchange()
+        self.local.step()
+        self.iteration += 1
+
+    def diagnostics(self):
+        """Drag, lift, mass and the max velocity change per step since the last call, reduced on every rank.
+
+        Drag and lift are the momentum exchange force on the obstacle in the
+        last step along x and y. Only a few scalars cross process boundaries.
+        """
+        local = self.local
+        ux, uy = local.ux[1:-1, 1:-1], local.uy[1:-1, 1:-1]
+        drag, lift = local.boundary.force()
+        change = np.inf
+        if self._previous is not None:
+            previous_ux, previous_uy, iteration = self._previous
+            steps = max(self.iteration - iteration, 1)
+            change = max(np.abs(ux - previous_ux).max(), np.abs(uy - previous_uy).max()) / steps
+        self._previous = (ux.copy(), uy.copy(), self.iteration)
+        totals = self.comm.allreduce(np.array([drag, lift, local.rho[1:-1, 1:-1].sum()]), 'sum')
+        return {'iteration': self.iteration, 'drag': float(totals[0]), 'lift': float(totals[1]),
+                'mass': float(totals[2]), 'change_linf': float(self.comm.allreduce(change, 'max'))}
+
+    def gather(self, name):
+        """Global 'rho', 'ux', 'uy' or (Ny, Nx, NL) populations 'F' on rank 0, None elsewhere; small lattices only."""
+        local = self.local
+        if name == 'F':
+            part = local.lattice.to_aos(local.F)[1:-1, 1:-1]
+        else:
+            part = getattr(local, name)[1:-1, 1:-1]
+        parts = self.comm.gather(np.ascontiguousarray(part))
+        if parts is None:
+            return None
+        out = np.empty((self.Ny, self.Nx) + part.shape[2:], dtype=part.dtype)
+        for (y0, y1, x0, x1), part in zip(self.blocks, parts):
+            out[y0:y1, x0:x1] = part
+        return out
+
+    def close(self):
+        """Release the halo transport; every rank must call it."""
+        self.halos.close()
+
+
+def run(comm, Ny, Nx, steps, options, diagnostics_every=0):
+    """Advance a distributed lattice built with keyword `options`; rank 0 returns the block grid,
+    seconds and the diagnostics history."""
+    engine = DistributedStreamCollideEngine(comm, Ny, Nx, **options)
+    history = []
+    comm.barrier()
+    t0 = time.perf_counter()
+    for step in range(1, steps + 1):
+        engine.step()
+        if diagnostics_every and step % diagnostics_every == 0:
+            history.append(engine.diagnostics())
+    comm.barrier()
+    seconds = time.perf_counter() - t0
+    engine.close()
+    if comm.rank == 0:
+        return {'grid': engine.grid, 'seconds': seconds, 'history': history}
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Distributed LBM cylinder flow on 2D blocks')
+    parser.add_argument('--processes', type=int, default=4, help='local ranks, ignored with --mpi')
+    parser.add_argument('--mpi', action='store_true', help='run under mpiexec with mpi4py')
+    parser.add_argument('--ny', type=int, default=100)
+    parser.add_argument('--nx', type=int, default=400)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--tau', type=float, default=0.53)
+    parser.add_argument('--transport', choices=TRANSPORTS, default='shared')
+    parser.add_argument('--every', type=int, default=100, help='steps between reduced diagnostics')
+    args = parser.parse_args()
+
+    options = dict(tau=args.tau, layout='soa', bounce_back='halfway')
+    if args.mpi:
+        result = run(message_passing.MPICommunicator(), args.ny, args.nx, args.steps,
+                     dict(options, transport='message'), args.every)
+    else:
+        result = message_passing.launch(run, args.processes, args.ny, args.nx, args.steps,
+                                        dict(options, transport=args.transport), args.every)[0]
+    if result is None:
+        return
+    for entry in result['history']:
+        print(f"step {entry['iteration']:>6}  drag {entry['drag']:>10.4f}  lift {entry['lift']:>10.4f}  "
+              f"mass {entry['mass']:>12.1f}  change {entry['change_linf']:.3e}")
+    py, px = result['grid']
+    print(f"{py}x{px} blocks, {args.ny}x{args.nx} lattice, {args.steps} steps in {result['seconds']:.2f}s "
+          f"({args.ny * args.nx * args.steps / result['seconds'] / 1e6:.1f} MLUPS)")
+
+
+if __name__ == "__main__":
+    main()
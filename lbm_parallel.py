@@ -0,0 +1,190 @@
+# Multi-core D2Q9 Lattice-Boltzmann engine by slab domain decomposition
+# The lattice is split along x into slabs of columns, each stored with one halo
+# column per side. Halos are refreshed from the neighbouring slabs before every
+# step, then all slabs are advanced concurrently on a thread pool: NumPy releases
+# the GIL inside its array kernels, so the slabs run on separate cores.
+
+# LIBRARIES
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lbm_engine import BOUNCE_BACK, COLLISIONS, CXS, CYS, NL, Lattice, StreamCollideEngine, _roll_slices, make_collision
+
+RIGHTWARD = (2, 3, 4)                                                       # directions crossing a slab's right edge
+LEFTWARD = (6, 7, 8)                                                        # directions crossing a slab's left edge
+
+
+def split_columns(Nx, slabs):
+    """(x0, x1) column ranges of `slabs` slabs of near equal width covering 0..Nx."""
+    edges = [Nx * k // slabs for k in range(slabs + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+class _Slab(StreamCollideEngine):
+    """Columns x0:x1 of the lattice plus a halo column on each side, advanced on their own.
+
+    Reuses the moment and collision kernels of StreamCollideEngine on the
+    whole padded slab, which keeps every plane contiguous; the halo results are
+    discarded. Bounce-back indices address the padded slab and are restricted
+    to the interior.
+    """
+
+    def __init__(self, F, obstacle, tau, x0, x1, layout, dtype, bounce_back, collision, collision_parameters):
+        Ny, Nx, _ = F.shape
+        columns = np.arange(x0 - 1, x1 + 1) % Nx                            # periodic in x like np.roll
+        self.x0, self.x1 = x0, x1
+        self.lattice = Lattice(Ny, x1 - x0 + 2, layout, dtype)
+        self.tau = tau
+        self.F = self.lattice.from_aos(F[:, columns])                      # current padded populations
+        self._F_next = self.lattice.from_aos(F[:, columns])                # halos stay finite
+
+        # MACROSCOPIC FIELDS AND SCRATCH BUFFERS ON THE PADDED SLAB
+        self.rho = self.lattice.field()
+        self.ux = self.lattice.field()
+        self.uy = self.lattice.field()
+        self._tmp = self.lattice.field()
+
+        region = np.zeros((Ny, x1 - x0 + 2), dtype=bool)
+        region[:, 1:-1] = True
+        self.boundary = BOUNCE_BACK[bounce_back](np.asarray(obstacle)[:, columns], self.lattice.dtype, region)
+        self.collision = make_collision(collision, tau, self.lattice, collision_parameters)
+
+    def step(self):
+        """Advance the interior by one time step, halos must be current."""
+        src = self.lattice.directions(self.F)
+        dst = self.lattice.directions(self._F_next)
+
+        # STREAMING INTO THE INTERIOR, X NEIGHBOURS COME FROM THE HALOS
+        width = self.x1 - self.x0
+        for i in range(NL):
+            cx = CXS[i]
+            for dy, sy in _roll_slices(CYS[i], self.lattice.Ny):
+                np.copyto(dst[i][dy, 1:width + 1], src[i][sy, 1 - cx:width + 1 - cx])
+
+        # BOUNDARY, FLUID VARIABLES AND COLLISION, HALOS HOLD STALE BUT FINITE VALUES
+        self.boundary.after_streaming(dst, src)
+        self._moments(dst)
+        self.boundary.after_moments(dst, self.ux, self.uy)
+        self.collision.collide(self._F_next, self.rho, self.ux, self.uy)
+
+        self.F, self._F_next = self._F_next, self.F
+
+
+class ParallelStreamCollideEngine:
+    """StreamCollideEngine split into x slabs advanced concurrently by a thread pool.
+
+    Takes the same arguments plus the number of `workers` (default: all
+    cores) and of `slabs` (default: one per worker, each at least two columns
+    wide). Every slab performs exactly the arithmetic the serial engine does on
+    its columns, so results match StreamCollideEngine bit for bit; the matrix
+    product of the moment-space collisions may round differently per slab. The global
+    F, rho, ux and uy are assembled from the slabs on access.
+    """
+
+    def __init__(self, F, cyclinder, tau, layout='aos', dtype=np.float64, bounce_back='node',
+                 workers=None, slabs=None, collision='bgk', collision_parameters=None):
+        Ny, Nx, _ = F.shape
+        if bounce_back not in BOUNCE_BACK:
+            raise ValueError(f"unknown bounce-back scheme {bounce_back!r}, expected one of {tuple(BOUNCE_BACK)}")
+        if collision not in COLLISIONS:
+            raise ValueError(f"unknown collision operator {collision!r}, expected one of {tuple(COLLISIONS)}")
+        self.workers = workers or os.cpu_count()
+        n_slabs = slabs or self.workers
+        if Nx < 2 * n_slabs:
+            raise ValueError(f"{n_slabs} slabs need at least {2 * n_slabs} columns, the lattice has {Nx}")
+        self.lattice = Lattice(Ny, Nx, layout, dtype)
+        self.tau = tau
+        self.slabs = [_Slab(F, cyclinder, tau, x0, x1, layout, dtype, bounce_back, collision, collision_parameters)
+                      for x0, x1 in split_columns(Nx, n_slabs)]
+        self._pool = ThreadPoolExecutor(self.workers)
+        self._F = self.lattice.empty()                                      # assembled global fields
+        self._fields = {name: self.lattice.field() for name in ('rho', 'ux', 'uy')}
+        self._gathered = set()                                              # fields current since the last step
+
+    def _exchange_halos(self):
+        first, last = self.slabs[0], self.slabs[-1]
+
+        # ABSORBING BOUNDARIES ON THE OUTER SLABS
+        f_first, f_last = self.lattice.directions(first.F), self.lattice.directions(last.F)
+        for i in LEFTWARD:
+            f_last[i][:, -2] = f_last[i][:, -3]                             # right end velocity absorbtion
+        for i in RIGHTWARD:
+            f_first[i][:, 1] = f_first[i][:, 2]                             # left end velocity absorbtion
+
+        # ONLY THE DIRECTIONS THAT STREAM INTO A SLAB ARE COPIED
+        for k, slab in enumerate(self.slabs):
+            own = self.lattice.directions(slab.F)
+            left = self.lattice.directions(self.slabs[k - 1].F)
+            right = self.lattice.directions(self.slabs[(k + 1) % len(self.slabs)].F)
+            for i in RIGHTWARD:
+                own[i][:, 0] = left[i][:, -2]
+            for i in LEFTWARD:
+                own[i][:, -1] = right[i][:, 1]
+
+    def step(self):
+        """Advance the populations by one time step."""
+        self._exchange_halos()
+        for _ in self._pool.map(_Slab.step, self.slabs):                   # waits for every slab
+            pass
+        self._gathered.clear()
+
+    def _gather(self, name):
+        out = self._fields[name]
+        if name not in self._gathered:
+            for slab in self.slabs:
+                np.copyto(out[:, slab.x0:slab.x1], getattr(slab, name)[:, 1:-1])
+            self._gathered.add(name)
+        return out
+
+    @property
+    def rho(self):
+        return self._gather('rho')
+
+    @property
+    def ux(self):
+        return self._gather('ux')
+
+    @property
+    def uy(self):
+        return self._gather('uy')
+
+    @property
+    def F(self):
+        """Current populations in the lattice layout, copied from the slabs."""
+        if 'F' not in self._gathered:
+            out = self.lattice.directions(self._F)
+            for slab in self.slabs:
+                for f, g in zip(out, self.lattice.directions(slab.F)):
+                    np.copyto(f[:, slab.x0:slab.x1], g[:, 1:-1])
+            self._gathered.add('F')
+        return self._F
+
+    def populations(self):
+        """Current populations as an (Ny, Nx, NL) view."""
+        return self.lattice.to_aos(self.F)
+
+    def force(self):
+        """Momentum exchange force (x, y) on the obstacle in the last step, summed over the slabs."""
+        forces = [slab.boundary.force() for slab in self.slabs]
+        return sum(fx for fx, _ in forces), sum(fy for _, fy in forces)
+
+    def values(self, name, rows, columns):
+        """Field 'rho', 'ux' or 'uy' at the nodes (rows, columns), read from the slabs without assembling it."""
+        rows, columns = np.asarray(rows), np.asarray(columns)
+        out = np.empty(rows.shape, dtype=self.lattice.dtype)
+        for slab in self.slabs:
+            inside = (columns >= slab.x0) & (columns < slab.x1)
+            out[inside] = getattr(slab, name)[rows[inside], columns[inside] - slab.x0 + 1]
+        return out
+
+    def close(self):
+        """Stop the worker threads."""
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
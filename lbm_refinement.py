@@ -0,0 +1,200 @@
+# Nested lattice refinement for the D2Q9 Lattice-Boltzmann simulation
+# A fine patch with half the lattice spacing covers the obstacle and its wake inside
+# the coarse lattice. Per coarse step the patch takes two substeps; its outer ring
+# of nodes is filled from the coarse lattice, interpolated in space and time, and
+# the coarse nodes under the patch are replaced by the fine solution afterwards.
+# Populations are rescaled across the interface so the viscous stress is continuous,
+# with the factor of BGK collision; see RefinedStreamCollideEngine for the other operators.
+
+# LIBRARIES
+import numpy as np
+
+from lbm_engine import CXS, CYS, NL, WEIGHTS, StreamCollideEngine, shift_into
+
+RATIO = 2                                                                   # coarse over fine lattice spacing
+
+
+def fine_tau(tau):
+    """Relaxation time on the fine lattice: same velocity scale, twice the viscosity in lattice units."""
+    return 0.5 + RATIO * (tau - 0.5)
+
+
+def equilibrium(F):
+    """Equilibrium populations (..., NL) for the density and velocity of populations F (..., NL)."""
+    rho = F.sum(axis=-1)
+    ux = F @ CXS / rho
+    uy = F @ CYS / rho
+    cu = ux[..., None] * CXS + uy[..., None] * CYS
+    usq = ux**2 + uy**2
+    return rho[..., None] * WEIGHTS * (1 + 3*cu + 9*cu**2/2 - 3*usq[..., None]/2)
+
+
+def rescale(F, factor):
+    """Equilibrium part of F kept, non-equilibrium part multiplied by factor."""
+    feq = equilibrium(F)
+    return feq + factor * (F - feq)
+
+
+def refine_line(values):
+    """Linear interpolation of (n, ...) node values onto the 2n - 1 nodes of the halved spacing."""
+    out = np.empty((2*len(values) - 1,) + values.shape[1:], dtype=values.dtype)
+    out[::2] = values
+    out[1::2] = (values[:-1] + values[1:]) / 2
+    return out
+
+
+def refine_block(values):
+    """Bilinear interpolation of (ny, nx, ...) node values onto the (2ny - 1, 2nx - 1) nodes of the halved spacing."""
+    return refine_line(refine_line(values).swapaxes(0, 1)).swapaxes(0, 1)
+
+
+class _Patch(StreamCollideEngine):
+    """Fine lattice whose outermost ring of nodes is prescribed from outside.
+
+    Streams without the absorbing boundaries of the channel ends; the ring
+    receives wrapped-around values that are overwritten before the next substep.
+    """
+
+    def step(self):
+        src = self.lattice.directions(self.F)
+        dst = self.lattice.directions(self._F_next)
+        for i in range(NL):
+            shift_into(dst[i], src[i], CXS[i], CYS[i])
+        self.boundary.after_streaming(dst, src)
+        self._moments(dst)
+        self.boundary.after_moments(dst, self.ux, self.uy)
+        self.collision.collide(self._F_next, self.rho, self.ux, self.uy)
+        self.F, self._F_next = self._F_next, self.F
+
+
+class RefinedStreamCollideEngine:
+    """Coarse StreamCollideEngine with a nested patch of twice the resolution.
+
+    The patch spans coarse rows y0..y1 and columns x0..x1 (inclusive) and is
+    advanced with two substeps of fine_tau(tau) per coarse step. The coarse
+    nodes on its ring stay coarse-owned; the fine ring is rebuilt from them at
+    times t and t + 1/2 (linear in time), rescaling the non-equilibrium part
+    of the post-collision populations by (tau_f - 1) / (2 (tau - 1)), and the
+    coarse nodes inside get the fine populations rescaled back. The factor is
+    derived for BGK, where every non-equilibrium moment relaxes with tau; it is
+    also exact for 'regularized', whose post-collision non-equilibrium part is
+    the stress alone. With 'trt' and 'mrt' only the stress relaxes with tau and
+    the other moments get the same factor, an approximation. `fine_obstacle`
+    is the solid mask on the (2 (y1-y0) + 1, 2 (x1-x0) + 1) fine nodes, by
+    default the coarse mask with every solid node grown to its fine neighbours.
+    The obstacle must not touch the ring. Initial fine populations are
+    interpolated from F without rescaling. Other arguments as StreamCollideEngine;
+    rho, ux and uy are the coarse fields with the fine values under the patch.
+    """
+
+    def __init__(self, F, cyclinder, tau, patch, fine_obstacle=None, layout='aos', dtype=np.float64,
+                 bounce_back='node', collision='bgk', collision_parameters=None):
+        Ny, Nx, _ = F.shape
+        y0, y1, x0, x1 = patch
+        if not (0 < y0 and y0 + 2 <= y1 < Ny - 1 and 0 < x0 and x0 + 2 <= x1 < Nx - 1):
+            raise ValueError(f"patch {patch} must be at least 2 cells wide and lie inside the {Ny}x{Nx} lattice")
+        cyclinder = np.asarray(cyclinder, dtype=bool)
+        ring = np.zeros_like(cyclinder)
+        ring[y0:y1 + 1, x0:x1 + 1] = True
+        ring[y0 + 1:y1, x0 + 1:x1] = False
+        if (cyclinder & ring).any():
+            raise ValueError(f"the obstacle crosses the ring of patch {patch}")
+        if tau == 1:
+            raise ValueError("tau = 1 leaves no non-equilibrium part to rescale across the patch interface")
+        self.patch = patch
+        self.tau = tau
+        self.tau_fine = fine_tau(tau)
+        self._to_fine = (self.tau_fine - 1) / (RATIO * (tau - 1))          # post-collision rescaling, exact for BGK
+        self._to_coarse = 1 / self._to_fine
+        self.coarse = StreamCollideEngine(F, cyclinder, tau, layout, dtype, bounce_back,
+                                          collision, collision_parameters)
+        self.lattice = self.coarse.lattice
+
+        # FINE PATCH
+        if fine_obstacle is None:
+            solid = cyclinder[y0:y1 + 1, x0:x1 + 1].astype(float)
+            fine_obstacle = refine_block(solid) > 0                         # touching a coarse solid node
+        fine_obstacle = np.asarray(fine_obstacle, dtype=bool)
+        shape = (RATIO*(y1 - y0) + 1, RATIO*(x1 - x0) + 1)
+        if fine_obstacle.shape != shape:
+            raise ValueError(f"fine obstacle has shape {fine_obstacle.shape}, expected {shape}")
+        self.fine = _Patch(refine_block(F[y0:y1 + 1, x0:x1 + 1]), fine_obstacle, self.tau_fine, layout, dtype,
+                           bounce_back, collision, collision_parameters)
+        self._ring = self._fine_ring()                                      # ring at the current time
+
+    @property
+    def F(self):
+        return self.coarse.F
+
+    @property
+    def rho(self):
+        return self.coarse.rho
+
+    @property
+    def ux(self):
+        return self.coarse.ux
+
+    @property
+    def uy(self):
+        return self.coarse.uy
+
+    @property
+    def cells(self):
+        """Coarse plus fine lattice nodes."""
+        return self.coarse.lattice.Ny * self.coarse.lattice.Nx + self.fine.lattice.Ny * self.fine.lattice.Nx
+
+    @property
+    def updates_per_step(self):
+        """Node updates per coarse step, the fine patch counting twice."""
+        return self.coarse.lattice.Ny * self.coarse.lattice.Nx + RATIO * self.fine.lattice.Ny * self.fine.lattice.Nx
+
+    def populations(self):
+        """Current coarse populations as an (Ny, Nx, NL) view."""
+        return self.coarse.populations()
+
+    def close(self):
+        """Nothing to release, kept for symmetry with the other engines."""
+
+    def force(self):
+        """Momentum exchange force (x, y) on the obstacle in the last fine substep, in coarse lattice units.
+
+        A fine node carries 1/RATIO**2 of the momentum of a coarse one and a
+        substep lasts 1/RATIO of a step, so the fine force is divided by RATIO.
+        """
+        fx, fy = self.fine.force()
+        return fx / RATIO, fy / RATIO
+
+    def values(self, name, rows, columns):
+        """Field 'rho', 'ux' or 'uy' at the coarse nodes (rows, columns), fine values under the patch."""
+        return self.coarse.values(name, rows, columns)
+
+    def _fine_ring(self):
+        """Top, bottom, left and right edges of the fine ring from the current coarse populations."""
+        y0, y1, x0, x1 = self.patch
+        F = self.coarse.populations()
+        lines = (F[y0, x0:x1 + 1], F[y1, x0:x1 + 1], F[y0:y1 + 1, x0], F[y0:y1 + 1, x1])
+        return [refine_line(rescale(line, self._to_fine)) for line in lines]
+
+    def _set_ring(self, edges):
+        F = self.fine.populations()
+        top, bottom, left, right = edges
+        F[0], F[-1], F[:, 0], F[:, -1] = top, bottom, left, right
+
+    def step(self):
+        """Advance the coarse lattice by one step and the patch by two substeps."""
+        old = self._ring
+        self.coarse.step()
+        self._ring = self._fine_ring()
+
+        # SUBSTEPS AT t AND t + 1/2
+        self._set_ring(old)
+        self.fine.step()
+        self._set_ring([(a + b) / 2 for a, b in zip(old, self._ring)])
+        self.fine.step()
+
+        # RESTRICTION ONTO THE COARSE NODES INSIDE THE RING
+        y0, y1, x0, x1 = self.patch
+        inner = (slice(RATIO, -RATIO, RATIO), slice(RATIO, -RATIO, RATIO))
+        self.coarse.populations()[y0 + 1:y1, x0 + 1:x1] = rescale(self.fine.populations()[inner], self._to_coarse)
+        for name in ('rho', 'ux', 'uy'):
+            getattr(self.coarse, name)[y0 + 1:y1, x0 + 1:x1] = getattr(self.fine, name)[inner]
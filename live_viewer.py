@@ -0,0 +1,230 @@
+# Live view of a running simulation through a shared-memory double buffer
+# The solver publishes a downsampled 2D field into a named shared memory segment
+# without ever waiting; a viewer in its own process attaches by name, polls for new
+# frames and redraws only one persistent image artist by blitting. Viewers can be
+# started and closed at any time while the run goes on:
+#     python -m live_viewer <segment name>
+
+# LIBRARIES
+import argparse
+import math
+import multiprocessing
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+_NY, _NX, _LATEST, _CLOSED, _LOWER = range(5)                               # header slots
+_SEQUENCE, _STEP = 5, 7                                                     # two slots each, one per buffer
+_HEADER = 16                                                                # int64 header slots
+_TIMES = 2                                                                  # float64 time per buffer
+
+
+def _layout(ny, nx):
+    """Byte offsets of the times and the two frames, and the segment size."""
+    times = 8 * _HEADER
+    frames = times + 8 * _TIMES
+    return times, frames, frames + 2 * ny * nx * 4
+
+
+def _views(buffer, ny, nx):
+    times, frames, _ = _layout(ny, nx)
+    header = np.ndarray((_HEADER,), np.int64, buffer)
+    time_values = np.ndarray((_TIMES,), np.float64, buffer, times)
+    images = np.ndarray((2, ny, nx), np.float32, buffer, frames)
+    return header, time_values, images
+
+
+class FramePublisher:
+    """Solver side of the handoff: the latest frame of a 2D field in shared memory.
+
+    Fields of `shape` are strided down to at most `max_size` pixels along
+    either axis and stored as float32. publish() writes into the buffer no
+    viewer is pointed at, bumping its sequence number to odd before and to even
+    after the copy, then points viewers at it; it never blocks, a viewer that
+    was reading that buffer notices the changed sequence and reads again.
+    `origin` ('upper' or 'lower') tells viewers where row 0 goes. The
+    segment is named `name` (a fresh name by default) and removed by close().
+    """
+
+    def __init__(self, shape, name=None, max_size=512, origin='upper'):
+        if origin not in ('upper', 'lower'):
+            raise ValueError(f"unknown image origin {origin!r}, expected 'upper' or 'lower'")
+        self.stride = max(1, math.ceil(max(shape) / max_size))
+        ny, nx = (math.ceil(n / self.stride) for n in shape)
+        self._segment = shared_memory.SharedMemory(name=name, create=True, size=_layout(ny, nx)[2])
+        self._header, self._times, self._images = _views(self._segment.buf, ny, nx)
+        self._header[:] = 0
+        self._header[[_NY, _NX, _LOWER]] = ny, nx, origin == 'lower'
+        self._header[_LATEST] = -1                                         # nothing published yet
+        self.published = 0
+
+    @property
+    def name(self):
+        return self._segment.name
+
+    def publish(self, field, step=0, time=0.0):
+        """Copy the strided field into the free buffer and make it the latest."""
+        header = self._header
+        buffer = 1 if header[_LATEST] == 0 else 0
+        header[_SEQUENCE + buffer] += 1                                     # odd: being written
+        np.copyto(self._images[buffer], field[::self.stride, ::self.stride], casting='same_kind')
+        header[_STEP + buffer] = step
+        self._times[buffer] = time
+        header[_SEQUENCE + buffer] += 1                                     # even: complete
+        header[_LATEST] = buffer
+        self.published += 1
+
+    def close(self):
+        """Tell the viewers the run ended and remove the segment; attached viewers keep their mapping."""
+        self._header[_CLOSED] = 1
+        del self._header, self._times, self._images
+        self._segment.close()
+        self._segment.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FrameReader:
+    """Viewer side of the handoff, attached to the segment of a FramePublisher by name.
+
+    Attaching registers the segment with this process's resource tracker,
+    which would remove it when the viewer exits; the registration is dropped
+    again unless `shared_tracker`, for processes that share the publisher's
+    tracker (those started by `launch`).
+    """
+
+    def __init__(self, name, shared_tracker=False):
+        self._segment = shared_memory.SharedMemory(name=name)
+        if not shared_tracker:
+            resource_tracker.unregister(self._segment._name, 'shared_memory')  # the publisher owns it
+        header = np.ndarray((_HEADER,), np.int64, self._segment.buf)
+        self.shape = (int(header[_NY]), int(header[_NX]))
+        self.origin = 'lower' if header[_LOWER] else 'upper'
+        self._header, self._times, self._images = _views(self._segment.buf, *self.shape)
+        self._last = None                                                   # (buffer, sequence) of the last frame read
+
+    @property
+    def closed(self):
+        return bool(self._header[_CLOSED])
+
+    def read(self, retries=8):
+        """(frame copy, step, time) of the latest frame, or None if there is none newer than the last read."""
+        header = self._header
+        for _ in range(retries):
+            buffer = int(header[_LATEST])
+            if buffer < 0:
+                return None
+            sequence = int(header[_SEQUENCE + buffer])
+            if (buffer, sequence) == self._last:
+                return None
+            if sequence % 2:                                                # being rewritten, look again
+                continue
+            frame = self._images[buffer].copy()
+            step, time_value = int(header[_STEP + buffer]), float(self._times[buffer])
+            if header[_SEQUENCE + buffer] == sequence:                      # not overwritten while copying
+                self._last = (buffer, sequence)
+                return frame, step, time_value
+        return None
+
+    def close(self):
+        del self._header, self._times, self._images
+        self._segment.close()
+
+
+class LiveViewer:
+    """Window showing the frames of a FramePublisher as they arrive.
+
+    The image artist, drawn once, is updated with set_data and blitted over
+    the cached axes background, so a frame costs one image draw instead of a
+    full figure render. Colour limits are `clim` or, by default, the 1st and
+    99th percentiles of every frame. Closing the window detaches the viewer;
+    the run is not affected.
+    """
+
+    def __init__(self, name, cmap='bwr', clim=None, title=None, shared_tracker=False):
+        self.reader = FrameReader(name, shared_tracker)
+        self.cmap = cmap
+        self.clim = clim
+        self.title = title or name
+        self.frames = 0                                                     # frames drawn
+
+    def _limits(self, frame):
+        if self.clim is not None:
+            return self.clim
+        low, high = np.percentile(frame[::4, ::4], (1, 99))
+        return (low, high) if high > low else (low - 1, low + 1)
+
+    def open(self):
+        """Create the window with the persistent artists and cache its background."""
+        import matplotlib.pyplot as plt
+
+        self.figure, self.axes = plt.subplots()
+        self.figure.canvas.manager.set_window_title(self.title)
+        self.image = self.axes.imshow(np.zeros(self.reader.shape), cmap=self.cmap, origin=self.reader.origin,
+                                      animated=True)
+        self.label = self.axes.text(0.01, 0.97, '', transform=self.axes.transAxes, va='top', animated=True)
+        self.axes.set_axis_off()
+        self.figure.canvas.mpl_connect('draw_event', self._recapture)
+        plt.show(block=False)
+        self.figure.canvas.draw()                                           # fires _recapture
+
+    def _recapture(self, event):
+        """Cache the background after every full draw, e.g. of a resized window."""
+        self._background = self.figure.canvas.copy_from_bbox(self.axes.bbox)
+        self.axes.draw_artist(self.image)
+        self.axes.draw_artist(self.label)
+
+    def draw(self, frame, step, time_value):
+        """Show one frame: new image data and label blitted over the cached background."""
+        self.image.set_data(frame)
+        self.image.set_clim(*self._limits(frame))
+        self.label.set_text(f'step {step}, t = {time_value:.4g}')
+        canvas = self.figure.canvas
+        canvas.restore_region(self._background)
+        self.axes.draw_artist(self.image)
+        self.axes.draw_artist(self.label)
+        canvas.blit(self.axes.bbox)
+        self.frames += 1
+
+    def run(self, interval=0.02):
+        """Poll for new frames every `interval` seconds until the run ends or the window is closed."""
+        import matplotlib.pyplot as plt
+
+        self.open()
+        while plt.fignum_exists(self.figure.number):
+            latest = self.reader.read()
+            if latest is not None:
+                self.draw(*latest)
+            elif self.reader.closed:
+                break
+            self.figure.canvas.start_event_loop(interval)
+        plt.close(self.figure)
+        self.reader.close()
+
+
+def view(name, **options):
+    """Attach a LiveViewer to the segment `name` and run it until the run ends or the window is closed."""
+    LiveViewer(name, **options).run()
+
+
+def launch(name, **options):
+    """Start view(name, **options) in a new process, returns the started process."""
+    options = dict(options, shared_tracker=True)                            # spawned children share the tracker
+    process = multiprocessing.get_context('spawn').Process(target=view, args=(name,), kwargs=options, daemon=True)
+    process.start()
+    return process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Attach a live viewer to a running simulation')
+    parser.add_argument('name', help='shared memory segment printed by the run')
+    parser.add_argument('--cmap', default='bwr', help='matplotlib colormap')
+    parser.add_argument('--clim', type=float, nargs=2, help='fixed colour limits, default per-frame percentiles')
+    parser.add_argument('--interval', type=float, default=0.02, help='seconds between polls')
+    args = parser.parse_args()
+    LiveViewer(args.name, args.cmap, args.clim).run(args.interval)
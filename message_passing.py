@@ -0,0 +1,160 @@
+# MPI-style message passing between the processes of a distributed run
+# LocalCommunicator connects processes started by `launch` on one machine through
+# multiprocessing queues; MPICommunicator wraps mpi4py for runs across nodes. Both
+# offer the same small subset of MPI: point-to-point messages, barrier and collectives.
+
+# LIBRARIES
+import collections
+import multiprocessing
+import pickle
+import traceback
+from multiprocessing import resource_tracker
+
+import numpy as np
+
+REDUCTIONS = {'sum': np.add, 'max': np.maximum, 'min': np.minimum}
+_GATHER, _BCAST = -1, -2                                                    # tags reserved for the collectives
+
+
+class LocalCommunicator:
+    """Point-to-point messages and collectives between the processes of one `launch`.
+
+    Every rank owns an inbox queue; send() never blocks, recv() waits for the
+    message with the requested source and tag and buffers the others, so any
+    send/recv order is deadlock free. Objects, NumPy arrays included, are
+    pickled by send() itself, so a send buffer may be reused right away.
+    """
+
+    def __init__(self, rank, inboxes, barrier):
+        self.rank = rank
+        self.size = len(inboxes)
+        self._inboxes = inboxes
+        self._barrier = barrier
+        self._pending = collections.defaultdict(collections.deque)         # (source, tag) -> received objects
+
+    def send(self, obj, dest, tag=0):
+        self._inboxes[dest].put(pickle.dumps((self.rank, tag, obj), pickle.HIGHEST_PROTOCOL))
+
+    def recv(self, source, tag=0):
+        key = (source, tag)
+        while not self._pending[key]:
+            sender, sent_tag, obj = pickle.loads(self._inboxes[self.rank].get())
+            self._pending[(sender, sent_tag)].append(obj)
+        return self._pending[key].popleft()
+
+    def sendrecv(self, obj, dest, source, tag=0):
+        """Send obj to dest and return the message of the same tag from source."""
+        self.send(obj, dest, tag)
+        return self.recv(source, tag)
+
+    def barrier(self):
+        self._barrier.wait()
+
+    def gather(self, obj, root=0):
+        """List of every rank's obj on root, None elsewhere."""
+        if self.rank != root:
+            self.send(obj, root, _GATHER)
+            return None
+        return [obj if rank == root else self.recv(rank, _GATHER) for rank in range(self.size)]
+
+    def bcast(self, obj, root=0):
+        if self.rank == root:
+            for rank in range(self.size):
+                if rank != root:
+                    self.send(obj, rank, _BCAST)
+            return obj
+        return self.recv(root, _BCAST)
+
+    def allgather(self, obj):
+        return self.bcast(self.gather(obj))
+
+    def allreduce(self, value, op='sum'):
+        """Reduction of value over all ranks with op 'sum', 'max' or 'min', returned on every rank."""
+        values = self.gather(value)
+        if values is not None:
+            reduced = values[0]
+            for other in values[1:]:
+                reduced = REDUCTIONS[op](reduced, other)
+            values = reduced
+        return self.bcast(values)
+
+
+class MPICommunicator:
+    """The same interface on top of an mpi4py communicator, for runs under mpiexec."""
+
+    def __init__(self, comm=None):
+        try:
+            from mpi4py import MPI
+        except ImportError as error:
+            raise ImportError("MPICommunicator needs mpi4py, install it with `pip install mpi4py`") from error
+        self._comm = MPI.COMM_WORLD if comm is None else comm
+        self._ops = {'sum': MPI.SUM, 'max': MPI.MAX, 'min': MPI.MIN}
+        self.rank = self._comm.Get_rank()
+        self.size = self._comm.Get_size()
+
+    def send(self, obj, dest, tag=0):
+        self._comm.send(obj, dest=dest, tag=tag)
+
+    def recv(self, source, tag=0):
+        return self._comm.recv(source=source, tag=tag)
+
+    def sendrecv(self, obj, dest, source, tag=0):
+        return self._comm.sendrecv(obj, dest=dest, sendtag=tag, source=source, recvtag=tag)
+
+    def barrier(self):
+        self._comm.Barrier()
+
+    def gather(self, obj, root=0):
+        return self._comm.gather(obj, root=root)
+
+    def bcast(self, obj, root=0):
+        return self._comm.bcast(obj, root=root)
+
+    def allgather(self, obj):
+        return self._comm.allgather(obj)
+
+    def allreduce(self, value, op='sum'):
+        return self._comm.allreduce(value, op=self._ops[op])
+
+
+def _run(target, rank, inboxes, barrier, results, args):
+    comm = LocalCommunicator(rank, inboxes, barrier)
+    try:
+        results.put((rank, True, target(comm, *args)))
+    except BaseException:
+        barrier.abort()                                                     # release ranks waiting on this one
+        results.put((rank, False, traceback.format_exc()))
+
+
+def launch(target, processes, *args):
+    """Run target(comm, *args) on `processes` local ranks and return their results in rank order.
+
+    The local stand-in for mpiexec: each rank is a separate process with a
+    LocalCommunicator. If a rank raises, the others are terminated and a
+    RuntimeError carries the failing traceback. The ranks share this process's
+    resource tracker, so shared memory attached by several ranks is released once.
+    """
+    resource_tracker.ensure_running()
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(processes)]
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    ranks = [context.Process(target=_run, args=(target, rank, inboxes, barrier, results, args), daemon=True)
+             for rank in range(processes)]
+    for process in ranks:
+        process.start()
+
+    outputs, finished = [None] * processes, set()
+    try:
+        for _ in range(processes):
+            rank, ok, value = results.get()
+            if not ok:
+                raise RuntimeError(f"rank {rank} of {processes} failed:\n{value}")
+            outputs[rank] = value
+            finished.add(rank)
+    finally:
+        for rank, process in enumerate(ranks):
+            if rank not in finished:
+                process.terminate()
+            process.join()
+    return outputs
@@ -2,108 +2,86 @@
 # Developing Hagen-Poiseuille prabola by solving incompressible Navier-Stokes equations
 
 # LIBRARIES
+import argparse
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+import frame_writer
+from solvers import PeriodicPipeSolver
+
+# FUNCTION FOR RENDERING A SNAPSHOT
+def render_frame(figure, snapshot):
+    cx, cy, Vx = snapshot['cx'], snapshot['cy'], snapshot['Vx']
+    axes = figure.add_subplot()
+    contour = axes.contourf(cx, cy, Vx, levels=50, cmap='coolwarm')
+    figure.colorbar(contour, ax=axes)
+    axes.quiver(cx, cy, Vx, np.zeros_like(Vx))
+    axes.set_xlabel("Position along the Pipe")
+    axes.set_ylabel("Cross section of the Pipe")
+
+    profile = axes.twiny()                      # one velocity axis per frame
+    profile.plot(Vx[:, 1], cy[:, 1], color="white")
+    profile.set_xlabel("Flow Velocity")
+
 # MAIN FUNCTION FOR THE SIMULATION
-def main():
+def main(headless=False, frame_directory='frames', frame_policy='block', history_path=None):
     # CONSTANTS
     N = 11                                      # number of points
     mu = 0.01                                   # kinemiatic viscosity
-    dt = 0.2                                    # time step size
-    Nt = 100                                    # total time steps
+    dt = 0.2                                    # time step size when not adaptive
+    adaptive = True                             # largest stable dt from the diffusion and CFL numbers
+    safety = 0.9                                # fraction of the stability limit used
+    end_time = 20.0                             # simulated physical time
+    Nt = 100000                                 # upper bound on time steps
+    tolerances = {'change_linf': 1e-3}          # max velocity change per unit time at steady state
+    stop_at_steady_state = True                 # end the run once converged
 
     Pressure_Gradient = np.array([-1.0, 0.0])   # pressure gradient
 
-    element_length = 1.0/(N-1)                  # cell length
-    x_range = np.linspace(0.0, 1.0, N)          # x distances
-    y_range = np.linspace(0.0, 1.0, N)          # y distances
-    cx, cy = np.meshgrid(x_range, y_range)      # 2D mesh coordinates
+    solver = PeriodicPipeSolver(
+        n_points=N, viscosity=mu, time_step=dt, adaptive_time_step=adaptive, safety=safety,
+        end_time=end_time, max_steps=Nt, pressure_gradient=Pressure_Gradient, tolerances=tolerances,
+        stop_at_steady_state=stop_at_steady_state
+    ).setup()
 
-    # DISCRETIZED SPATIAL DERIVATIVES
-    def central_difference(field):              # function for periodic central difference approximation
-        diff = (
-            (
-            np.roll(field, shift=1, axis=1)     # step forward in x direction
-            -                                   # subtraction
-            np.roll(field, shift=-1, axis=1)    # step backward in x direction
-            ) / (                               # division
-                2 * element_length              # central difference approximation
-            )
-        )
-        return diff
-    
-    def laplace(field):                         # function for periodic laplace operator
-        diff = (
-            (
-            np.roll(field, shift=1, axis=1)     # step forward in x direction
-            +                                   # addition
-            np.roll(field, shift=1, axis=0)     # step forward in y direction
-            +                                   # addition
-            np.roll(field, shift=-1, axis=1)    # step backward in x direction
-            +                                   # addition
-            np.roll(field, shift=-1, axis=0)    # step backward in y direction
-            -                                   # subtraction
-            4 * field                           # field itself
-            ) / (                               # division
-                element_length**2               # five point stencil
-            )
-        )
-        return diff
-    
-    # INITIAL CONDITIONS
-    Vx_prev = np.ones((N, N))                   # initial velocity as 1 in domain
-    Vx_prev[0, :] = 0.0                         # boundary condition at upper wall
-    Vx_prev[-1, :] = 0.0                        # boundary condition at lower wall
-    
-    # TIME LOOP
-    for iter in range(Nt):
-        convection_x = (                        # calculating convection term
-            Vx_prev                             # previous velocity
-            *                                   # multiplication
-            central_difference(Vx_prev)         # difference term
-            )
-        
-        diffusion_x = (                         # calculating diffusion term
-            mu                                  # kinematic viscosity
-            *                                   # multiplication
-            laplace(Vx_prev)                    # laplace term
-            )
-
-        Vx_next = (                             # calculating updated velocity
-            Vx_prev                             # previous velocity
-            +                                   # addition
-            dt                                  # time step
-            *                                   # multiplication
-            (
-                -                               # negative
-                Pressure_Gradient[0]            # pressure gradient
-                +                               # addition
-                diffusion_x                     # diffusion
-                -                               # subtraction
-                convection_x                    # convection
-            )
-        )
+    # VISUALIZATION
+    if headless:                                # render frames off the solver thread
+        writer = frame_writer.FrameWriter(render_frame, frame_directory, policy=frame_policy)
 
-        Vx_next[0, :] = 0.0                     # boundary condition at upper wall
-        Vx_next[-1, :] = 0.0                    # boundary condition at lower wall
+    # TIME LOOP
+    while not solver.finished:
+        solver.step()                           # one explicit time step
 
-        Vx_prev = Vx_next                       # advancing in time
-    
         # VISUALIZATION
-        plt.contourf(cx, cy, Vx_next, levels=50, cmap='coolwarm')
-        plt.colorbar()
-        plt.quiver(cx, cy, Vx_next, np.zeros_like(Vx_next))
-        plt.xlabel("Position along the Pipe")
-        plt.ylabel("Cross section of the Pipe")
+        snapshot = {'cx': solver.cx, 'cy': solver.cy, 'Vx': solver.Vx}  # fields handed to the renderer
 
-        plt.twiny()
-        plt.plot(Vx_next[:, 1], cy[:, 1], color="white")
-        plt.xlabel("Flow Velocity")
+        if headless:
+            writer.submit(snapshot)             # queued for the background writer
+        else:
+            render_frame(plt.gcf(), snapshot)
+            plt.draw()
+            plt.pause(0.05)
+            plt.clf()
 
-        plt.draw()
-        plt.pause(0.05)
-        plt.clf()   
+    if headless:
+        writer.close()                          # flush the remaining frames
+        print(f'{writer.handled} frames written to {frame_directory}, {writer.dropped} dropped')
+    controller = solver.controller
+    print(f'{solver.iteration} time steps to t = {solver.time:.3f}, last dt = {controller.dt:.3e}, '
+          f'D = {controller.diffusion:.3f}')
+    print(f"relative error against the Poiseuille profile: {solver.monitor.history[-1]['poiseuille_error']:.2e}")
+    print(solver.timers.report())
+    if history_path is not None:
+        solver.monitor.save(history_path)       # convergence history as JSON
+    return solver.Vx
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Pressure driven periodic pipe flow')
+    parser.add_argument('--headless', action='store_true', help='write PNG frames instead of showing a window')
+    parser.add_argument('--frames', default='frames', help='frame directory in headless mode')
+    parser.add_argument('--frame-policy', default='block', choices=frame_writer.POLICIES,
+                        help='what to do when the frame queue is full')
+    parser.add_argument('--history', help='write the convergence history to this JSON file')
+    args = parser.parse_args()
+    main(args.headless, args.frames, args.frame_policy, args.history)
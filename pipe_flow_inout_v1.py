@@ -2,357 +2,237 @@
 # Includes basic SIMPLE algorithm
 
 # LIBRARIES
+import argparse
+import json
+import time
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+import checkpoint
+import frame_writer
+import live_viewer
+import snapshots
+from solvers import StaggeredPipeSolver
+from solvers.profiling import Profile
+
+# FUNCTION FOR RENDERING A SNAPSHOT
+def render_frame(figure, snapshot):
+    axes = figure.add_subplot()
+    coordinates_x, coordinates_y = snapshot['coordinates_x'], snapshot['coordinates_y']
+    velocity_x, velocity_y = snapshot['velocity_x'], snapshot['velocity_y']
+
+    contour = axes.contourf(                                        # plotting thr velocity field
+        coordinates_x,
+        coordinates_y,
+        velocity_x,
+        levels=10,
+        cmap='coolwarm'
+    )
+    figure.colorbar(contour, ax=axes)
+
+    axes.quiver(                                                    # plotting the x velocity components
+        coordinates_x[:, ::6],
+        coordinates_y[:, ::6],
+        velocity_x[:, ::6],
+        velocity_y[:, ::6],
+        alpha=0.4,
+    )
+
+    for column in (5, 40, 80):
+        axes.plot(                                                  # velocity parabola
+            column*snapshot['cell_lenght'] + velocity_x[: ,column],
+            coordinates_y[:, column],
+            color='white'
+        )
+
+    axes.set_title(f"Iteration {snapshot['iter']}, t = {snapshot['time']:.3f}/{snapshot['end_time']}")
+    axes.set_xlabel("Position along the Pipe")
+    axes.set_ylabel("Cross section of the Pipe")
+
 # CONSTANTS
 N_POINTS_Y = 15                                                     # number of points in y direction
 AR = 10                                                             # aspect ratio of the pipe
 MU = 0.01                                                           # kinematic viscosity
-TIME_STEP = 0.001                                                   # time step length
-N_TIME_STEPS = 5000                                                 # total time steps
+TIME_STEP = 0.001                                                   # time step length when not adaptive
+ADAPTIVE_TIME_STEP = True                                           # largest stable dt from CFL and diffusion numbers
+DIFFUSION = 'explicit'                                              # 'explicit', 'crank_nicolson' or 'backward_euler'
+SAFETY = 0.8                                                        # fraction of the stability limit used
+END_TIME = 5.0                                                      # simulated physical time
+N_TIME_STEPS = 5000                                                 # upper bound on time steps
 PLOT_EVERY = 50                                                     # plot frames per time step
-N_POISSON = 50                                                      # number of pressure poisson iterations
+LIVE_EVERY = 5                                                      # live viewer frames per time step
+N_POISSON = 50                                                      # number of pressure poisson iterations (jacobi)
+POISSON_SOLVER = 'multigrid'                                        # 'jacobi', 'sor', 'multigrid', 'direct' or 'dct'
+POISSON_TOL = 1e-6                                                  # relative residual tolerance of the pressure solve
+SNAPSHOT_EVERY = 50                                                 # field output cadence
+SNAPSHOT_DTYPE = np.float32                                         # precision of the stored fields
+CHECKPOINT_EVERY = 1000                                             # time steps between checkpoints
+CONVERGENCE_EVERY = 10                                              # time steps between convergence checks
+TOLERANCES = {                                                      # steady state when all stay below for 3 checks
+    'change_linf': 1e-2,                                            # max velocity change per unit time
+    'divergence': 1e-5,                                             # RMS velocity divergence
+    'mass_ratio_error': 1e-4,                                       # |inflow / outflow - 1|
+}
+STOP_AT_STEADY_STATE = True                                         # end the run once converged
+PROBES = [(2.0, 0.5), (5.0, 0.5), (9.0, 0.25)]                      # (x, y) velocity probe points
+TIMERS = True                                                       # per-phase timers, no-ops when False
 
 # MAIN FUNCTION FOR THE SIMULATION
-def main():
-    cell_lenght = 1.0 / (N_POINTS_Y-1)                              # cell lenght
-    n_points_x = (N_POINTS_Y-1) * AR + 1                            # number of points in x direction
-    x_range = np.linspace(0.0, 1.0*AR, n_points_x)                  # x coordinates
-    y_range = np.linspace(0.0, 1.0, N_POINTS_Y)                     # x coordinates
-    coordinates_x, coordinates_y = np.meshgrid(x_range, y_range)    # 2D mesh domain
-
-    # INITIAL CONDITIONS
-    velocity_x_prev = np.ones((N_POINTS_Y+1, n_points_x))           # initial velocity in x direction
-    velocity_x_prev[0, :] = -velocity_x_prev[1, :]                  # upper wall boundary condition
-    velocity_x_prev[-1, :] = -velocity_x_prev[-2, :]                # lower wall boundary condition
-
-    velocity_y_prev = np.ones((N_POINTS_Y, n_points_x+1))           # initial velocity in y direction
-    pressure_prev = np.zeros((N_POINTS_Y+1, n_points_x+1))          # initial uniform zero pressure
-
-    # PRE-ALLOCATING ARRAYS
-    velocity_x_tent = np.zeros_like(velocity_x_prev)                # pre-allocated tentative x velocity
-    velocity_x_next = np.zeros_like(velocity_x_prev)                # pre-allocated next x velocity
-    velocity_y_tent = np.zeros_like(velocity_y_prev)                # pre-allocated tentative y velocity
-    velocity_y_next = np.zeros_like(velocity_y_prev)                # pre-allocated next y velocity
-
-    plt.figure(figsize=(1.5*AR, 4))
-
-    # MAIN TIME LOOP
-    for iter in range(N_TIME_STEPS):
-        # UPDATING INTERIOR X VELOCITY WITH MOMENTUM EQUATION
-        diffusion_x = MU * (                                        # definition of diffusion equation
-            (
-                velocity_x_prev[1:-1, 2: ]                          # forward stencil point x direction
-                +
-                velocity_x_prev[2: , 1:-1]                          # backward stencil point x direction
-                +
-                velocity_x_prev[1:-1, :-2]                          # forward stencil point y direction
-                +
-                velocity_x_prev[ :-2, 1:-1]                         # backward stencil point y direction
-                - 4 *
-                velocity_x_prev[1:-1, 1:-1]                         # interior velocity field
-            ) / (
-                cell_lenght**2                                      # cell lenght squared
-            )
+def main(headless=False, frame_directory='frames', frame_policy='block', snapshot_directory=None,
+         checkpoint_path=None, restart_path=None, history_path=None, profile_steps=0, cprofile=False,
+         trace_memory=False, report_path=None, diagnostics_path=None, live=False):
+    solver = StaggeredPipeSolver(timers=TIMERS,
+
+        n_points_y=N_POINTS_Y, aspect_ratio=AR, viscosity=MU, time_step=TIME_STEP,
+        adaptive_time_step=ADAPTIVE_TIME_STEP, diffusion=DIFFUSION, safety=SAFETY, end_time=END_TIME,
+        max_steps=N_TIME_STEPS,
+        poisson_solver=POISSON_SOLVER, poisson_tol=POISSON_TOL, n_poisson=N_POISSON,
+        convergence_every=CONVERGENCE_EVERY, tolerances=TOLERANCES, stop_at_steady_state=STOP_AT_STEADY_STATE,
+        log_every=PLOT_EVERY, probes=PROBES, diagnostics_file=diagnostics_path
+    ).setup()
+
+    # CHECKPOINT AND RESTART
+    config = {                                                      # configuration stored with checkpoints
+        'N_POINTS_Y': N_POINTS_Y, 'AR': AR, 'MU': MU, 'TIME_STEP': TIME_STEP,
+        'ADAPTIVE_TIME_STEP': ADAPTIVE_TIME_STEP, 'DIFFUSION': DIFFUSION, 'SAFETY': SAFETY,
+        'POISSON_SOLVER': POISSON_SOLVER, 'POISSON_TOL': POISSON_TOL, 'N_POISSON': N_POISSON,
+    }
+    checkpointer = checkpoint.Checkpointer(checkpoint_path, CHECKPOINT_EVERY)
+    if restart_path is not None:                                    # resume a checkpointed run
+        arrays, state = checkpoint.restart(restart_path, config)
+        solver.load_state(dict(arrays, **state))
+    start = solver.iteration                                        # first time step to run
+
+    # FIELD OUTPUT
+    if snapshot_directory is not None:                              # written by a background thread
+        snapshot_writer = snapshots.SnapshotWriter(
+            snapshot_directory, SNAPSHOT_EVERY, SNAPSHOT_DTYPE,
+            attributes={'N_POINTS_Y': N_POINTS_Y, 'AR': AR, 'MU': MU, 'TIME_STEP': TIME_STEP}
         )
 
-        convection_x = (                                            # definition of convection equation
-            (
-                velocity_x_prev[1:-1, 2: ]**2                       # forward stencil point x direction
-                -
-                velocity_x_prev[1:-1, :-2]**2                       # backward stencil point x direction
-            ) / (
-                2 * cell_lenght
-            )
-            +
-            (
-                velocity_y_prev[1: ,1:-2]                           # top left stencil point y velocity
-                +
-                velocity_y_prev[1: ,2:-1]                           # top right stencil point y velocity
-                +
-                velocity_y_prev[ :-1, 1:-2]                         # bottom left stencil point y velocity
-                +
-                velocity_y_prev[ :-1, 2:-1]                         # bottom right stencil point y velocity
-            ) / 4
-            *
-            (
-                velocity_x_prev[2: , 1:-1]                          # forward stencil point y direction
-                -
-                velocity_x_prev[ :-2, 1:-1]                         # backward stencil point y direction
-            ) / (
-                2 * cell_lenght                                     # cell lenght squared
-            )
-        )
+    # VISUALIZATION
+    if headless:                                                    # render frames off the solver thread
+        writer = frame_writer.FrameWriter(render_frame, frame_directory, figsize=(1.5*AR, 4), policy=frame_policy)
+    elif not live:
+        plt.figure(figsize=(1.5*AR, 4))
+    if live:                                                        # velocity_x in shared memory for a viewer
+        publisher = live_viewer.FramePublisher(solver.vertex_velocities()[0].shape, origin='lower')
+        print(f'live velocity_x in shared memory {publisher.name}, attach more viewers with '
+              f'python -m live_viewer {publisher.name}')
+        live_viewer.launch(publisher.name, cmap='coolwarm')
+
+    # INSTRUMENTATION WINDOW OVER THE FIRST STEPS
+    timers = solver.timers                                          # the script phases are timed alongside
+    profile = Profile(solver, cprofile, trace_memory) if profile_steps else None
+    if profile is not None:
+        profile.start()
+    t0 = time.perf_counter()
 
-        pressure_gradient_x = (                                     # definition of pressure gradient
-            (
-                pressure_prev[1:-1, 2:-1]                           # forward stencil interior pressure in x
-                -
-                pressure_prev[1:-1, 1:-2]                           # backward stencil interior pressure in x
-            ) / (
-                cell_lenght                                         # cell lenght
-            )
-        )
-    
-        velocity_x_tent[1:-1, 1:-1] = (                             # interior tentative velocity in x direction
-            velocity_x_prev[1:-1, 1:-1]                             # previous tentative velocity in x direction
-            +
-            TIME_STEP                                               # per time step
-            *
-            (
-                -pressure_gradient_x                                # negative pressure gradient
-                +
-                diffusion_x                                         # effect of diffusion
-                -
-                convection_x                                        # effect of convection
-            )
-        )
-
-        velocity_x_tent[1:-1, 0] = 1.0                              # left edge boundary condition
-        velocity_x_tent[1:-1, -1] = velocity_x_tent[1:-1, -2]       # right edge boundary condition
-        velocity_x_tent[0, :] = -velocity_x_tent[1, :]              # bottom edge boundary condition
-        velocity_x_tent[-1, :] = -velocity_x_tent[-2, :]            # top edge boundary condition
-
-        # UPDATING INTERIOR X VELOCITY WITH MOMENTUM EQUATION
-        diffusion_y = MU * (                                        # definition of diffusion equation
-            (
-                velocity_y_prev[1:-1, 2: ]                          # forward stencil point x direction
-                +
-                velocity_y_prev[2: , 1:-1]                          # backward stencil point x direction
-                +
-                velocity_y_prev[1:-1, :-2]                          # forward stencil point y direction
-                +
-                velocity_y_prev[ :-2, 1:-1]                         # backward stencil point y direction
-                - 4 *
-                velocity_y_prev[1:-1, 1:-1]                         # interior velocity field
-            ) / (
-                cell_lenght**2                                      # cell lenght squared
-            )
-        )
-
-        convection_y = (                                            # definition of convection equation
-            (
-                velocity_x_prev[2:-1, 1: ]                          # prefactor forward based on x velocity
-                +
-                velocity_x_prev[2:-1, :-1]                          # prefactor backward based on x velocity
-                +
-                velocity_x_prev[1:-2, 1: ]                          # prefactor forward based on x velocity
-                +
-                velocity_x_prev[1:-2, :-1]                          # prefactor backward based on x velocity
-            ) / 4
-            *
-            (
-                velocity_y_prev[1:-1, 2: ]                          # forward stencil point x direction
-                -
-                velocity_y_prev[1:-1, :-2]                          # backward stencil point x direction
-            ) / (
-                2 * cell_lenght                                     # cell lenght
-            )
-            +
-            (
-                velocity_y_prev[2: ,1:-1]**2                        # top left stencil point y velocity
-                -
-                velocity_y_prev[ :-2 ,1:-1]**2                      # top right stencil point y velocity
-            ) / (
-                2* cell_lenght                                      # cell lenght
-            )
-        )
-
-        pressure_gradient_y = (                                     # definition of pressure gradient
-            (
-                pressure_prev[2:-1, 1:-1]                           # forward stencil interior pressure in x
-                -
-                pressure_prev[1:-2, 1:-1]                           # backward stencil interior pressure in x
-            ) / (
-                cell_lenght                                         # cell lenght
-            )
-        )
-
-        velocity_y_tent[1:-1, 1:-1] = (                             # interior tentative velocity in x direction
-            velocity_y_prev[1:-1, 1:-1]                             # previous tentative velocity in x direction
-            +
-            TIME_STEP                                               # per time step
-            *
-            (
-                -pressure_gradient_y                                # negative pressure gradient
-                +
-                diffusion_y                                         # effect of diffusion
-                -
-                convection_y                                        # effect of convection
-            )
-        )
-
-        velocity_y_tent[1:-1, 0] = -velocity_y_tent[1:-1, -1]       # left edge boundary condition
-        velocity_y_tent[1:-1, -1] = velocity_y_tent[1:-1, -2]       # right edge boundary condition
-        velocity_y_tent[0, :] = 0.0                                 # bottom edge boundary condition
-        velocity_y_tent[-1, :] = 0.0                                # top edge boundary condition
-
-        # COMPUTING DIVERGENCE FOR PRESSURE POISSON PROBLEM
-        divergence = (                                                      # definition of divergence
-            (
-                velocity_x_tent[1:-1, 1:]                                   # tentative velocity interior forward in x direction
-                -
-                velocity_x_tent[1:-1, :-1]                                  # tentative velocity interior backward in x direction
-            ) / (
-                cell_lenght                                                 # cell lenght
-            )
-            +
-            (
-                velocity_y_tent[1: ,1:-1]                                   # tentative velocity interior forward in y direction
-                -
-                velocity_y_tent[ :-1, 1:-1]                                 # tentative velocity interior backward in x direction
-            ) / (
-                cell_lenght                                                 # cell lenght
-            )
-        )
-
-        density = 1                                                         # fluid density
-        pressure_poisson_rhs = divergence * density  / TIME_STEP            # pressure poisson equation right hand side
-
-        # SOLVING PRESSURE CORRECTION POISSON EQUATION
-        pressure_corr_prev = np.zeros_like(pressure_prev)                   # previous pressure correction
-
-        for _ in range(N_POISSON):                                          # iteration for specific poisson iteration count
-            pressure_corr_next = np.zeros_like(pressure_corr_prev)          # next pressure correction
-            pressure_corr_next[1:-1, 1:-1] = 1/4 * (
-                pressure_corr_prev[1:-1, 2: ]                               # interior pressure forward in x direction
-                +
-                pressure_corr_prev[2: , 1:-1]                               # interior pressure forward in y direction
-                +
-                pressure_corr_prev[1:-1, :-2]                               # interior pressure backward in x direction
-                +
-                pressure_corr_prev[ :-2, 1:-1]                              # interior pressure backward in y direction
-                -
-                cell_lenght**2                                              # cell lenght squared
-                *
-                pressure_poisson_rhs                                        # pressure poisson right hand side
-            )
-
-            pressure_corr_next[1:-1, 0] = pressure_corr_next[1:-1, 1]       # homogenous pressure left boundary condition
-            pressure_corr_next[1:-1, -1] = -pressure_corr_next[1:-1, -2]    # homogenous pressure right boundary condition
-            pressure_corr_next[0, :] = pressure_corr_next[1, :]             # homogenous pressure top boundary condition
-            pressure_corr_next[-1, :] = pressure_corr_next[-2, :]           # homogenous pressure bottom boundary condition
-
-            pressure_corr_prev = pressure_corr_next                         # advance in smoothing to enforce incompressibility
-
-        pressure_next = pressure_prev + pressure_corr_next                  # updatingthe pressure
-        
-        # UPDATE VELOCITY
-        pressure_corr_grad_x = (                                            # pressure correction gradient in x
-            (
-                pressure_corr_next[1:-1, 2:-1]                              # interior pressure forward in x direction
-                -
-                pressure_corr_next[1:-1, 1:-2]                              # interior pressure backward in x direction
-            ) / (
-                cell_lenght                                                 # cell lenght
-            )
-        )
-
-        velocity_x_next[1:-1, 1:-1] = (                                     # velocity ıpdate in x direction
-            velocity_x_tent[1:-1, 1:-1]                                     # tentative velocity in x
-            -
-            TIME_STEP                                                       # time step lenght
-            *
-            pressure_corr_grad_x                                            # pressure correction gradient in x direction
-        )
-
-        pressure_corr_grad_y = (                                            # pressure correction gradient in y
-            (
-                pressure_corr_next[2:-1, 1:-1]                              # interior pressure forward in y direction
-                -
-                pressure_corr_next[1:-2, 1:-1]                              # interior pressure backward in y direction
-            ) / (
-                cell_lenght                                                 # cell lenght
-            )
-        )
-
-        velocity_y_next[1:-1, 1:-1] = (                                     # velocity ıpdate in y direction
-            velocity_y_tent[1:-1, 1:-1]                                     # tentative velocity in y
-            -
-            TIME_STEP                                                       # time step lenght
-            *
-            pressure_corr_grad_y                                            # pressure correction gradient in y direction
-        )
-        
-        velocity_x_next[1:-1, 0] = 1.0                              # left edge velocity boundary condition
-        inflow_mass_rate_next = np.sum(velocity_x_next[1:-1, 0])    # inlet total velocity
-        outflow_mass_rate_next = np.sum(velocity_x_next[1:-1, -2])  # outlet total velocity
-        mrr = inflow_mass_rate_next / outflow_mass_rate_next        # mass rate ratio
-        velocity_x_next[1:-1, -1] = velocity_x_next[1:-1, -2] * mrr # right edge velocity boundary condition
-        velocity_x_next[0, :] = -velocity_x_next[1, :]              # bottom edge velocity boundary condition
-        velocity_x_next[-1, :] = -velocity_x_next[-2, :]            # top edge velocity boundary condition
-
-        velocity_y_next[1:-1, 0] = -velocity_y_next[1:-1, -1]       # left edge velocity boundary condition
-        velocity_y_next[1:-1, -1] = velocity_y_next[1:-1, -2]       # right edge velocity boundary condition
-        velocity_y_next[0, :] = 0.0                                 # bottom edge velocity boundary condition
-        velocity_y_next[-1, :] = 0.0                                # top edge velocity boundary condition
-
-        # REPEATING THE ITERATIONS
-        velocity_x_prev = velocity_x_next                           # advance in time for x velocity
-        velocity_y_prev = velocity_y_next                           # advance in time for y velocity
-        pressure_prev = pressure_next                               # advance in time for pressure
+    # MAIN TIME LOOP
+    while not solver.finished:
+        iter = solver.iteration                                     # index of the step about to run
+        solver.step()                                               # momentum, pressure correction, projection
+
+        with timers('output'):
+            if checkpointer.due(solver.iteration):
+                checkpointer.save(
+                    solver.iteration, solver.arrays(), config, time=solver.time, dt=solver.controller.dt
+                )
+
+            if snapshot_directory is not None:
+                snapshot_writer.write(
+                    iter, solver.time,
+                    velocity_x=solver.velocity_x, velocity_y=solver.velocity_y, pressure=solver.pressure
+                )
 
         # VISUALIZATION
+        if live and iter % LIVE_EVERY == 0:
+            with timers('plotting'):                                # never waits for the viewer
+                publisher.publish(solver.vertex_velocities()[0], step=iter, time=solver.time)
         if iter % PLOT_EVERY == 0:
-            velocity_x_vertex_centered = (                          # vetices to be plotted in x
-                (
-                    velocity_x_next[1: , :]                         # left values
-                    +
-                    velocity_x_next[ :-1, :]                        # right values
-                ) / 2                                               # calculating the mean value
-            )
-
-            velocity_y_vertex_centered = (                          # vetices to be plotted in y
-                (
-                    velocity_y_next[:, 1:]                          # top values
-                    +
-                    velocity_y_next[:, :-1]                         # bottom values
-                ) / 2                                               # calculating the mean value
-            )
-
-            plt.contourf(                                           # plotting thr velocity field
-                coordinates_x,
-                coordinates_y,
-                velocity_x_vertex_centered,
-                levels=10,
-                cmap='coolwarm'
-            )
-            plt.colorbar()
-
-            plt.quiver(                                             # plotting the x velocity components
-                coordinates_x[:, ::6],
-                coordinates_y[:, ::6],
-                velocity_x_vertex_centered[:, ::6],
-                velocity_y_vertex_centered[:, ::6],
-                alpha=0.4,
-            )
-
-            plt.plot(                                               # velocity parabola
-                5*cell_lenght + velocity_x_vertex_centered[: ,5],
-                coordinates_y[:, 5],
-                color='white'
-            )
-
-            plt.plot(                                               # velocity parabola
-                40*cell_lenght + velocity_x_vertex_centered[: ,40],
-                coordinates_y[:, 40],
-                color='white'
-            )
-
-            plt.plot(                                               # velocity parabola
-                80*cell_lenght + velocity_x_vertex_centered[: ,80],
-                coordinates_y[:, 80],
-                color='white'
-            )
-
-            plt.title(f'Iteration {iter}/{N_TIME_STEPS}')
-            plt.xlabel("Position along the Pipe")
-            plt.ylabel("Cross section of the Pipe")
-
-            plt.draw()
-            plt.pause(0.05)
-            plt.clf()
+            with timers('plotting'):
+                print(
+                    f'Iteration {iter}: {POISSON_SOLVER} {solver.poisson_solver.stats.iterations} iterations, '
+                    f'residual {solver.poisson_solver.stats.residual:.2e}, '
+                    f'divergence {solver.divergence():.2e}'
+                )
+
+                velocity_x_vertex_centered, velocity_y_vertex_centered = solver.vertex_velocities()
+                snapshot = {                                        # fields handed to the renderer
+                    'iter': iter,
+                    'time': solver.time,
+                    'end_time': END_TIME,
+                    'cell_lenght': solver.cell_lenght,
+                    'coordinates_x': solver.coordinates_x,
+                    'coordinates_y': solver.coordinates_y,
+                    'velocity_x': velocity_x_vertex_centered,
+                    'velocity_y': velocity_y_vertex_centered,
+                }
+
+                if headless:
+                    writer.submit(snapshot)                         # queued for the background writer
+                elif not live:                                      # the viewer process replaces the window
+                    render_frame(plt.gcf(), snapshot)
+                    plt.draw()
+                    plt.pause(0.05)
+                    plt.clf()
+
+        if profile is not None and profile.active and solver.iteration - start == profile_steps:
+            profile.stop()                                          # only the first profile_steps steps
+    seconds = time.perf_counter() - t0
+    if profile is not None and profile.active:
+        profile.stop()                                              # the run ended inside the window
+
+    if headless:
+        writer.close()                                              # flush the remaining frames
+        print(f'{writer.handled} frames written to {frame_directory}, {writer.dropped} dropped')
+    if live:
+        publisher.close()                                           # viewers see the run has ended
+    if snapshot_directory is not None:
+        snapshot_writer.close()                                     # flush the remaining snapshots
+
+    print(
+        f'{solver.iteration - start} time steps to t = {solver.time:.3f}, '
+        f'mean {POISSON_SOLVER} iterations per step: {np.mean(solver.poisson_iterations):.1f}, '
+        f'final divergence {solver.divergence():.2e}'
+    )
+    print(timers.report())
+    if profile is not None:
+        print(profile.table())
+    if report_path is not None:                                     # phase timings for baseline comparisons
+        with open(report_path, 'w') as file:
+            json.dump({
+                'steps': solver.iteration - start, 'seconds': seconds, 'phases': timers.as_dict(),
+                'profile': profile.as_dict() if profile is not None else None,
+            }, file, indent=1)
+    if history_path is not None:
+        solver.monitor.save(history_path)                           # convergence history as JSON
+    last = solver.diagnostics.last()
+    print(f"wall shear stress: bottom {last['shear_bottom']:.4e}, top {last['shear_top']:.4e} "
+          f"(outlet {last['shear_bottom_outlet']:.4e}, {last['shear_top_outlet']:.4e})")
+    solver.close()                                                  # writes the remaining diagnostics rows
+    return solver.velocity_x, solver.velocity_y, solver.pressure
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Transient internal pipe flow with inflow and outflow')
+    parser.add_argument('--headless', action='store_true', help='write PNG frames instead of showing a window')
+    parser.add_argument('--frames', default='frames', help='frame directory in headless mode')
+    parser.add_argument('--frame-policy', default='block', choices=frame_writer.POLICIES,
+                        help='what to do when the frame queue is full')
+    parser.add_argument('--snapshots', help='directory for periodic velocity/pressure snapshots')
+    parser.add_argument('--checkpoint', help='checkpoint file, rewritten every CHECKPOINT_EVERY steps')
+    parser.add_argument('--restart', help='resume from this checkpoint file')
+    parser.add_argument('--history', help='write the convergence history to this JSON file')
+    parser.add_argument('--profile-steps', type=int, default=0, help='instrument the first N time steps')
+    parser.add_argument('--cprofile', action='store_true', help='run cProfile over the instrumented steps')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='trace the memory each phase allocates over the instrumented steps')
+    parser.add_argument('--report', help='write the phase timings and the instrumented steps to this JSON file')
+    parser.add_argument('--diagnostics', help='write the per-step wall shear and probe velocities to this CSV file')
+    parser.add_argument('--live', action='store_true',
+                        help='show velocity_x in a viewer process fed through shared memory, never slowing the run')
+    args = parser.parse_args()
+    main(args.headless, args.frames, args.frame_policy, args.snapshots, args.checkpoint, args.restart,
+         args.history, args.profile_steps, args.cprofile, args.tracemalloc, args.report, args.diagnostics,
+         args.live)
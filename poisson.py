@@ -0,0 +1,417 @@
+# Pressure correction Poisson solvers for the staggered pipe flow
+# All backends solve the same discrete problem on a (ny+2, nx+2) array whose
+# outer rows and columns are ghost cells:
+#     p[1:-1, 2:] + p[2:, 1:-1] + p[1:-1, :-2] + p[:-2, 1:-1] - 4 p[1:-1, 1:-1] = h**2 rhs
+# Each side is either 'neumann' (ghost = neighbour) or 'dirichlet' (ghost = -neighbour,
+# zero on the face). The default matches pipe_flow_inout_v1: Neumann everywhere
+# except the outlet. The Jacobi, direct and DCT backends also solve batches, arrays
+# with leading member axes holding one independent problem per member.
+
+# LIBRARIES
+import numpy as np
+
+PIPE_BOUNDARIES = {'left': 'neumann', 'right': 'dirichlet', 'bottom': 'neumann', 'top': 'neumann'}
+
+
+def _require_scipy():
+    try:
+        import scipy                                                        # noqa: F401
+    except ImportError as error:
+        raise ImportError("this Poisson backend needs scipy, use 'jacobi' without it") from error
+
+
+class PoissonStats:
+    """Convergence record of the latest solve."""
+
+    def __init__(self):
+        self.iterations = 0                                                 # sweeps, cycles or 1 for direct solves
+        self.residual = np.nan                                              # relative L2 residual
+
+    def __repr__(self):
+        return f"PoissonStats(iterations={self.iterations}, residual={self.residual:.3e})"
+
+
+class PoissonSolver:
+    """Common setup, boundary handling and residual evaluation of the backends."""
+
+    batched = False                                                         # solves stacks of problems at once
+
+    def __init__(self, shape, cell_length, boundaries=None, tol=1e-6, max_iter=1000):
+        self.shape = tuple(shape)                                           # full array shape including ghosts
+        self.ny, self.nx = self.shape[0] - 2, self.shape[1] - 2             # interior unknowns
+        self.h = cell_length
+        self.boundaries = dict(PIPE_BOUNDARIES, **(boundaries or {}))
+        for side, kind in self.boundaries.items():
+            if kind not in ('neumann', 'dirichlet'):
+                raise ValueError(f"unknown boundary {kind!r} on {side}, expected 'neumann' or 'dirichlet'")
+        self.tol = tol
+        self.max_iter = max_iter
+        self.stats = PoissonStats()
+        self._sign = {side: 1.0 if kind == 'neumann' else -1.0 for side, kind in self.boundaries.items()}
+
+    @property
+    def singular(self):
+        return all(kind == 'neumann' for kind in self.boundaries.values())
+
+    def apply_boundary(self, p):
+        """Fill the ghost cells of p in place."""
+        p[..., 1:-1, 0] = self._sign['left'] * p[..., 1:-1, 1]
+        p[..., 1:-1, -1] = self._sign['right'] * p[..., 1:-1, -2]
+        p[..., 0, :] = self._sign['bottom'] * p[..., 1, :]
+        p[..., -1, :] = self._sign['top'] * p[..., -2, :]
+
+    def residual(self, p, rhs):
+        """Relative L2 norm of h**2 rhs - laplace(p) over the interior, the largest one of a batch."""
+        laplace = p[..., 1:-1, 2:] + p[..., 2:, 1:-1] + p[..., 1:-1, :-2] + p[..., :-2, 1:-1] - 4*p[..., 1:-1, 1:-1]
+        if p.ndim > 2:                                                      # one norm per member
+            error = np.sqrt(np.sum((self.h**2*rhs - laplace)**2, axis=(-2, -1)))
+            scale = np.sqrt(np.sum(rhs**2, axis=(-2, -1))) * self.h**2
+            absolute = np.sqrt(np.sum(laplace**2, axis=(-2, -1)))
+            return float(np.max(np.where(scale > 0, error / np.where(scale > 0, scale, 1.0), absolute)))
+        scale = np.linalg.norm(rhs) * self.h**2
+        return np.linalg.norm(self.h**2*rhs - laplace) / scale if scale > 0 else np.linalg.norm(laplace)
+
+    def operator_1d(self, n, low, high):
+        """Sparse 1D second difference with the ghost cells eliminated."""
+        from scipy import sparse
+        diagonal = np.full(n, -2.0)
+        diagonal[0] += self._sign[low]
+        diagonal[-1] += self._sign[high]
+        return sparse.diags([np.ones(n-1), diagonal, np.ones(n-1)], [-1, 0, 1], format='csr')
+
+    def matrix(self):
+        """Sparse 2D operator on the row-major interior unknowns."""
+        from scipy import sparse
+        Lx = self.operator_1d(self.nx, 'left', 'right')
+        Ly = self.operator_1d(self.ny, 'bottom', 'top')
+        return (sparse.kron(sparse.identity(self.ny), Lx) + sparse.kron(Ly, sparse.identity(self.nx))).tocsr()
+
+    def state(self):
+        """Arrays that carry over between solves, for checkpoints."""
+        return {}
+
+    def load_state(self, arrays):
+        pass
+
+    def solve(self, rhs, out=None):
+        """Pressure correction for the interior right hand side rhs, ghosts filled.
+
+        Batched backends accept rhs with leading member axes and solve every
+        member independently, bit for bit as one at a time.
+        """
+        rhs = np.asarray(rhs, dtype=float)
+        if rhs.ndim > 2 and not self.batched:
+            raise ValueError(f"{type(self).__name__} solves one problem at a time, got rhs of shape {rhs.shape}")
+        if out is None:
+            out = np.zeros(rhs.shape[:-2] + self.shape)
+        self._solve(rhs, out)
+        self.apply_boundary(out)
+        self.stats.residual = self.residual(out, rhs)
+        return out
+
+
+class JacobiSolver(PoissonSolver):
+    """The original fixed-count Jacobi sweeps starting from zero, optionally stopped early at tol.
+
+    With tol=None it performs exactly max_iter sweeps like N_POISSON in the
+    script, but ping-pongs between two buffers instead of allocating one per sweep.
+    """
+
+    batched = True
+
+    def __init__(self, shape, cell_length, boundaries=None, tol=None, max_iter=50):
+        super().__init__(shape, cell_length, boundaries, tol, max_iter)
+        self._next = np.zeros(self.shape)
+
+    def _solve(self, rhs, out):
+        h2_rhs = self.h**2 * rhs
+        if self._next.shape != out.shape:                                   # batch size changed
+            self._next = np.zeros(out.shape)
+        prev, next_ = out, self._next
+        prev[...] = 0.0
+        sweeps = 0
+        for sweeps in range(1, self.max_iter + 1):
+            interior = next_[..., 1:-1, 1:-1]
+            np.add(prev[..., 1:-1, 2:], prev[..., 2:, 1:-1], out=interior)
+            interior += prev[..., 1:-1, :-2]
+            interior += prev[..., :-2, 1:-1]
+            interior -= h2_rhs
+            interior *= 1/4
+            self.apply_boundary(next_)
+            prev, next_ = next_, prev
+            if self.tol is not None and self.residual(prev, rhs) < self.tol:
+                break
+        if prev is not out:
+            out[...] = prev
+        self.stats.iterations = sweeps
+
+
+class DirectSolver(PoissonSolver):
+    """Sparse LU factorization computed once and reused, the operator never changes."""
+
+    batched = True
+
+    def __init__(self, shape, cell_length, boundaries=None, tol=None, max_iter=1):
+        super().__init__(shape, cell_length, boundaries, tol, max_iter)
+        _require_scipy()
+        from scipy.sparse.linalg import splu
+        A = self.matrix().tolil()
+        if self.singular:
+            A[0, :] = 0.0                                                   # pin one value, pressure is defined up to a constant
+            A[0, 0] = 1.0
+        self._lu = splu(A.tocsc())
+
+    def _solve(self, rhs, out):
+        b = (self.h**2 * rhs).reshape(-1, self.ny*self.nx).T               # one column per member
+        if self.singular:
+            b = b.copy()
+            b[0] = 0.0
+        out[..., 1:-1, 1:-1] = self._lu.solve(b).T.reshape(rhs.shape)
+        self.stats.iterations = 1
+
+
+class DCTSolver(PoissonSolver):
+    """Fast direct solver diagonalizing the operator with discrete cosine/sine transforms.
+
+    Every Neumann/Dirichlet combination of a side pair has a trigonometric
+    eigenbasis on this cell-centred grid: Neumann-Neumann DCT-II,
+    Dirichlet-Dirichlet DST-II, and the mixed pairs DCT-IV/DST-IV.
+    """
+
+    _TRANSFORMS = {
+        ('neumann', 'neumann'): ('dct', 2, 0.0),
+        ('dirichlet', 'dirichlet'): ('dst', 2, 1.0),
+        ('neumann', 'dirichlet'): ('dct', 4, 0.5),
+        ('dirichlet', 'neumann'): ('dst', 4, 0.5),
+    }
+
+    batched = True
+
+    def __init__(self, shape, cell_length, boundaries=None, tol=None, max_iter=1):
+        super().__init__(shape, cell_length, boundaries, tol, max_iter)
+        _require_scipy()
+        self._x = self._TRANSFORMS[(self.boundaries['left'], self.boundaries['right'])]
+        self._y = self._TRANSFORMS[(self.boundaries['bottom'], self.boundaries['top'])]
+        eig_x = 2*np.cos(np.pi*(np.arange(self.nx) + self._x[2])/self.nx) - 2
+        eig_y = 2*np.cos(np.pi*(np.arange(self.ny) + self._y[2])/self.ny) - 2
+        eigenvalues = eig_y[:, None] + eig_x[None, :]
+        if self.singular:
+            eigenvalues[0, 0] = 1.0                                         # zero mean solution
+        self._inverse = 1.0 / eigenvalues
+        if self.singular:
+            self._inverse[0, 0] = 0.0
+
+    @staticmethod
+    def _forward(a, transform, axis):
+        from scipy import fft
+        kind, type_, _ = transform
+        return getattr(fft, kind)(a, type=type_, axis=axis, norm='ortho')
+
+    @staticmethod
+    def _backward(a, transform, axis):
+        from scipy import fft
+        kind, type_, _ = transform
+        return getattr(fft, 'i' + kind)(a, type=type_, axis=axis, norm='ortho')
+
+    def _solve(self, rhs, out):
+        spectrum = self._forward(self._forward(self.h**2 * rhs, self._x, -1), self._y, -2)
+        spectrum *= self._inverse
+        out[..., 1:-1, 1:-1] = self._backward(self._backward(spectrum, self._y, -2), self._x, -1)
+        self.stats.iterations = 1
+
+
+class MultigridSolver(PoissonSolver):
+    """Multigrid V-cycles with damped Jacobi smoothing, repeated until the residual drops below tol.
+
+    The hierarchy halves both directions with cell-centred linear
+    interpolation P; coarse operators are the Galerkin products P^T A P, so any
+    grid size and boundary combination coarsens consistently. The coarsest
+    level (either side below `min_size` cells) is solved with a cached LU.
+    """
+
+    def __init__(self, shape, cell_length, boundaries=None, tol=1e-6, max_iter=100,
+                 smoothing=2, omega=0.8, min_size=4):
+        super().__init__(shape, cell_length, boundaries, tol, max_iter)
+        _require_scipy()
+        from scipy.sparse.linalg import splu
+        self.smoothing = smoothing
+        self.omega = omega
+
+        A = self.matrix()
+        if self.singular:
+            raise ValueError("multigrid needs at least one Dirichlet side, use 'dct' for pure Neumann problems")
+        ny, nx = self.ny, self.nx
+        self._levels = []                                                   # (A, inverse diagonal, P) per level
+        while min(ny, nx) >= 2*min_size:
+            P = self._prolongation(ny, nx)
+            self._levels.append((A, self.omega / A.diagonal(), P))
+            A = (P.T @ A @ P).tocsr()
+            ny, nx = (ny + 1)//2, (nx + 1)//2
+        self._coarse = splu(A.tocsc())
+
+    @staticmethod
+    def _prolongation_1d(n):
+        from scipy import sparse
+        nc = (n + 1)//2
+        rows, cols, vals = [], [], []
+        for fine in range(n):
+            coarse = fine//2
+            neighbour = coarse - 1 if fine % 2 == 0 else coarse + 1
+            if 0 <= neighbour < nc:
+                rows += [fine, fine]
+                cols += [coarse, neighbour]
+                vals += [0.75, 0.25]
+            else:
+                rows.append(fine)
+                cols.append(coarse)
+                vals.append(1.0)
+        return sparse.csr_matrix((vals, (rows, cols)), shape=(n, nc))
+
+    def _prolongation(self, ny, nx):
+        from scipy import sparse
+        return sparse.kron(self._prolongation_1d(ny), self._prolongation_1d(nx)).tocsr()
+
+    def _cycle(self, level, b, x):
+        if level == len(self._levels):
+            return self._coarse.solve(b)
+        A, inverse_diagonal, P = self._levels[level]
+        for _ in range(self.smoothing):
+            x += inverse_diagonal * (b - A @ x)
+        correction = self._cycle(level + 1, P.T @ (b - A @ x), np.zeros(P.shape[1]))
+        x += P @ correction
+        for _ in range(self.smoothing):
+            x += inverse_diagonal * (b - A @ x)
+        return x
+
+    def _solve(self, rhs, out):
+        b = (self.h**2 * rhs).ravel()
+        x = np.zeros_like(b)
+        scale = np.linalg.norm(b)
+        cycles = 0
+        if scale > 0:
+            A = self._levels[0][0] if self._levels else None
+            for cycles in range(1, self.max_iter + 1):
+                x = self._cycle(0, b, x)
+                if A is None or np.linalg.norm(b - A @ x) / scale < self.tol:
+                    break
+        out[1:-1, 1:-1] = x.reshape(self.ny, self.nx)
+        self.stats.iterations = cycles
+
+
+class SORSolver(PoissonSolver):
+    """Red-black successive over-relaxation on one preallocated buffer, warm-started.
+
+    The ghost cells are folded into the diagonal, so each colour is a plain
+    in-place update of two strided sub-lattices. Every solve starts from the
+    previous correction (warm_start=True), which costs only a few sweeps when
+    the pressure changes slowly between time steps, and stops once the
+    relative residual is below tol. With omega=None the optimal
+    omega = 2/(1 + sqrt(1 - rho**2)) is estimated from the spectral radius
+    rho of the Jacobi iteration, taken from the Rayleigh quotient of the
+    smoothest trigonometric eigenmode.
+    """
+
+    def __init__(self, shape, cell_length, boundaries=None, tol=1e-6, max_iter=10000,
+                 omega=None, warm_start=True, check_every=4):
+        super().__init__(shape, cell_length, boundaries, tol, max_iter)
+        self.warm_start = warm_start
+        self.check_every = check_every
+        ny, nx = self.ny, self.nx
+
+        # DIAGONAL WITH THE GHOST CELLS ELIMINATED
+        self._diagonal = np.full((ny, nx), 4.0)
+        self._diagonal[:, 0] -= self._sign['left']
+        self._diagonal[:, -1] -= self._sign['right']
+        self._diagonal[0, :] -= self._sign['bottom']
+        self._diagonal[-1, :] -= self._sign['top']
+
+        self._work = np.zeros(self.shape)                                   # iterate, ghost cells stay zero
+        self._h2_rhs = np.zeros((ny, nx))
+        self._residual = np.zeros((ny, nx))
+
+        # RED AND BLACK SUB-LATTICES: (row offset, column offset) inside the interior
+        self._colours = (((0, 0), (1, 1)), ((0, 1), (1, 0)))
+        self._scratch = {
+            (r, c): np.zeros((len(range(r, ny, 2)), len(range(c, nx, 2))))
+            for colour in self._colours for r, c in colour
+        }
+        self.omega = self.optimal_omega() if omega is None else omega
+        self.stats.omega = self.omega
+
+    def state(self):
+        return {'work': self._work}
+
+    def load_state(self, arrays):
+        self._work[...] = arrays['work']
+
+    def optimal_omega(self):
+        modes = []
+        for low, high, n in (('left', 'right', self.nx), ('bottom', 'top', self.ny)):
+            kind, _, offset = DCTSolver._TRANSFORMS[(self.boundaries[low], self.boundaries[high])]
+            k = 1 if self.singular and low == 'left' else 0                 # skip the constant null mode
+            basis = np.cos if kind == 'dct' else np.sin
+            modes.append(basis(np.pi*(k + offset)*(np.arange(n) + 0.5)/n))
+        mode = modes[1][:, None] * modes[0][None, :]
+        full = np.zeros(self.shape)
+        full[1:-1, 1:-1] = mode
+        self.apply_boundary(full)
+        laplace = full[1:-1, 2:] + full[2:, 1:-1] + full[1:-1, :-2] + full[:-2, 1:-1] - 4*full[1:-1, 1:-1]
+        mu = -np.sum(mode*laplace) / np.sum(self._diagonal*mode**2)       # smallest eigenvalue of D^-1 (-A)
+        rho = min(max(1.0 - mu, 0.0), 1.0 - 1e-12)
+        return 2.0 / (1.0 + np.sqrt(1.0 - rho**2))
+
+    def _sweep(self):
+        p, omega = self._work, self.omega
+        ny, nx = self.ny, self.nx
+        for colour in self._colours:
+            for r, c in colour:
+                rows, cols = slice(1 + r, ny + 1, 2), slice(1 + c, nx + 1, 2)
+                centre = p[rows, cols]
+                update = self._scratch[(r, c)]
+                np.add(p[rows, 2 + c:nx + 2:2], p[rows, c:nx:2], out=update)
+                update += p[2 + r:ny + 2:2, cols]
+                update += p[r:ny:2, cols]
+                update -= self._h2_rhs[r::2, c::2]
+                update /= self._diagonal[r::2, c::2]
+                update -= centre
+                update *= omega
+                centre += update
+
+    def _relative_residual(self, scale):
+        p, r = self._work, self._residual
+        np.add(p[1:-1, 2:], p[1:-1, :-2], out=r)
+        r += p[2:, 1:-1]
+        r += p[:-2, 1:-1]
+        r -= self._diagonal * p[1:-1, 1:-1]
+        np.subtract(self._h2_rhs, r, out=r)
+        return np.linalg.norm(r) / scale
+
+    def _solve(self, rhs, out):
+        np.multiply(rhs, self.h**2, out=self._h2_rhs)
+        if not self.warm_start:
+            self._work[...] = 0.0
+        scale = np.linalg.norm(self._h2_rhs)
+        sweeps = 0
+        if scale > 0 and self._relative_residual(scale) >= self.tol:
+            for sweeps in range(1, self.max_iter + 1):
+                self._sweep()
+                if sweeps % self.check_every == 0 and self._relative_residual(scale) < self.tol:
+                    break
+        out[1:-1, 1:-1] = self._work[1:-1, 1:-1]
+        self.stats.iterations = sweeps
+
+
+SOLVERS = {
+    'jacobi': JacobiSolver,
+    'direct': DirectSolver,
+    'dct': DCTSolver,
+    'multigrid': MultigridSolver,
+    'sor': SORSolver,
+}
+
+
+def make_solver(name, shape, cell_length, **options):
+    """Poisson backend by name, see SOLVERS."""
+    if name not in SOLVERS:
+        raise ValueError(f"unknown Poisson solver {name!r}, expected one of {tuple(SOLVERS)}")
+    return SOLVERS[name](shape, cell_length, **options)
@@ -0,0 +1,168 @@
+# Chunked on-disk snapshot output of solver fields
+# One .npy file per field and frame, a JSON manifest and a line-oriented frame index;
+# uncompressed frames are memory-mapped on read so single frames or probe points
+# never load the whole run.
+
+# LIBRARIES
+import json
+import os
+
+import numpy as np
+
+from frame_writer import BoundedWorker
+
+MANIFEST = 'manifest.json'
+INDEX = 'frames.jsonl'                                                      # one JSON line per frame
+FORMAT_VERSION = 2                                                          # 1: frames listed in the manifest
+
+
+def _write_json(path, data):
+    """Write JSON next to path and rename it into place, readers never see a partial file."""
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file, indent=1)
+    os.replace(temporary, path)
+
+
+class _FrameStore:
+    """Writes frames to disk and appends them to the index, runs on the writer thread.
+
+    The manifest holds what is fixed for the run and is only rewritten when
+    a new field appears and on close(), so a frame costs one index line
+    however long the run.
+    """
+
+    def __init__(self, directory, compress, attributes):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compress = compress
+        self.manifest = {'format': FORMAT_VERSION, 'compressed': compress, 'attributes': attributes,
+                         'fields': {}, 'index': INDEX, 'complete': False}
+        self._index = open(os.path.join(directory, INDEX), 'w')
+        self._write_manifest()
+
+    def _write_manifest(self):
+        _write_json(os.path.join(self.directory, MANIFEST), self.manifest)
+
+    def __call__(self, item):
+        index, step, time, arrays = item
+        files = {}
+        new_fields = False
+        for name, array in arrays.items():
+            if name not in self.manifest['fields']:
+                self.manifest['fields'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+                new_fields = True
+            if self.compress:
+                files[name] = f'{name}_{index:06d}.npz'
+                np.savez_compressed(os.path.join(self.directory, files[name]), data=array)
+            else:
+                files[name] = f'{name}_{index:06d}.npy'
+                np.save(os.path.join(self.directory, files[name]), array)
+        if new_fields:
+            self._write_manifest()
+        self._index.write(json.dumps({'index': index, 'step': step, 'time': time, 'files': files}) + '\n')
+        self._index.flush()                                                 # readers may follow a running job
+
+    def close(self):
+        if not self._index.closed:
+            self._index.close()
+            self.manifest['complete'] = True
+            self._write_manifest()
+
+
+class SnapshotWriter:
+    """Writes named fields every `every` steps to directory without stalling the step loop.
+
+    Fields are copied (and down-cast to `dtype`, e.g. np.float32 or
+    np.float16, when given) on the solver thread, then written by a background
+    worker through a bounded queue. compress=True stores zlib-compressed .npz
+    frames, which cannot be memory-mapped but are read lazily frame by frame.
+    """
+
+    def __init__(self, directory, every=1, dtype=None, compress=False, attributes=None,
+                 background=True, maxsize=4, policy='block'):
+        self.directory = directory
+        self.every = every
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self._store = _FrameStore(directory, compress, attributes or {})
+        self._worker = BoundedWorker(self._store, maxsize, policy) if background else None
+        self._index = 0
+
+    def due(self, step):
+        return step % self.every == 0
+
+    def write(self, step, time=None, **fields):
+        """Snapshot fields at step if the cadence is due, returns True when one was queued."""
+        if not self.due(step):
+            return False
+        arrays = {name: np.array(value, dtype=self.dtype or np.asarray(value).dtype, copy=True)
+                  for name, value in fields.items()}
+        item = (self._index, int(step), None if time is None else float(time), arrays)
+        self._index += 1
+        if self._worker is None:
+            self._store(item)
+            return True
+        return self._worker.submit(item)
+
+    def close(self):
+        """Flush queued frames and finish the manifest."""
+        try:
+            if self._worker is not None:
+                self._worker.close()
+        finally:
+            self._store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SnapshotReader:
+    """Lazy access to a snapshot directory written by SnapshotWriter.
+
+    Frames are those indexed when the reader was created; a directory still
+    being written reads up to its last complete index line.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as file:
+            self.manifest = json.load(file)
+        if self.manifest['format'] not in (1, FORMAT_VERSION):
+            raise ValueError(f"unsupported snapshot format {self.manifest['format']} in {directory}")
+        if 'frames' in self.manifest:                                       # format 1
+            self.frames = self.manifest['frames']
+        else:
+            with open(os.path.join(directory, self.manifest['index'])) as file:
+                self.frames = [json.loads(line) for line in file if line.endswith('\n')]
+        self.fields = self.manifest['fields']
+        self.attributes = self.manifest['attributes']
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def steps(self):
+        return np.array([frame['step'] for frame in self.frames])
+
+    @property
+    def times(self):
+        return np.array([np.nan if frame['time'] is None else frame['time'] for frame in self.frames])
+
+    def field(self, name, frame):
+        """One field of one frame, memory-mapped read-only when stored uncompressed."""
+        path = os.path.join(self.directory, self.frames[frame]['files'][name])
+        if path.endswith('.npz'):
+            with np.load(path) as archive:
+                return archive['data']
+        return np.load(path, mmap_mode='r')
+
+    def frame(self, frame):
+        """Dict of all fields of one frame."""
+        return {name: self.field(name, frame) for name in self.frames[frame]['files']}
+
+    def probe(self, name, index):
+        """Time series of field[index] over all frames, reading one element per frame."""
+        return np.array([self.field(name, frame)[index] for frame in range(len(self))])
@@ -0,0 +1,33 @@
+# Solver core library
+# The numerics of the simulation scripts as importable classes sharing one
+# setup() / step(n) / state() interface, free of plotting code. Run a config
+# file with: python -m solvers case.toml
+
+from solvers.airfoil import JoukowskyModel
+from solvers.base import PhaseTimers, Solver
+from solvers.config import load_config
+from solvers.ensemble import PeriodicPipeEnsemble, StaggeredPipeEnsemble
+from solvers.lbm import LBMSolver
+from solvers.pipe import PeriodicPipeSolver, StaggeredPipeSolver
+
+SOLVERS = {
+    LBMSolver.name: LBMSolver,
+    StaggeredPipeSolver.name: StaggeredPipeSolver,
+    PeriodicPipeSolver.name: PeriodicPipeSolver,
+    StaggeredPipeEnsemble.name: StaggeredPipeEnsemble,
+    PeriodicPipeEnsemble.name: PeriodicPipeEnsemble,
+    JoukowskyModel.name: JoukowskyModel,
+}
+
+
+def make_solver(name, config=None, **parameters):
+    """Solver by name, see SOLVERS, configured but not yet set up."""
+    if name not in SOLVERS:
+        raise ValueError(f"unknown solver {name!r}, expected one of {tuple(SOLVERS)}")
+    return SOLVERS[name](config, **parameters)
+
+
+__all__ = [
+    'JoukowskyModel', 'LBMSolver', 'PeriodicPipeEnsemble', 'PeriodicPipeSolver', 'PhaseTimers', 'SOLVERS',
+    'Solver', 'StaggeredPipeEnsemble', 'StaggeredPipeSolver', 'load_config', 'make_solver',
+]
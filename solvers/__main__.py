@@ -0,0 +1,61 @@
+# Command line entry point of the solver library
+# Run from the repository root: python -m solvers case.toml [case.json ...]
+
+# LIBRARIES
+import argparse
+import json
+import time
+
+import numpy as np
+
+from solvers import make_solver
+from solvers.config import load_config
+from solvers.profiling import Profile
+
+
+def run_case(case, steps=None, cprofile=False, trace_memory=False):
+    """Set up and run one case dict, write its outputs and return the solver.
+
+    cprofile and trace_memory run the steps inside a profiling.Profile
+    window, whose report is printed and added to the timings file.
+    """
+    steps = steps if steps is not None else case.get('steps')
+    with make_solver(case['solver'], case.get('parameters')) as solver:
+        solver.setup()
+        profile = Profile(solver, cprofile, trace_memory) if cprofile or trace_memory else None
+        if profile is not None:
+            profile.start()
+        t0 = time.perf_counter()
+        taken = solver.run() if steps is None else solver.step(steps)
+        wall = time.perf_counter() - t0
+        if profile is not None:
+            profile.stop()
+
+        print(f"{case['solver']}: {taken} steps to t = {solver.time:.4g} in {wall:.2f} s"
+              f"{', finished' if solver.finished else ''}")
+        print(solver.timers.report() if profile is None else profile.table())
+
+        if case.get('output'):
+            np.savez(case['output'], iteration=solver.iteration, time=solver.time, **solver.arrays())
+        if case.get('timings'):
+            with open(case['timings'], 'w') as file:
+                json.dump({'solver': case['solver'], 'parameters': solver.parameters, 'steps': taken,
+                           'wall_seconds': wall, 'phases': solver.timers.as_dict(),
+                           'profile': profile.as_dict() if profile is not None else None}, file, indent=1)
+    return solver
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run solver cases from JSON, TOML or YAML files')
+    parser.add_argument('cases', nargs='+', help='case files, each holding one case or a cases list')
+    parser.add_argument('--steps', type=int, help='override the step count of every case')
+    parser.add_argument('--cprofile', action='store_true', help='run every case under cProfile')
+    parser.add_argument('--tracemalloc', action='store_true', help='trace the memory each phase allocates')
+    args = parser.parse_args()
+    for path in args.cases:
+        for case in load_config(path):
+            run_case(case, args.steps, args.cprofile, args.tracemalloc)
+
+
+if __name__ == "__main__":
+    main()
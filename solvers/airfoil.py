@@ -0,0 +1,52 @@
+# Joukowsky airfoil potential flow model
+# Exposes the batched evaluation of joukowsky behind the common solver interface,
+# so airfoil sweeps can be configured, timed and driven like the flow solvers.
+
+# LIBRARIES
+import joukowsky
+from solvers.base import Solver
+
+
+class JoukowskyModel(Solver):
+    """Steady potential flow around Joukowsky airfoils, one design or a broadcast batch.
+
+    s_x, s_y and aoa (degrees) may be numbers or nested lists. The model has
+    no time dependence: the first step evaluates it and finishes the run.
+    state() holds the results of joukowsky.evaluate and, with surface=True,
+    those of joukowsky.surface prefixed with 'surface_'. Phases: 'evaluate'
+    and 'surface'.
+    """
+
+    name = 'joukowsky'
+    DEFAULTS = {
+        's_x': 0.05,                                                        # x offset of the circle centre
+        's_y': 0.05,                                                        # y offset of the circle centre
+        'aoa': 10,                                                          # angle of attack in degrees
+        'fields': True,                                                     # evaluate the potential on the mesh
+        'surface': True,                                                    # surface pressure and forces
+        'n_points': 256,                                                    # surface samples per design
+        'chunk_size': 256,                                                  # designs per vectorized chunk
+        'processes': None,                                                  # worker processes for large sweeps
+    }
+
+    def _setup(self):
+        self.results = {}
+
+    def _advance(self):
+        p = self.parameters
+        with self.timers('evaluate'):
+            self.results = joukowsky.evaluate(
+                p['s_x'], p['s_y'], p['aoa'], fields=p['fields'],
+                chunk_size=p['chunk_size'], processes=p['processes']
+            )
+        if p['surface']:
+            with self.timers('surface'):
+                surface = joukowsky.surface(p['s_x'], p['s_y'], p['aoa'], n_points=p['n_points'])
+            self.results.update((f'surface_{key}', value) for key, value in surface.items()
+                                if key not in ('s_x', 's_y', 'AoA'))
+
+    def _check(self):
+        return True
+
+    def state(self):
+        return dict(super().state(), **self.results)
@@ -0,0 +1,238 @@
+# Common stepping interface of the solvers
+# A solver is configured from a dict of parameters, allocates its fields in
+# setup(), advances with step(n) and hands its fields and scalars out with
+# state(). Phase timers around the numerical kernels report the same way for all.
+
+# LIBRARIES
+import time
+import tracemalloc
+
+import numpy as np
+
+
+class _Phase:
+    """Context manager adding the wall time of its block to one phase of a PhaseTimers."""
+
+    __slots__ = ('timers', 'name', 'start')
+
+    def __init__(self, timers, name):
+        self.timers = timers
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.timers.totals[self.name] = self.timers.totals.get(self.name, 0.0) + elapsed
+        self.timers.counts[self.name] = self.timers.counts.get(self.name, 0) + 1
+
+
+class _MemoryPhase(_Phase):
+    """_Phase that also records the traced memory the block allocates.
+
+    tracemalloc keeps a single peak, so every phase folds the peak seen so
+    far into its parent's frame before resetting it; nested phases then
+    report correct peaks for both.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        current, peak = tracemalloc.get_traced_memory()
+        stack = self.timers._stack
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        stack.append([current, current])                                    # level at entry, peak seen
+        tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        current, peak = tracemalloc.get_traced_memory()
+        timers = self.timers
+        level, seen = timers._stack.pop()
+        peak = max(peak, seen)
+        if timers._stack:
+            timers._stack[-1][1] = max(timers._stack[-1][1], peak)
+        name = self.name
+        timers.totals[name] = timers.totals.get(name, 0.0) + elapsed
+        timers.counts[name] = timers.counts.get(name, 0) + 1
+        timers.peak_bytes[name] = max(timers.peak_bytes.get(name, 0), peak - level)
+        timers.allocated_bytes[name] = timers.allocated_bytes.get(name, 0) + peak - level
+        timers.retained_bytes[name] = timers.retained_bytes.get(name, 0) + current - level
+
+
+class _Disabled:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class PhaseTimers:
+    """Accumulated wall time and call count per named phase.
+
+    Time a block with `with timers('poisson'): ...`. Phases are independent,
+    a phase timed inside another is counted in both. With enabled=False every
+    phase is a shared no-op context manager.
+
+    With memory=True and tracemalloc tracing, each phase also records the
+    memory its block allocates, NumPy array buffers included: 'peak_bytes'
+    is the largest excess over the level at entry seen in any call,
+    'allocated_bytes' sums that excess over the calls (the temporaries a
+    phase creates, bounded below by its largest one) and 'retained_bytes'
+    what is still allocated at exit.
+    """
+
+    def __init__(self, enabled=True, memory=False):
+        self.enabled = enabled
+        self.memory = memory
+        self.totals = {}                                                    # seconds per phase
+        self.counts = {}                                                    # timed blocks per phase
+        self.peak_bytes = {}                                                # largest allocation excess per phase
+        self.allocated_bytes = {}                                           # summed allocation excess per phase
+        self.retained_bytes = {}                                            # summed net allocation per phase
+        self._phases = {}
+        self._memory_phases = {}
+        self._stack = []                                                    # [level, peak] of the open memory phases
+        self._disabled = _Disabled()
+
+    def __call__(self, name):
+        if not self.enabled:
+            return self._disabled
+        if self.memory and tracemalloc.is_tracing():
+            phases, kind = self._memory_phases, _MemoryPhase
+        else:
+            phases, kind = self._phases, _Phase
+        phase = phases.get(name)
+        if phase is None:
+            phase = phases[name] = kind(self, name)
+        return phase
+
+    def reset(self):
+        for record in (self.totals, self.counts, self.peak_bytes, self.allocated_bytes, self.retained_bytes):
+            record.clear()
+
+    def as_dict(self):
+        """{phase: {'seconds': total, 'calls': count, ...memory records}}, JSON-serializable."""
+        phases = {}
+        for name, total in self.totals.items():
+            phases[name] = {'seconds': total, 'calls': self.counts[name]}
+            if name in self.peak_bytes:
+                phases[name].update(peak_bytes=self.peak_bytes[name], allocated_bytes=self.allocated_bytes[name],
+                                    retained_bytes=self.retained_bytes[name])
+        return phases
+
+    def report(self, phases=None):
+        """Table of total time, calls, mean time per call and share of the timed total per phase.
+
+        `phases` defaults to as_dict(); memory columns in kB per call are
+        added when recorded.
+        """
+        phases = self.as_dict() if phases is None else phases
+        memory = any('peak_bytes' in record for record in phases.values())
+        overall = sum(record['seconds'] for record in phases.values()) or 1.0
+        header = f"{'phase':>16}{'seconds':>11}{'calls':>9}{'ms/call':>10}{'share':>8}"
+        lines = [header + (f"{'kB/call':>10}{'peak kB':>10}" if memory else '')]
+        for name, record in sorted(phases.items(), key=lambda item: -item[1]['seconds']):
+            total, calls = record['seconds'], record['calls']
+            line = f'{name:>16}{total:>11.3f}{calls:>9}{1e3 * total / calls:>10.3f}{total / overall:>8.1%}'
+            if 'peak_bytes' in record:
+                line += f"{record['allocated_bytes'] / calls / 1e3:>10.1f}{record['peak_bytes'] / 1e3:>10.1f}"
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+class Solver:
+    """Parameters, stepping loop and phase timers shared by the solvers.
+
+    Subclasses list their parameters with defaults in DEFAULTS and implement
+    _setup() (allocation and initial conditions), _advance() (one time step)
+    and _check(), which runs after every step and returns True once the run
+    is finished (end time, step limit or steady state). Parameters come from
+    the `config` dict and keyword overrides; unknown names raise ValueError.
+    """
+
+    name = None
+    DEFAULTS = {}
+
+    def __init__(self, config=None, timers=True, **parameters):
+        parameters = dict(config or {}, **parameters)
+        unknown = sorted(set(parameters) - set(self.DEFAULTS))
+        if unknown:
+            raise ValueError(f"unknown {self.name} parameters {unknown}, expected some of {sorted(self.DEFAULTS)}")
+        self.parameters = {key: parameters.get(key, default) for key, default in self.DEFAULTS.items()}
+        self.timers = PhaseTimers(timers)
+        self.iteration = 0                                                  # completed time steps
+        self.time = 0.0                                                     # physical time
+        self.finished = False
+        self._ready = False
+
+    def setup(self):
+        """Allocate the fields and set the initial conditions, returns the solver."""
+        self.iteration = 0
+        self.time = 0.0
+        self.finished = False
+        self.timers.reset()
+        with self.timers('setup'):
+            self._setup()
+        self._ready = True
+        return self
+
+    def step(self, n=1):
+        """Advance by n time steps, or fewer once finished; returns the number of steps taken."""
+        if not self._ready:
+            raise RuntimeError(f"{self.name} solver: call setup() before step()")
+        taken = 0
+        while taken < n and not self.finished:
+            self._advance()
+            self.iteration += 1
+            taken += 1
+            with self.timers('diagnostics'):
+                self.finished = self._check()
+        return taken
+
+    def run(self):
+        """Step until finished, returns the number of steps taken."""
+        taken = 0
+        while not self.finished:
+            taken += self.step()
+        return taken
+
+    def state(self):
+        """Live field arrays plus the scalars 'iteration' and 'time'; copy arrays to keep them."""
+        return {'iteration': self.iteration, 'time': self.time}
+
+    def load_state(self, state):
+        """Resume from a dict like state() returns, e.g. a restarted checkpoint."""
+        if not self._ready:
+            self.setup()
+        self.iteration = int(state['iteration'])
+        self.time = float(state.get('time', self.iteration))
+        self.finished = False
+
+    def arrays(self):
+        """The array entries of state(), as checkpoints store them."""
+        return {key: value for key, value in self.state().items() if isinstance(value, np.ndarray)}
+
+    def close(self):
+        """Release worker threads or processes, if any."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _setup(self):
+        raise NotImplementedError
+
+    def _advance(self):
+        raise NotImplementedError
+
+    def _check(self):
+        return False
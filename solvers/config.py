@@ -0,0 +1,60 @@
+# Case files for the solver command line
+# A case names its solver, the solver parameters and what to do with the result:
+#
+#     solver = "staggered_pipe"
+#     steps = 2000                    # optional cap, default: until finished
+#     output = "pipe.npz"             # optional final state arrays
+#     timings = "pipe-timings.json"   # optional phase timer report
+#
+#     [parameters]
+#     viscosity = 0.02
+#
+# JSON and YAML files hold the same keys; a 'cases' list runs several cases.
+
+# LIBRARIES
+import json
+import os
+
+CASE_KEYS = {'solver', 'parameters', 'steps', 'output', 'timings'}
+
+
+def _load_toml(file):
+    try:
+        import tomllib
+    except ImportError:                                                     # Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError as error:
+            raise ImportError("TOML case files need Python 3.11 or the tomli package") from error
+    return tomllib.load(file)
+
+
+def _load_yaml(file):
+    try:
+        import yaml
+    except ImportError as error:
+        raise ImportError("YAML case files need PyYAML, or write the case as TOML or JSON") from error
+    return yaml.safe_load(file)
+
+
+LOADERS = {'.json': json.load, '.toml': _load_toml, '.yaml': _load_yaml, '.yml': _load_yaml}
+
+
+def load_config(path):
+    """List of case dicts from a JSON, TOML or YAML file, chosen by its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in LOADERS:
+        raise ValueError(f"unknown case file type {extension!r} of {path}, expected one of {tuple(LOADERS)}")
+    with open(path, 'rb') as file:
+        content = LOADERS[extension](file)
+
+    cases = content.get('cases', [content]) if isinstance(content, dict) else None
+    if not isinstance(cases, list) or not all(isinstance(case, dict) for case in cases):
+        raise ValueError(f"{path} must hold a case table or a 'cases' list of them")
+    for case in cases:
+        if 'solver' not in case:
+            raise ValueError(f"a case in {path} does not name its solver")
+        unknown = sorted(set(case) - CASE_KEYS)
+        if unknown:
+            raise ValueError(f"unknown case keys {unknown} in {path}, expected some of {sorted(CASE_KEYS)}")
+    return cases
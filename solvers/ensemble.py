@@ -0,0 +1,298 @@
+# Ensembles of independent pipe flow cases advanced as one batch
+# Cases on the same grid that differ only in viscosity, inlet velocity or
+# pressure gradient share every stencil, Poisson solve and boundary update: the
+# fields gain a leading member axis, so each NumPy call advances all members and
+# the per-call overhead that dominates small grids is paid once per step.
+
+# LIBRARIES
+import numpy as np
+
+import convergence
+import poisson
+import timestep
+from solvers.base import Solver
+from solvers.pipe import PeriodicPipeSolver, StaggeredPipeSolver, divergence_norm
+
+
+class _Ensemble:
+    """Member bookkeeping shared by the ensemble solvers.
+
+    The parameters in MEMBER_PARAMETERS take one value for all members or
+    one per member; their common length sets the number of members unless
+    `members` is given. Every member has its own time and time step, and
+    stops once converged (with stop_at_steady_state) or at end_time. Stopped
+    members are moved behind the running ones, so the running members stay
+    the prefix [:active] of every batched array and the stencils only touch
+    that prefix. `slots` maps array slots to member indices, `stopped_at`
+    holds the step each member stopped at (-1 while running), `time` is the
+    earliest time of the running members and state() returns the fields in
+    member order.
+    """
+
+    MEMBER_PARAMETERS = {}                                                  # name: shape of one member's value
+
+    def _member_values(self):
+        """Per-member parameter arrays in member order, sets up the member bookkeeping."""
+        p = self.parameters
+        values = {}
+        for name, shape in self.MEMBER_PARAMETERS.items():
+            value = np.asarray(p[name], dtype=float)
+            if value.shape == shape:                                        # one value for all members
+                value = value[None]
+            if value.shape[1:] != shape:
+                raise ValueError(f"{self.name} parameter {name} has shape {value.shape}, expected {shape} "
+                                 f"or (members,) + {shape}")
+            values[name] = value
+        counts = {len(value) for value in values.values()} - {1}
+        if p['members'] is not None:
+            counts.add(p['members'])
+        if len(counts) > 1:
+            raise ValueError(f"{self.name} members and per-member parameters give {sorted(counts)} members, "
+                             f"expected one count")
+        self.n_members = counts.pop() if counts else 1
+        self.active = self.n_members                                        # running members, slots [:active]
+        self.slots = np.arange(self.n_members)                              # member index of every slot
+        self.stopped_at = np.full(self.n_members, -1)                       # step each member stopped at
+        self.times = np.zeros(self.n_members)                               # physical time per slot
+        return {name: np.array(np.broadcast_to(value, (self.n_members,) + value.shape[1:]))
+                for name, value in values.items()}
+
+    def _fields(self):
+        """The state fields by name, members on the leading axis in slot order."""
+        raise NotImplementedError
+
+    def _batched(self):
+        """Every array indexed by slot that carries state between steps."""
+        raise NotImplementedError
+
+    def _permute(self, order):
+        """Reorder the first len(order) slots of every batched array."""
+        n = len(order)
+        for array in self._batched():
+            array[:n] = array[:n][order]
+        self.controller.permute(order)
+        self.slots[:n] = self.slots[order]
+
+    def _retire(self, done):
+        """Stop the running members flagged in `done`, moving them behind the running ones."""
+        n = self.active
+        self._permute(np.concatenate([np.flatnonzero(~done), np.flatnonzero(done)]))
+        self.active = n - int(np.count_nonzero(done))
+        self.stopped_at[self.slots[self.active:n]] = self.iteration
+
+    def _finish(self, done):
+        """Retire the running members in `done`, True once none is left or max_steps is reached."""
+        if np.any(done):
+            self._retire(done)
+        self.time = float(np.min(self.times[:self.active])) if self.active else float(np.max(self.times))
+        return self.active == 0 or self.iteration >= self.parameters['max_steps']
+
+    def state(self):
+        """Copies of the fields in member order, per member 'member_time', 'dt', 'stopped_at' and 'converged'."""
+        order = np.argsort(self.slots)
+        state = dict(
+            Solver.state(self), member_time=self.times[order], dt=self.controller.member_dt[order],
+            stopped_at=self.stopped_at.copy(), converged=self.monitor.converged.copy(),
+        )
+        state.update((name, field[order]) for name, field in self._fields().items())
+        return state
+
+    def load_state(self, state):
+        Solver.load_state(self, state)
+        self._permute(np.argsort(self.slots))                               # back to member order
+        self.active = self.n_members
+        for name, field in self._fields().items():
+            field[...] = state[name]
+        self.times[...] = state['member_time']
+        self.controller.member_dt[...] = state['dt']
+        self.monitor.converged[...] = state['converged']
+        stopped_at = np.array(state['stopped_at'])
+        self._retire(stopped_at >= 0)
+        self.stopped_at[...] = stopped_at
+        self.finished = self._finish(np.zeros(self.active, dtype=bool))
+
+
+class StaggeredPipeEnsemble(_Ensemble, StaggeredPipeSolver):
+    """StaggeredPipeSolver cases differing in viscosity and inlet velocity, advanced together.
+
+    The fields carry the members on a leading axis, velocity_x is (members,
+    n_points_y + 1, n_points_x) and so on. Every stencil runs the workspace
+    kernels of StaggeredPipeSolver on all running members at once, and the
+    pressure correction is one batched solve, so the Poisson backend must
+    support batches ('dct' by default, 'direct' or 'jacobi'). Each member
+    reproduces a StaggeredPipeSolver run with its parameters bit for bit.
+    Phases as StaggeredPipeSolver.
+    """
+
+    name = 'staggered_pipe_ensemble'
+    MEMBER_PARAMETERS = {'viscosity': (), 'inlet_velocity': ()}
+    DEFAULTS = dict(
+        {key: value for key, value in StaggeredPipeSolver.DEFAULTS.items()
+         if key not in ('workspace', 'probes', 'diagnostics_every', 'diagnostics_file')},
+        poisson_solver='dct',                                               # batched backend, see poisson.SOLVERS
+        members=None,                                                       # None: length of the per-member parameters
+    )
+
+    def _setup(self):
+        p = self.parameters
+        backend = poisson.SOLVERS.get(p['poisson_solver'])
+        if backend is not None and not backend.batched:
+            batched = [name for name, solver in poisson.SOLVERS.items() if solver.batched]
+            raise ValueError(f"{self.name}: Poisson solver {p['poisson_solver']!r} solves one problem at a time, "
+                             f"expected one of {batched}")
+        if p['diffusion'] != 'explicit':
+            raise ValueError(f"{self.name}: diffusion {p['diffusion']!r} factorizes one viscosity and time step, "
+                             f"members have their own, use 'explicit'")
+        self._values = self._member_values()
+        super()._setup()
+
+    def _initial_conditions(self):
+        n_points_y = self.parameters['n_points_y']
+        self.viscosity = self._values['viscosity']                          # per slot
+        self.inlet_velocity = self._values['inlet_velocity']                # per slot
+        self.velocity_x = np.empty((self.n_members, n_points_y+1, self.n_points_x))
+        self.velocity_x[...] = self.inlet_velocity[:, None, None]           # uniform inflow of each member
+        self.velocity_x[:, 0, :] = -self.velocity_x[:, 1, :]                # upper wall boundary condition
+        self.velocity_x[:, -1, :] = -self.velocity_x[:, -2, :]              # lower wall boundary condition
+        self.velocity_y = np.ones((self.n_members, n_points_y, self.n_points_x+1))
+        self.pressure = np.zeros((self.n_members, n_points_y+1, self.n_points_x+1))
+
+    def _controls(self):
+        p = self.parameters
+        self.mass_ratio = np.ones(self.n_members)                           # inflow over outflow per slot
+        self.controller = timestep.EnsembleTimeStepController(
+            self.cell_lenght, self.viscosity.copy(), safety=p['safety'],
+            fixed_dt=None if p['adaptive_time_step'] else p['time_step'], log_every=p['log_every']
+        )
+        self.monitor = convergence.EnsembleConvergenceMonitor(
+            self.n_members, p['tolerances'], p['convergence_every'], log_every=p['log_every']//p['convergence_every']
+        )
+        self.diagnostics = None                                             # no per-member time series
+
+    def _fields(self):
+        return {'velocity_x': self.velocity_x, 'velocity_y': self.velocity_y, 'pressure': self.pressure}
+
+    def _batched(self):
+        return [*self._fields().values(), self._outlet_y, self.viscosity, self.inlet_velocity,
+                self.mass_ratio, self.times]
+
+    def _retire(self, done):
+        super()._retire(done)
+        n = self.active + int(np.count_nonzero(done))
+        for current, spare in ((self.velocity_x, self._velocity_x_next), (self.velocity_y, self._velocity_y_next),
+                               (self.pressure, self._pressure_next)):
+            spare[self.active:n] = current[self.active:n]                   # both buffers hold the stopped members
+
+    def _advance(self):
+        p = self.parameters
+        n = self.active
+        with self.timers('time_step'):
+            time_step = self.controller.next_dt(
+                self.iteration, self.times[:n], p['end_time'],
+                velocity_x=self.velocity_x[:n], velocity_y=self.velocity_y[:n]
+            )
+        self.mass_ratio[:n] = self._advance_workspace(
+            time_step[:, None, None], self.viscosity[:n, None, None], self.inlet_velocity[:n, None], slice(0, n)
+        )
+        self.times[:n] += time_step
+
+    def _check(self):
+        p = self.parameters
+        n = self.active
+        done = p['end_time'] - self.times[:n] <= 1e-9 * p['end_time']
+        if self.monitor.due(self.iteration):
+            velocity_x, velocity_y = self.velocity_x[:n], self.velocity_y[:n]
+            converged = self.monitor.update(
+                self.iteration, self.times[:n], self.slots[:n],
+                fields={'velocity_x': velocity_x, 'velocity_y': velocity_y},
+                divergence=divergence_norm(velocity_x, velocity_y, self.cell_lenght),
+                mass_ratio_error=np.abs(self.mass_ratio[:n] - 1),
+            )
+            if p['stop_at_steady_state']:
+                done |= converged
+        return self._finish(done)
+
+    def load_state(self, state):
+        _Ensemble.load_state(self, state)
+        self._outlet_y[...] = self.velocity_y[:, 1:-1, -1]
+
+
+class PeriodicPipeEnsemble(_Ensemble, PeriodicPipeSolver):
+    """PeriodicPipeSolver cases differing in viscosity and pressure gradient, advanced together.
+
+    Vx and Vx_exact are (members, n_points, n_points); pressure_gradient
+    takes one (x, y) pair or one per member. Each member reproduces a
+    PeriodicPipeSolver run with its parameters bit for bit. Phases as
+    PeriodicPipeSolver.
+    """
+
+    name = 'periodic_pipe_ensemble'
+    MEMBER_PARAMETERS = {'viscosity': (), 'pressure_gradient': (2,)}
+    DEFAULTS = dict(
+        PeriodicPipeSolver.DEFAULTS,
+        members=None,                                                       # None: length of the per-member parameters
+    )
+
+    def _setup(self):
+        p = self.parameters
+        values = self._member_values()
+        N = p['n_points']
+        self.element_length = 1.0/(N-1)                                     # cell length
+        x_range = np.linspace(0.0, 1.0, N)                                  # x distances
+        y_range = np.linspace(0.0, 1.0, N)                                  # y distances
+        self.cx, self.cy = np.meshgrid(x_range, y_range)                    # 2D mesh coordinates
+        self.viscosity = values['viscosity']                                # per slot
+        self.pressure_gradient = values['pressure_gradient']                # per slot
+
+        # INITIAL CONDITIONS
+        self.Vx = np.ones((self.n_members, N, N))                           # initial velocity as 1 in domain
+        self.Vx[:, 0, :] = 0.0                                              # boundary condition at upper wall
+        self.Vx[:, -1, :] = 0.0                                             # boundary condition at lower wall
+
+        self.controller = timestep.EnsembleTimeStepController(
+            self.element_length, self.viscosity.copy(), safety=p['safety'],
+            fixed_dt=None if p['adaptive_time_step'] else p['time_step']
+        )
+        self.monitor = convergence.EnsembleConvergenceMonitor(self.n_members, p['tolerances'])
+        self.Vx_exact = convergence.poiseuille_profile(
+            self.cy, 1.0, self.viscosity[:, None, None], self.pressure_gradient[:, 0, None, None]
+        )
+
+    def _fields(self):
+        return {'Vx': self.Vx}
+
+    def _batched(self):
+        return [self.Vx, self.Vx_exact, self.viscosity, self.pressure_gradient, self.times]
+
+    def _advance(self):
+        p = self.parameters
+        n = self.active
+        Vx_prev = self.Vx[:n]
+
+        with self.timers('convection'):
+            convection_x = Vx_prev * self.central_difference(Vx_prev)
+
+        with self.timers('time_step'):
+            dt = self.controller.next_dt(
+                self.iteration, self.times[:n], p['end_time'], advect=np.any(convection_x, axis=(1, 2)), Vx=Vx_prev
+            )
+
+        with self.timers('update'):
+            self.Vx[:n] = self._update(
+                Vx_prev, convection_x, dt[:, None, None],
+                self.viscosity[:n, None, None], self.pressure_gradient[:n, 0, None, None]
+            )
+        self.times[:n] += dt
+
+    def _check(self):
+        p = self.parameters
+        n = self.active
+        Vx, Vx_exact = self.Vx[:n], self.Vx_exact[:n]
+        converged = self.monitor.update(
+            self.iteration, self.times[:n], self.slots[:n], fields={'Vx': Vx},
+            poiseuille_error=np.max(np.abs(Vx - Vx_exact), axis=(1, 2)) / np.max(Vx_exact, axis=(1, 2))
+        )
+        done = p['end_time'] - self.times[:n] <= 1e-9 * p['end_time']
+        if p['stop_at_steady_state']:
+            done |= converged
+        return self._finish(done)
@@ -0,0 +1,172 @@
+# D2Q9 Lattice-Boltzmann flow around an obstacle
+# The lattice of lbm_cyclinder_v1 behind the common solver interface, advanced by
+# the fused stream-collide engine or, with workers > 1, its slab-parallel variant.
+
+# LIBRARIES
+import numpy as np
+
+import convergence
+import diagnostics
+import geometry
+import lbm_engine
+import lbm_parallel
+import lbm_refinement
+from solvers.base import Solver
+
+
+class LBMSolver(Solver):
+    """Channel flow past a cylinder (or an obstacle file) on an ny x nx lattice.
+
+    Populations start at one plus 10 % Gaussian noise with a constant
+    rightward population, drawn from the global NumPy RNG unless `seed` is
+    set. Time is measured in lattice steps. Runs max_steps steps or, with
+    stop_at_steady_state, until the velocity change per step stays below the
+    tolerances; a shedding wake never gets there. `refinement` = (y0, y1,
+    x0, x1) nests a lattice of half the spacing over those nodes, advanced
+    with two substeps per step (serial engine only).
+
+    Every diagnostics_every steps a row is appended to `diagnostics`, a
+    diagnostics.TimeSeriesLog (CSV at diagnostics_file): the momentum
+    exchange drag and lift, their coefficients 2 F / (rho U^2 L), the running
+    Strouhal number f L / U of the lift and ux, uy at the `probes` points
+    (x, y) in lattice nodes. U defaults to the mean initial x velocity, L to
+    the height of the obstacle and rho is the mean initial density. Phases:
+    'stream_collide' and 'diagnostics'.
+    """
+
+    name = 'lbm'
+    DEFAULTS = {
+        'nx': 400,                                                          # number of lattices in x direction
+        'ny': 100,                                                          # number of lattices in y direction
+        'tau': 0.53,                                                        # relaxation time, sets the viscosity
+        'max_steps': 3000,                                                  # number of iterations
+        'layout': 'soa',                                                    # population layout, 'aos' or 'soa'
+        'precision': 'float64',                                             # population precision
+        'bounce_back': 'halfway',                                           # wall treatment, 'node' or 'halfway'
+        'collision': 'bgk',                                                 # 'bgk', 'trt', 'mrt' or 'regularized'
+        'collision_parameters': {},                                         # relaxation rate overrides of the operator
+        'obstacle_file': None,                                              # optional obstacle image or array file
+        'workers': 1,                                                       # threads advancing x slabs of the lattice
+        'refinement': None,                                                 # fine patch (y0, y1, x0, x1) in lattice nodes
+        'seed': None,                                                       # initial noise seed, None for the global RNG
+        'convergence_every': 50,                                            # steady state check cadence
+        'tolerances': {'change_linf': 1e-6},                                # max velocity change per lattice step
+        'stop_at_steady_state': True,                                       # end the run once converged
+        'log_every': 0,                                                     # print every log_every-th check
+        'probes': [],                                                       # (x, y) points sampled for ux and uy
+        'diagnostics_every': 1,                                             # steps between diagnostics rows, 0: none
+        'diagnostics_file': None,                                           # CSV of the diagnostics, None: in memory
+        'reference_velocity': None,                                         # coefficient scale, None: mean initial ux
+        'reference_length': None,                                           # coefficient scale, None: obstacle height
+    }
+
+    def _setup(self):
+        p = self.parameters
+        Ny, Nx, NL = p['ny'], p['nx'], lbm_engine.NL
+        random = np.random if p['seed'] is None else np.random.RandomState(p['seed'])
+        F = np.ones((Ny, Nx, NL)) + 0.1*random.randn(Ny, Nx, NL)          # mesoscopic velocity
+        F[:, :, 3] = 2.3                                                    # constant right hand side velocity
+
+        # BOUNDARIES
+        if p['obstacle_file'] is not None:                                  # obstacle defined in grid format
+            self.obstacle = geometry.load_obstacle(p['obstacle_file'])      # dark pixels or non-zero entries are solid
+            if self.obstacle.shape != (Ny, Nx):
+                raise ValueError(f"obstacle {p['obstacle_file']} has shape {self.obstacle.shape}, expected {(Ny, Nx)}")
+        else:
+            self.obstacle = geometry.circle(Ny, Nx, Nx//4, Ny//2, 13)       # cells closer than 13 to the centre
+        self.fine_obstacle = None                                           # default: coarse mask grown onto the patch
+        if p['refinement'] is not None and p['obstacle_file'] is None:      # circle rasterized at the fine spacing
+            y0, y1, x0, x1 = p['refinement']
+            ratio = lbm_refinement.RATIO
+            self.fine_obstacle = geometry.rasterize(
+                geometry.Circle(Nx//4, Ny//2, 13),
+                x0 + np.arange(ratio*(x1 - x0) + 1) / ratio, y0 + np.arange(ratio*(y1 - y0) + 1) / ratio
+            )
+
+        self.engine = None
+        self._build_engine(F)
+        self.monitor = convergence.ConvergenceMonitor(
+            p['tolerances'], p['convergence_every'], log_every=p['log_every']
+        )
+
+        # DIAGNOSTICS
+        rho = F.sum(axis=-1)
+        solid_rows = np.flatnonzero(self.obstacle.any(axis=1))              # rows the obstacle spans
+        height = solid_rows[-1] - solid_rows[0] + 1 if solid_rows.size else 1
+        self.reference_density = float(rho.mean())
+        self.reference_velocity = float(p['reference_velocity'] or np.mean(F @ lbm_engine.CXS / rho))
+        self.reference_length = float(p['reference_length'] or height)
+        self.probes = diagnostics.Probes(p['probes'], (Ny, Nx))
+        self.shedding = diagnostics.ZeroCrossingFrequency()                 # lift oscillation frequency
+        probe_columns = [f'{name}_{k}' for k in range(len(self.probes)) for name in ('ux', 'uy')]
+        self.diagnostics = diagnostics.TimeSeriesLog(
+            ['step', 'drag', 'lift', 'cd', 'cl', 'strouhal'] + probe_columns, p['diagnostics_file']
+        )
+
+    def _build_engine(self, F):
+        p = self.parameters
+        if self.engine is not None:
+            self.engine.close()
+        if p['refinement'] is not None:                                     # nested fine patch
+            if p['workers'] > 1:
+                raise ValueError("refinement runs on the serial engine, set workers=1")
+            self.engine = lbm_refinement.RefinedStreamCollideEngine(
+                F, self.obstacle, p['tau'], tuple(p['refinement']), self.fine_obstacle, p['layout'],
+                p['precision'], p['bounce_back'], p['collision'], p['collision_parameters']
+            )
+        elif p['workers'] > 1:                                              # x slabs advanced on a thread pool
+            self.engine = lbm_parallel.ParallelStreamCollideEngine(
+                F, self.obstacle, p['tau'], p['layout'], p['precision'], p['bounce_back'], p['workers'],
+                collision=p['collision'], collision_parameters=p['collision_parameters']
+            )
+        else:
+            self.engine = lbm_engine.StreamCollideEngine(                   # preallocated ping-pong buffers
+                F, self.obstacle, p['tau'], p['layout'], p['precision'], p['bounce_back'],
+                p['collision'], p['collision_parameters']
+            )
+
+    def _advance(self):
+        with self.timers('stream_collide'):
+            self.engine.step()                                              # fused in-place lattice update
+        self.time += 1.0
+
+    def _check(self):
+        p = self.parameters
+        if p['diagnostics_every'] and self.iteration % p['diagnostics_every'] == 0:
+            self._record()
+        if self.monitor.due(self.iteration):
+            self.monitor.update(self.iteration, self.time, fields={'ux': self.engine.ux, 'uy': self.engine.uy})
+        return (self.monitor.converged and p['stop_at_steady_state']) or self.iteration >= p['max_steps']
+
+    def _record(self):
+        """Append forces, coefficients, Strouhal number and probe velocities to the diagnostics log."""
+        drag, lift = self.engine.force()
+        scale = 2 / (self.reference_density * self.reference_velocity**2 * self.reference_length)
+        frequency = self.shedding.update(self.time, lift)
+        row = [self.iteration, drag, lift, scale * drag, scale * lift,
+               frequency * self.reference_length / self.reference_velocity]
+        if len(self.probes):
+            probes = self.probes
+            ux = probes.interpolate(self.engine.values('ux', probes.rows, probes.columns))
+            uy = probes.interpolate(self.engine.values('uy', probes.rows, probes.columns))
+            row.extend(np.column_stack([ux, uy]).ravel())
+        self.diagnostics.append(row)
+
+    def state(self):
+        """Populations 'F' in the engine layout, 'rho', 'ux', 'uy', the step count and 'F_fine' of a patch."""
+        engine = self.engine
+        state = dict(super().state(), F=engine.F, rho=engine.rho, ux=engine.ux, uy=engine.uy)
+        if self.parameters['refinement'] is not None:
+            state['F_fine'] = engine.fine.F
+        return state
+
+    def load_state(self, state):
+        super().load_state(state)
+        self._build_engine(self.engine.lattice.to_aos(np.asarray(state['F'])))
+        if 'F_fine' in state:                                               # otherwise interpolated from F
+            np.copyto(self.engine.fine.F, state['F_fine'])
+
+    def close(self):
+        if self._ready:
+            self.engine.close()
+            self.diagnostics.close()                                        # write the buffered rows
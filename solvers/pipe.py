@@ -0,0 +1,796 @@
+# Finite difference pipe flow solvers
+# StaggeredPipeSolver is the SIMPLE projection scheme of pipe_flow_inout_v1 on a
+# staggered grid with an inlet and an outlet, PeriodicPipeSolver the developing
+# Hagen-Poiseuille flow of periodic_pipe_flow_v1.
+
+# LIBRARIES
+import numpy as np
+
+import convergence
+import diagnostics
+import diffusion
+import poisson
+import timestep
+from solvers.base import Solver
+
+
+def divergence_norm(velocity_x, velocity_y, cell_lenght):
+    """Root mean square divergence of the staggered velocity over the cells, per member of a batch."""
+    divergence = (
+        (velocity_x[..., 1:-1, 1:] - velocity_x[..., 1:-1, :-1]) / cell_lenght
+        +
+        (velocity_y[..., 1:, 1:-1] - velocity_y[..., :-1, 1:-1]) / cell_lenght
+    )
+    return np.sqrt(np.mean(divergence**2, axis=(-2, -1)))          # root mean square over the cells
+
+
+class StaggeredPipeSolver(Solver):
+    """Transient pipe flow with a uniform inlet and a mass conserving outlet.
+
+    Velocities live on the cell faces of a staggered grid with ghost layers:
+    velocity_x is (n_points_y + 1, n_points_x), velocity_y (n_points_y,
+    n_points_x + 1) and pressure (n_points_y + 1, n_points_x + 1). Each step
+    predicts the velocity explicitly, solves the pressure correction Poisson
+    equation and projects. diffusion='crank_nicolson' or 'backward_euler'
+    treats the viscous term implicitly with ADI line solves (see diffusion.py),
+    which drops the diffusion number from the time step limits; convection
+    stays explicit, so dt remains bound by the CFL number and U**2 dt / (2 nu).
+    The flow starts uniform at the inlet velocity. Runs until end_time, max_steps or, with
+    stop_at_steady_state, the convergence tolerances are met. Every
+    diagnostics_every steps the time, the wall shear stress (mean along each
+    wall and at the outlet) and both velocity components at the `probes`
+    points (x, y) are appended to `diagnostics`, a diagnostics.TimeSeriesLog
+    (CSV at diagnostics_file). Phases: 'time_step', 'momentum_x',
+    'momentum_y' (the predictor), 'divergence', 'poisson', 'correction' and
+    'diagnostics'.
+    """
+
+    name = 'staggered_pipe'
+    DEFAULTS = {
+        'n_points_y': 15,                                           # number of points in y direction
+        'aspect_ratio': 10,                                         # aspect ratio of the pipe
+        'inlet_velocity': 1.0,                                      # uniform inflow and initial velocity
+        'viscosity': 0.01,                                          # kinematic viscosity
+        'time_step': 0.001,                                         # time step length when not adaptive
+        'adaptive_time_step': True,                                 # largest stable dt from CFL and diffusion numbers
+        'safety': 0.8,                                              # fraction of the stability limit used
+        'end_time': 5.0,                                            # simulated physical time
+        'max_steps': 5000,                                          # upper bound on time steps
+        'poisson_solver': 'multigrid',                              # see poisson.SOLVERS
+        'poisson_tol': 1e-6,                                        # relative residual tolerance of the pressure solve
+        'n_poisson': 50,                                            # jacobi sweeps per step
+        'convergence_every': 10,                                    # time steps between convergence checks
+        'tolerances': {                                             # steady state when all stay below for 3 checks
+            'change_linf': 1e-2,                                    # max velocity change per unit time
+            'divergence': 1e-5,                                     # RMS velocity divergence
+            'mass_ratio_error': 1e-4,                               # |inflow / outflow - 1|
+        },
+        'stop_at_steady_state': True,                               # end the run once converged
+        'log_every': 0,                                             # print time step and convergence reports
+        'workspace': True,                                          # allocation-free kernels, False: reference
+        'diffusion': 'explicit',                                    # 'explicit', 'crank_nicolson' or 'backward_euler'
+        'probes': [],                                               # (x, y) points sampled for the velocity
+        'diagnostics_every': 1,                                     # steps between diagnostics rows, 0: none
+        'diagnostics_file': None,                                   # CSV of the diagnostics, None: in memory
+    }
+
+    def _setup(self):
+        p = self.parameters
+        n_points_y = p['n_points_y']
+        self.cell_lenght = 1.0 / (n_points_y-1)                     # cell lenght
+        self.n_points_x = (n_points_y-1) * p['aspect_ratio'] + 1    # number of points in x direction
+        x_range = np.linspace(0.0, 1.0*p['aspect_ratio'], self.n_points_x)
+        y_range = np.linspace(0.0, 1.0, n_points_y)
+        self.coordinates_x, self.coordinates_y = np.meshgrid(x_range, y_range)
+        self._initial_conditions()
+
+        # PRE-ALLOCATING ARRAYS, SHAPED LIKE THE FIELDS
+        self.velocity_x_tent = np.zeros_like(self.velocity_x)       # pre-allocated tentative x velocity
+        self._velocity_x_next = np.zeros_like(self.velocity_x)      # pre-allocated next x velocity
+        self.velocity_y_tent = np.zeros_like(self.velocity_y)       # pre-allocated tentative y velocity
+        self._velocity_y_next = np.zeros_like(self.velocity_y)      # pre-allocated next y velocity
+
+        # PRESSURE POISSON SOLVER
+        if p['poisson_solver'] == 'jacobi':
+            poisson_options = {'max_iter': p['n_poisson']}          # fixed sweep count like the original loop
+        else:
+            poisson_options = {'tol': p['poisson_tol']}             # stop on the residual instead of a count
+        self.poisson_solver = poisson.make_solver(
+            p['poisson_solver'], self.pressure.shape[-2:], self.cell_lenght, **poisson_options
+        )
+        self.pressure_corr = np.zeros_like(self.pressure)           # pre-allocated pressure correction
+        self._pressure_next = np.zeros_like(self.pressure)          # pre-allocated next pressure
+
+        # WORKSPACE OF THE STENCILS: DIFFUSION, CONVECTION AND TWO SCRATCH BUFFERS PER DIRECTION
+        self._work_x = [np.empty_like(self.velocity_x[..., 1:-1, 1:-1]) for _ in range(4)]
+        self._work_y = [np.empty_like(self.velocity_y[..., 1:-1, 1:-1]) for _ in range(4)]
+        self._rhs = np.empty_like(self.pressure[..., 1:-1, 1:-1])  # poisson right hand side per cell
+        self._work_rhs = np.empty_like(self._rhs)
+        self._outlet_y = np.zeros_like(self.velocity_y[..., 1:-1, -1])  # previous outlet column of velocity_y
+        self.poisson_iterations = []                                # per-step poisson iteration counts
+
+        # SEMI-IMPLICIT DIFFUSION: LINE SOLVES ON THE INTERIOR FACES
+        if p['diffusion'] not in diffusion.SCHEMES:
+            raise ValueError(f"unknown diffusion scheme {p['diffusion']!r}, expected one of {tuple(diffusion.SCHEMES)}")
+        self.theta = diffusion.SCHEMES[p['diffusion']]              # implicit weight of the viscous term
+        self._implicit_x = self._implicit_y = None
+        if self.theta:
+            if not p['workspace']:
+                raise ValueError(f"diffusion {p['diffusion']!r} runs on the workspace kernels, set workspace=True")
+            self._implicit_x = diffusion.ADIDiffusion(              # ghost rows mirror the walls, outlet copies
+                self._work_x[0].shape[-2:], ('wall', 'wall'), ('fixed', 'zero_gradient')
+            )
+            self._implicit_y = diffusion.ADIDiffusion(              # wall rows hold zero, left ghost lagged
+                self._work_y[0].shape[-2:], ('fixed', 'fixed'), ('fixed', 'zero_gradient')
+            )
+        self._controls()
+
+    def _initial_conditions(self):
+        """Fields at t = 0; the ensemble adds its member axis here."""
+        n_points_y = self.parameters['n_points_y']
+        inlet = float(self.parameters['inlet_velocity'])
+        self.velocity_x = np.full((n_points_y+1, self.n_points_x), inlet)   # initial velocity in x direction
+        self.velocity_x[0, :] = -self.velocity_x[1, :]              # upper wall boundary condition
+        self.velocity_x[-1, :] = -self.velocity_x[-2, :]            # lower wall boundary condition
+        self.velocity_y = np.ones((n_points_y, self.n_points_x+1))  # initial velocity in y direction
+        self.pressure = np.zeros((n_points_y+1, self.n_points_x+1)) # initial uniform zero pressure
+
+    def _controls(self):
+        """Time step control, steady state detection and the diagnostics log."""
+        p = self.parameters
+        self.mass_ratio = 1.0                                       # inflow over outflow of the latest step
+        self.controller = timestep.TimeStepController(              # stability monitor, fixed dt if not adaptive
+            self.cell_lenght, p['viscosity'], safety=p['safety'],
+            diffusion_max=np.inf if self.theta else None,           # no diffusion number limit when implicit
+            fixed_dt=None if p['adaptive_time_step'] else p['time_step'], log_every=p['log_every']
+        )
+        self.monitor = convergence.ConvergenceMonitor(
+            p['tolerances'], p['convergence_every'], log_every=p['log_every']//p['convergence_every']
+        )
+
+        # PROBES ON THE STAGGERED FACES AND THE TIME SERIES
+        h = self.cell_lenght
+        self.probes_x = diagnostics.Probes(p['probes'], self.velocity_x.shape, origin=(0.0, -h/2), spacing=h)
+        self.probes_y = diagnostics.Probes(p['probes'], self.velocity_y.shape, origin=(-h/2, 0.0), spacing=h)
+        probe_columns = [f'{name}_{k}' for k in range(len(self.probes_x)) for name in ('velocity_x', 'velocity_y')]
+        self.diagnostics = diagnostics.TimeSeriesLog(
+            ['step', 'time', 'shear_bottom', 'shear_top', 'shear_bottom_outlet', 'shear_top_outlet'] + probe_columns,
+            p['diagnostics_file']
+        )
+
+    def _advance(self):
+        # TIME STEP FROM THE STABILITY LIMITS, ABORTS IF THE FIELDS DIVERGED
+        with self.timers('time_step'):
+            time_step = self.controller.next_dt(
+                self.iteration, self.time, self.parameters['end_time'],
+                velocity_x=self.velocity_x, velocity_y=self.velocity_y
+            )
+
+        p = self.parameters
+        if p['workspace']:
+            self.mass_ratio = self._advance_workspace(time_step, p['viscosity'], p['inlet_velocity'])
+        else:
+            self.mass_ratio = self._advance_reference(time_step)
+        self.time += time_step                                      # advance the physical time
+
+    def _advance_workspace(self, time_step, viscosity, inlet, members=Ellipsis):
+        """One step evaluated into the preallocated workspace, bit for bit equal to _advance_reference.
+
+        Every stencil is applied with out= ufuncs in the association order of
+        the reference expressions, current and next fields are swapped
+        instead of aliased. The reference reads the previous outlet column of
+        velocity_y from the aliased buffer (zeros from the fresh buffer in the
+        first step), here it is carried in _outlet_y. Only the Poisson backend
+        still allocates. Ensembles pass the slice of their running `members`
+        with time_step, viscosity and inlet broadcasting against it. Returns
+        the inflow over outflow ratio.
+        """
+        MU = viscosity
+        h = self.cell_lenght
+        u, v, p = self.velocity_x[members], self.velocity_y[members], self.pressure[members]
+        u_tent, v_tent = self.velocity_x_tent[members], self.velocity_y_tent[members]
+        u_next, v_next = self._velocity_x_next[members], self._velocity_y_next[members]
+        correction = self.pressure_corr[members]
+        outlet_y = self._outlet_y[members]
+
+        with self.timers('momentum_x'):
+            diffusion, convection, work, work2 = [work[members] for work in self._work_x]
+            u_interior = u[..., 1:-1, 1:-1]
+
+            # DIFFUSION: MU * (EAST + NORTH + WEST + SOUTH - 4 CENTRE) / h**2
+            np.add(u[..., 1:-1, 2: ], u[..., 2: , 1:-1], out=diffusion)
+            diffusion += u[..., 1:-1, :-2]
+            diffusion += u[...,  :-2, 1:-1]
+            np.multiply(u_interior, 4, out=work)
+            diffusion -= work
+            diffusion /= h**2
+            diffusion *= MU
+
+            # CONVECTION: d(uu)/dx + v du/dy WITH v AVERAGED ONTO THE X FACES
+            np.square(u[..., 1:-1, 2: ], out=convection)
+            np.square(u[..., 1:-1, :-2], out=work)
+            convection -= work
+            convection /= 2 * h
+            np.add(v[..., 1: ,1:-2], v[..., 1: ,2:-1], out=work)
+            work += v[...,  :-1, 1:-2]
+            work += v[...,  :-1, 2:-1]
+            work /= 4
+            np.subtract(u[..., 2: , 1:-1], u[...,  :-2, 1:-1], out=work2)
+            work *= work2
+            work /= 2 * h
+            convection += work
+
+            # TENTATIVE VELOCITY: u + dt * (-dp/dx + diffusion - convection)
+            np.subtract(p[..., 1:-1, 2:-1], p[..., 1:-1, 1:-2], out=work)
+            work /= h
+            np.subtract(diffusion, work, out=work)
+            work -= convection
+            work *= time_step
+            if self._implicit_x is not None:                        # (1 - theta dt MU L) increment = explicit one
+                self._implicit_x.solve(work, self.theta * time_step * MU / h**2)
+            np.add(u_interior, work, out=u_tent[..., 1:-1, 1:-1])
+            self._tentative_boundaries_x(u_tent, inlet)
+
+        with self.timers('momentum_y'):
+            diffusion, convection, work, work2 = [work[members] for work in self._work_y]
+            v_interior = v[..., 1:-1, 1:-1]
+
+            # DIFFUSION
+            np.add(v[..., 1:-1, 2: ], v[..., 2: , 1:-1], out=diffusion)
+            diffusion += v[..., 1:-1, :-2]
+            diffusion += v[...,  :-2, 1:-1]
+            np.multiply(v_interior, 4, out=work)
+            diffusion -= work
+            diffusion /= h**2
+            diffusion *= MU
+
+            # CONVECTION: u dv/dx WITH u AVERAGED ONTO THE Y FACES + d(vv)/dy
+            np.add(u[..., 2:-1, 1: ], u[..., 2:-1, :-1], out=convection)
+            convection += u[..., 1:-2, 1: ]
+            convection += u[..., 1:-2, :-1]
+            convection /= 4
+            np.subtract(v[..., 1:-1, 2: ], v[..., 1:-1, :-2], out=work)
+            convection *= work
+            convection /= 2 * h
+            np.square(v[..., 2: ,1:-1], out=work)
+            np.square(v[...,  :-2 ,1:-1], out=work2)
+            work -= work2
+            work /= 2 * h
+            convection += work
+
+            # TENTATIVE VELOCITY
+            np.subtract(p[..., 2:-1, 1:-1], p[..., 1:-2, 1:-1], out=work)
+            work /= h
+            np.subtract(diffusion, work, out=work)
+            work -= convection
+            work *= time_step
+            if self._implicit_y is not None:
+                self._implicit_y.solve(work, self.theta * time_step * MU / h**2)
+            np.add(v_interior, work, out=v_tent[..., 1:-1, 1:-1])
+            self._tentative_boundaries_y(v_tent)
+
+        with self.timers('divergence'):
+            rhs, work = self._rhs[members], self._work_rhs[members]
+            np.subtract(u_tent[..., 1:-1, 1:], u_tent[..., 1:-1, :-1], out=rhs)
+            rhs /= h
+            np.subtract(v_tent[..., 1: ,1:-1], v_tent[...,  :-1, 1:-1], out=work)
+            work /= h
+            rhs += work
+            rhs /= time_step                                        # unit density
+
+        with self.timers('poisson'):
+            self.poisson_solver.solve(rhs, out=correction)
+            self.poisson_iterations.append(self.poisson_solver.stats.iterations)
+
+        with self.timers('correction'):
+            np.add(p, correction, out=self._pressure_next[members])
+
+            work = self._work_x[0][members]
+            np.subtract(correction[..., 1:-1, 2:-1], correction[..., 1:-1, 1:-2], out=work)
+            work /= h
+            work *= time_step
+            np.subtract(u_tent[..., 1:-1, 1:-1], work, out=u_next[..., 1:-1, 1:-1])
+
+            work = self._work_y[0][members]
+            np.subtract(correction[..., 2:-1, 1:-1], correction[..., 1:-2, 1:-1], out=work)
+            work /= h
+            work *= time_step
+            np.subtract(v_tent[..., 1:-1, 1:-1], work, out=v_next[..., 1:-1, 1:-1])
+
+            mrr = self._velocity_boundaries(u_next, v_next, outlet_y, inlet)
+            np.copyto(outlet_y, v_next[..., 1:-1, -1])
+
+        # SWAPPING CURRENT AND NEXT BUFFERS
+        self.velocity_x, self._velocity_x_next = self._velocity_x_next, self.velocity_x
+        self.velocity_y, self._velocity_y_next = self._velocity_y_next, self.velocity_y
+        self.pressure, self._pressure_next = self._pressure_next, self.pressure
+        return mrr
+
+    def _advance_reference(self, time_step):
+        """The original expression form of the step, allocating its temporaries; returns the mass ratio."""
+        MU = self.parameters['viscosity']
+        inlet = self.parameters['inlet_velocity']
+        cell_lenght = self.cell_lenght
+        velocity_x_prev, velocity_y_prev, pressure_prev = self.velocity_x, self.velocity_y, self.pressure
+        velocity_x_tent, velocity_y_tent = self.velocity_x_tent, self.velocity_y_tent
+        velocity_x_next, velocity_y_next = self._velocity_x_next, self._velocity_y_next
+        pressure_corr_next = self.pressure_corr
+
+        with self.timers('momentum_x'):
+            # UPDATING INTERIOR X VELOCITY WITH MOMENTUM EQUATION
+            diffusion_x = MU * (                                    # definition of diffusion equation
+                (
+                    velocity_x_prev[1:-1, 2: ]                      # forward stencil point x direction
+                    +
+                    velocity_x_prev[2: , 1:-1]                      # backward stencil point x direction
+                    +
+                    velocity_x_prev[1:-1, :-2]                      # forward stencil point y direction
+                    +
+                    velocity_x_prev[ :-2, 1:-1]                     # backward stencil point y direction
+                    - 4 *
+                    velocity_x_prev[1:-1, 1:-1]                     # interior velocity field
+                ) / (
+                    cell_lenght**2                                  # cell lenght squared
+                )
+            )
+
+            convection_x = (                                        # definition of convection equation
+                (
+                    velocity_x_prev[1:-1, 2: ]**2                   # forward stencil point x direction
+                    -
+                    velocity_x_prev[1:-1, :-2]**2                   # backward stencil point x direction
+                ) / (
+                    2 * cell_lenght
+                )
+                +
+                (
+                    velocity_y_prev[1: ,1:-2]                       # top left stencil point y velocity
+                    +
+                    velocity_y_prev[1: ,2:-1]                       # top right stencil point y velocity
+                    +
+                    velocity_y_prev[ :-1, 1:-2]                     # bottom left stencil point y velocity
+                    +
+                    velocity_y_prev[ :-1, 2:-1]                     # bottom right stencil point y velocity
+                ) / 4
+                *
+                (
+                    velocity_x_prev[2: , 1:-1]                      # forward stencil point y direction
+                    -
+                    velocity_x_prev[ :-2, 1:-1]                     # backward stencil point y direction
+                ) / (
+                    2 * cell_lenght                                 # cell lenght squared
+                )
+            )
+
+            pressure_gradient_x = (                                 # definition of pressure gradient
+                (
+                    pressure_prev[1:-1, 2:-1]                       # forward stencil interior pressure in x
+                    -
+                    pressure_prev[1:-1, 1:-2]                       # backward stencil interior pressure in x
+                ) / (
+                    cell_lenght                                     # cell lenght
+                )
+            )
+
+            velocity_x_tent[1:-1, 1:-1] = (                         # interior tentative velocity in x direction
+                velocity_x_prev[1:-1, 1:-1]                         # previous tentative velocity in x direction
+                +
+                time_step                                           # per time step
+                *
+                (
+                    -pressure_gradient_x                            # negative pressure gradient
+                    +
+                    diffusion_x                                     # effect of diffusion
+                    -
+                    convection_x                                    # effect of convection
+                )
+            )
+
+            self._tentative_boundaries_x(velocity_x_tent, inlet)
+
+        with self.timers('momentum_y'):
+            # UPDATING INTERIOR Y VELOCITY WITH MOMENTUM EQUATION
+            diffusion_y = MU * (                                    # definition of diffusion equation
+                (
+                    velocity_y_prev[1:-1, 2: ]                      # forward stencil point x direction
+                    +
+                    velocity_y_prev[2: , 1:-1]                      # backward stencil point x direction
+                    +
+                    velocity_y_prev[1:-1, :-2]                      # forward stencil point y direction
+                    +
+                    velocity_y_prev[ :-2, 1:-1]                     # backward stencil point y direction
+                    - 4 *
+                    velocity_y_prev[1:-1, 1:-1]                     # interior velocity field
+                ) / (
+                    cell_lenght**2                                  # cell lenght squared
+                )
+            )
+
+            convection_y = (                                        # definition of convection equation
+                (
+                    velocity_x_prev[2:-1, 1: ]                      # prefactor forward based on x velocity
+                    +
+                    velocity_x_prev[2:-1, :-1]                      # prefactor backward based on x velocity
+                    +
+                    velocity_x_prev[1:-2, 1: ]                      # prefactor forward based on x velocity
+                    +
+                    velocity_x_prev[1:-2, :-1]                      # prefactor backward based on x velocity
+                ) / 4
+                *
+                (
+                    velocity_y_prev[1:-1, 2: ]                      # forward stencil point x direction
+                    -
+                    velocity_y_prev[1:-1, :-2]                      # backward stencil point x direction
+                ) / (
+                    2 * cell_lenght                                 # cell lenght
+                )
+                +
+                (
+                    velocity_y_prev[2: ,1:-1]**2                    # top left stencil point y velocity
+                    -
+                    velocity_y_prev[ :-2 ,1:-1]**2                  # top right stencil point y velocity
+                ) / (
+                    2* cell_lenght                                  # cell lenght
+                )
+            )
+
+            pressure_gradient_y = (                                 # definition of pressure gradient
+                (
+                    pressure_prev[2:-1, 1:-1]                       # forward stencil interior pressure in x
+                    -
+                    pressure_prev[1:-2, 1:-1]                       # backward stencil interior pressure in x
+                ) / (
+                    cell_lenght                                     # cell lenght
+                )
+            )
+
+            velocity_y_tent[1:-1, 1:-1] = (                         # interior tentative velocity in x direction
+                velocity_y_prev[1:-1, 1:-1]                         # previous tentative velocity in x direction
+                +
+                time_step                                           # per time step
+                *
+                (
+                    -pressure_gradient_y                            # negative pressure gradient
+                    +
+                    diffusion_y                                     # effect of diffusion
+                    -
+                    convection_y                                    # effect of convection
+                )
+            )
+
+            self._tentative_boundaries_y(velocity_y_tent)
+
+        with self.timers('divergence'):
+            # COMPUTING DIVERGENCE FOR PRESSURE POISSON PROBLEM
+            divergence = (                                          # definition of divergence
+                (
+                    velocity_x_tent[1:-1, 1:]                       # tentative velocity interior forward in x direction
+                    -
+                    velocity_x_tent[1:-1, :-1]                      # tentative velocity interior backward in x direction
+                ) / (
+                    cell_lenght                                     # cell lenght
+                )
+                +
+                (
+                    velocity_y_tent[1: ,1:-1]                       # tentative velocity interior forward in y direction
+                    -
+                    velocity_y_tent[ :-1, 1:-1]                     # tentative velocity interior backward in x direction
+                ) / (
+                    cell_lenght                                     # cell lenght
+                )
+            )
+
+            density = 1                                             # fluid density
+            pressure_poisson_rhs = divergence * density  / time_step    # pressure poisson equation right hand side
+
+        with self.timers('poisson'):
+            # SOLVING PRESSURE CORRECTION POISSON EQUATION
+            self.poisson_solver.solve(pressure_poisson_rhs, out=pressure_corr_next)
+            self.poisson_iterations.append(self.poisson_solver.stats.iterations)
+
+        with self.timers('correction'):
+            pressure_next = pressure_prev + pressure_corr_next      # updatingthe pressure
+
+            # UPDATE VELOCITY
+            pressure_corr_grad_x = (                                # pressure correction gradient in x
+                (
+                    pressure_corr_next[1:-1, 2:-1]                  # interior pressure forward in x direction
+                    -
+                    pressure_corr_next[1:-1, 1:-2]                  # interior pressure backward in x direction
+                ) / (
+                    cell_lenght                                     # cell lenght
+                )
+            )
+
+            velocity_x_next[1:-1, 1:-1] = (                         # velocity update in x direction
+                velocity_x_tent[1:-1, 1:-1]                         # tentative velocity in x
+                -
+                time_step                                           # time step lenght
+                *
+                pressure_corr_grad_x                                # pressure correction gradient in x direction
+            )
+
+            pressure_corr_grad_y = (                                # pressure correction gradient in y
+                (
+                    pressure_corr_next[2:-1, 1:-1]                  # interior pressure forward in y direction
+                    -
+                    pressure_corr_next[1:-2, 1:-1]                  # interior pressure backward in y direction
+                ) / (
+                    cell_lenght                                     # cell lenght
+                )
+            )
+
+            velocity_y_next[1:-1, 1:-1] = (                         # velocity update in y direction
+                velocity_y_tent[1:-1, 1:-1]                         # tentative velocity in y
+                -
+                time_step                                           # time step lenght
+                *
+                pressure_corr_grad_y                                # pressure correction gradient in y direction
+            )
+
+            mrr = self._velocity_boundaries(velocity_x_next, velocity_y_next, velocity_y_next[1:-1, -1], inlet)
+
+        # REPEATING THE ITERATIONS, NEXT AND CURRENT SHARE THEIR BUFFERS FROM NOW ON
+        self.velocity_x = velocity_x_next                           # advance in time for x velocity
+        self.velocity_y = velocity_y_next                           # advance in time for y velocity
+        self.pressure = pressure_next                               # advance in time for pressure
+        return mrr
+
+    # BOUNDARY CONDITIONS, IN PLACE, ON ANY LEADING MEMBER AXES
+    @staticmethod
+    def _tentative_boundaries_x(velocity_x_tent, inlet=1.0):
+        velocity_x_tent[..., 1:-1, 0] = inlet                       # left edge boundary condition
+        velocity_x_tent[..., 1:-1, -1] = velocity_x_tent[..., 1:-1, -2]     # right edge boundary condition
+        np.negative(velocity_x_tent[..., 1, :], out=velocity_x_tent[..., 0, :])     # bottom edge boundary condition
+        np.negative(velocity_x_tent[..., -2, :], out=velocity_x_tent[..., -1, :])   # top edge boundary condition
+
+    @staticmethod
+    def _tentative_boundaries_y(velocity_y_tent):
+        np.negative(velocity_y_tent[..., 1:-1, -1], out=velocity_y_tent[..., 1:-1, 0])  # left edge boundary condition
+        velocity_y_tent[..., 1:-1, -1] = velocity_y_tent[..., 1:-1, -2]     # right edge boundary condition
+        velocity_y_tent[..., 0, :] = 0.0                            # bottom edge boundary condition
+        velocity_y_tent[..., -1, :] = 0.0                           # top edge boundary condition
+
+    @staticmethod
+    def _velocity_boundaries(velocity_x_next, velocity_y_next, outlet_y, inlet=1.0):
+        """Boundary conditions of the corrected velocity, returns the inflow over outflow ratio.
+
+        The left ghost column of velocity_y mirrors `outlet_y`, the outlet
+        column of the previous step. With leading member axes `inlet` is a
+        column of inlet velocities and the ratio an array.
+        """
+        velocity_x_next[..., 1:-1, 0] = inlet                       # left edge velocity boundary condition
+        inflow_mass_rate_next = np.sum(velocity_x_next[..., 1:-1, 0], axis=-1)      # inlet total velocity
+        outflow_mass_rate_next = np.sum(velocity_x_next[..., 1:-1, -2], axis=-1)    # outlet total velocity
+        mrr = inflow_mass_rate_next / outflow_mass_rate_next        # mass rate ratio
+        np.multiply(                                                # right edge boundary condition
+            velocity_x_next[..., 1:-1, -2], np.expand_dims(mrr, -1), out=velocity_x_next[..., 1:-1, -1]
+        )
+        np.negative(velocity_x_next[..., 1, :], out=velocity_x_next[..., 0, :])     # bottom edge boundary condition
+        np.negative(velocity_x_next[..., -2, :], out=velocity_x_next[..., -1, :])   # top edge boundary condition
+
+        np.negative(outlet_y, out=velocity_y_next[..., 1:-1, 0])    # left edge velocity boundary condition
+        velocity_y_next[..., 1:-1, -1] = velocity_y_next[..., 1:-1, -2]     # right edge velocity boundary condition
+        velocity_y_next[..., 0, :] = 0.0                            # bottom edge velocity boundary condition
+        velocity_y_next[..., -1, :] = 0.0                           # top edge velocity boundary condition
+        return mrr
+
+    def _check(self):
+        p = self.parameters
+        if p['diagnostics_every'] and self.iteration % p['diagnostics_every'] == 0:
+            self._record()
+        if self.monitor.due(self.iteration):
+            self.monitor.update(
+                self.iteration, self.time,
+                fields={'velocity_x': self.velocity_x, 'velocity_y': self.velocity_y},
+                divergence=self.divergence(),
+                mass_ratio_error=abs(self.mass_ratio - 1),
+            )
+        return (
+            (self.monitor.converged and p['stop_at_steady_state'])
+            or self.iteration >= p['max_steps']
+            or p['end_time'] - self.time <= 1e-9 * p['end_time']
+        )
+
+    def _record(self):
+        """Append the wall shear stress and probe velocities to the diagnostics log."""
+        bottom, top = self.wall_shear()
+        row = [self.iteration, self.time, np.mean(bottom), np.mean(top), bottom[-1], top[-1]]
+        if len(self.probes_x):
+            velocity_x = self.probes_x.sample(self.velocity_x)
+            velocity_y = self.probes_y.sample(self.velocity_y)
+            row.extend(np.column_stack([velocity_x, velocity_y]).ravel())
+        self.diagnostics.append(row)
+
+    def divergence(self):
+        """RMS divergence of the current velocity."""
+        return divergence_norm(self.velocity_x, self.velocity_y, self.cell_lenght)
+
+    def wall_shear(self):
+        """Kinematic wall shear stress viscosity * du/dn along the y = 0 and y = 1 walls, one value per x face.
+
+        The walls lie midway between the ghost rows of velocity_x and the
+        first interior rows, so du/dn is a one-sided difference over one cell.
+        """
+        h, viscosity, velocity_x = self.cell_lenght, self.parameters['viscosity'], self.velocity_x
+        bottom = viscosity * (velocity_x[1, :] - velocity_x[0, :]) / h
+        top = viscosity * (velocity_x[-2, :] - velocity_x[-1, :]) / h
+        return bottom, top
+
+    def vertex_velocities(self):
+        """Velocity components averaged onto the mesh vertices, as plotted."""
+        velocity_x_vertex_centered = (self.velocity_x[..., 1: , :] + self.velocity_x[...,  :-1, :]) / 2
+        velocity_y_vertex_centered = (self.velocity_y[..., 1:] + self.velocity_y[..., :-1]) / 2
+        return velocity_x_vertex_centered, velocity_y_vertex_centered
+
+    def state(self):
+        return dict(
+            self.poisson_solver.state(), iteration=self.iteration, time=self.time, dt=self.controller.dt,
+            velocity_x=self.velocity_x, velocity_y=self.velocity_y, pressure=self.pressure,
+            velocity_y_tent=self.velocity_y_tent,                   # its outlet column feeds the next inlet
+        )
+
+    def load_state(self, state):
+        super().load_state(state)
+        self.controller.dt = state.get('dt')
+        self.velocity_x = np.array(state['velocity_x'], dtype=float)
+        self.velocity_y = np.array(state['velocity_y'], dtype=float)
+        self.pressure = np.array(state['pressure'], dtype=float)
+        self.velocity_y_tent[...] = state['velocity_y_tent']
+        if self.iteration and not self.parameters['workspace']:    # the reference step aliases current and next,
+            self._velocity_x_next[...] = self.velocity_x            # its outlet column is read from there
+            self._velocity_y_next[...] = self.velocity_y
+            self.velocity_x, self.velocity_y = self._velocity_x_next, self._velocity_y_next
+        self._outlet_y[...] = self.velocity_y[1:-1, -1] if self.iteration else 0.0
+        self.poisson_solver.load_state(state)                       # warm start of iterative solvers
+
+    def close(self):
+        if self._ready and self.diagnostics is not None:
+            self.diagnostics.close()                                # write the buffered rows
+
+
+class PeriodicPipeSolver(Solver):
+    """Pressure driven flow between two walls, periodic in x, on an n_points square grid.
+
+    Starts from a uniform unit velocity and develops towards the Poiseuille
+    profile; the relative error against it is tracked as 'poiseuille_error'
+    by the convergence monitor. Phases: 'convection', 'time_step', 'update'
+    and 'diagnostics'.
+    """
+
+    name = 'periodic_pipe'
+    DEFAULTS = {
+        'n_points': 11,                                             # number of points
+        'viscosity': 0.01,                                          # kinemiatic viscosity
+        'time_step': 0.2,                                           # time step size when not adaptive
+        'adaptive_time_step': True,                                 # largest stable dt from the diffusion and CFL numbers
+        'safety': 0.9,                                              # fraction of the stability limit used
+        'end_time': 20.0,                                           # simulated physical time
+        'max_steps': 100000,                                        # upper bound on time steps
+        'pressure_gradient': (-1.0, 0.0),                           # pressure gradient
+        'tolerances': {'change_linf': 1e-3},                        # max velocity change per unit time at steady state
+        'stop_at_steady_state': True,                               # end the run once converged
+    }
+
+    def _setup(self):
+        p = self.parameters
+        N = p['n_points']
+        self.element_length = 1.0/(N-1)                             # cell length
+        x_range = np.linspace(0.0, 1.0, N)                          # x distances
+        y_range = np.linspace(0.0, 1.0, N)                          # y distances
+        self.cx, self.cy = np.meshgrid(x_range, y_range)            # 2D mesh coordinates
+        self.pressure_gradient = np.asarray(p['pressure_gradient'], dtype=float)
+
+        # INITIAL CONDITIONS
+        self.Vx = np.ones((N, N))                                   # initial velocity as 1 in domain
+        self.Vx[0, :] = 0.0                                         # boundary condition at upper wall
+        self.Vx[-1, :] = 0.0                                        # boundary condition at lower wall
+
+        self.controller = timestep.TimeStepController(              # stability monitor, fixed dt if not adaptive
+            self.element_length, p['viscosity'], safety=p['safety'],
+            fixed_dt=None if p['adaptive_time_step'] else p['time_step']
+        )
+        self.monitor = convergence.ConvergenceMonitor(p['tolerances'])
+        self.Vx_exact = convergence.poiseuille_profile(self.cy, 1.0, p['viscosity'], self.pressure_gradient[0])
+
+    # DISCRETIZED SPATIAL DERIVATIVES, ON ANY LEADING MEMBER AXES
+    def central_difference(self, field):                            # periodic central difference approximation
+        diff = (
+            (
+            np.roll(field, shift=1, axis=-1)                        # step forward in x direction
+            -                                                       # subtraction
+            np.roll(field, shift=-1, axis=-1)                       # step backward in x direction
+            ) / (                                                   # division
+                2 * self.element_length                             # central difference approximation
+            )
+        )
+        return diff
+
+    def laplace(self, field):                                       # periodic laplace operator
+        diff = (
+            (
+            np.roll(field, shift=1, axis=-1)                        # step forward in x direction
+            +                                                       # addition
+            np.roll(field, shift=1, axis=-2)                        # step forward in y direction
+            +                                                       # addition
+            np.roll(field, shift=-1, axis=-1)                       # step backward in x direction
+            +                                                       # addition
+            np.roll(field, shift=-1, axis=-2)                       # step backward in y direction
+            -                                                       # subtraction
+            4 * field                                               # field itself
+            ) / (                                                   # division
+                self.element_length**2                              # five point stencil
+            )
+        )
+        return diff
+
+    def _advance(self):
+        p = self.parameters
+        Vx_prev = self.Vx
+
+        with self.timers('convection'):
+            convection_x = (                                        # calculating convection term
+                Vx_prev                                             # previous velocity
+                *                                                   # multiplication
+                self.central_difference(Vx_prev)                    # difference term
+                )
+
+        # CONVECTIVE LIMITS ONLY APPLY WHILE THE CONVECTIVE TERM IS ACTIVE,
+        # IT VANISHES IDENTICALLY FOR THE X-INVARIANT PIPE PROFILE
+        with self.timers('time_step'):
+            dt = self.controller.next_dt(
+                self.iteration, self.time, p['end_time'], advect=bool(np.any(convection_x)), Vx=Vx_prev
+            )
+
+        with self.timers('update'):
+            Vx_next = self._update(Vx_prev, convection_x, dt, p['viscosity'], self.pressure_gradient[0])
+
+        self.Vx = Vx_next                                           # advancing in time
+        self.time += dt                                             # physical time
+
+    def _update(self, Vx_prev, convection_x, dt, viscosity, pressure_gradient_x):
+        """Forward Euler step with the walls applied; the coefficients broadcast against Vx_prev."""
+        diffusion_x = (                                             # calculating diffusion term
+            viscosity                                               # kinematic viscosity
+            *                                                       # multiplication
+            self.laplace(Vx_prev)                                   # laplace term
+            )
+
+        Vx_next = (                                                 # calculating updated velocity
+            Vx_prev                                                 # previous velocity
+            +                                                       # addition
+            dt                                                      # time step
+            *                                                       # multiplication
+            (
+                -                                                   # negative
+                pressure_gradient_x                                 # pressure gradient
+                +                                                   # addition
+                diffusion_x                                         # diffusion
+                -                                                   # subtraction
+                convection_x                                        # convection
+            )
+        )
+
+        Vx_next[..., 0, :] = 0.0                                    # boundary condition at upper wall
+        Vx_next[..., -1, :] = 0.0                                   # boundary condition at lower wall
+        return Vx_next
+
+    def _check(self):
+        p = self.parameters
+        self.monitor.update(
+            self.iteration, self.time, fields={'Vx': self.Vx},
+            poiseuille_error=np.max(np.abs(self.Vx - self.Vx_exact)) / np.max(self.Vx_exact)
+        )
+        return (
+            (self.monitor.converged and p['stop_at_steady_state'])
+            or self.iteration >= p['max_steps']
+            or p['end_time'] - self.time <= 1e-9 * p['end_time']
+        )
+
+    def state(self):
+        return dict(super().state(), dt=self.controller.dt, Vx=self.Vx)
+
+    def load_state(self, state):
+        super().load_state(state)
+        self.controller.dt = state.get('dt')
+        self.Vx = np.array(state['Vx'], dtype=float)
@@ -0,0 +1,141 @@
+# Instrumentation of solver runs
+# Captures the phase timers of a window of steps together with the memory the
+# phases allocate (tracemalloc) and, optionally, a cProfile of the same steps,
+# and reports them as a table or as JSON for comparison against a baseline.
+
+# LIBRARIES
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+
+
+class Profile:
+    """Instrumentation window over the steps of a solver.
+
+        with Profile(solver, cprofile=True) as profile:
+            solver.step(100)
+        print(profile.table())
+        profile.save('report.json')
+
+    Only the steps inside the window are reported; the solver timers keep
+    their totals. memory=True traces allocations with tracemalloc for the
+    window, which slows the steps down severalfold, so timings of a memory
+    window are not representative. start() and stop() open and close the
+    window explicitly.
+    """
+
+    def __init__(self, solver, cprofile=False, memory=True, top=25):
+        self.solver = solver
+        self.cprofile = cprofile
+        self.memory = memory
+        self.top = top                                                      # functions listed from the profile
+        self.profiler = None
+        self.phases = {}
+        self.steps = 0
+        self.seconds = 0.0
+        self.peak_bytes = None
+        self.active = False                                                 # between start() and stop()
+
+    def start(self):
+        timers = self.solver.timers
+        self._before = timers.as_dict()
+        self._iteration = self.solver.iteration
+        self._started_tracing = self.memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        if self.memory:
+            self._memory = timers.memory
+            timers.memory = True
+            self._level = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if self.cprofile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.active = True
+        self._t0 = time.perf_counter()
+        return self
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._t0
+        self.active = False
+        if self.cprofile:
+            self.profiler.disable()
+        timers = self.solver.timers
+        if self.memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1] - self._level
+            timers.memory = self._memory
+        if self._started_tracing:
+            tracemalloc.stop()
+        self.steps = self.solver.iteration - self._iteration
+
+        # PHASE RECORDS OF THE WINDOW, MEMORY RECORDS ONLY EXIST FOR IT
+        self.phases = {}
+        for name, record in timers.as_dict().items():
+            before = self._before.get(name, {'seconds': 0.0, 'calls': 0})
+            calls = record['calls'] - before['calls']
+            if calls:
+                self.phases[name] = dict(record, seconds=record['seconds'] - before['seconds'], calls=calls)
+        if self.memory:                                                     # later reports are time only
+            for attribute in ('peak_bytes', 'allocated_bytes', 'retained_bytes'):
+                getattr(timers, attribute).clear()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def functions(self):
+        """The `top` functions of the cProfile by cumulative time, as dicts."""
+        if self.profiler is None:
+            return []
+        stats = pstats.Stats(self.profiler)
+        rows = []
+        for (file, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({'function': f'{file}:{line}({function})', 'calls': calls,
+                         'tottime': tottime, 'cumtime': cumtime})
+        return sorted(rows, key=lambda row: -row['cumtime'])[:self.top]
+
+    def as_dict(self):
+        """JSON-serializable report of the window."""
+        steps = max(self.steps, 1)
+        report = {
+            'solver': self.solver.name,
+            'steps': self.steps,
+            'seconds': self.seconds,
+            'ms_per_step': 1e3 * self.seconds / steps,
+            'phases': self.phases,
+        }
+        if self.memory:
+            report['peak_bytes'] = self.peak_bytes                          # above the level at start()
+            report['allocated_bytes_per_step'] = sum(
+                record.get('allocated_bytes', 0) for record in self.phases.values()
+            ) / steps
+        if self.profiler is not None:
+            report['functions'] = self.functions()
+        return report
+
+    def table(self):
+        """Phase table of the window followed by the top cProfile entries."""
+        lines = [f'{self.steps} steps of {self.solver.name} in {self.seconds:.3f} s '
+                 f'({1e3 * self.seconds / max(self.steps, 1):.3f} ms/step)']
+        if self.memory:
+            lines[0] += f', peak {self.peak_bytes / 1e3:.1f} kB above start'
+        lines.append(self.solver.timers.report(self.phases))
+        if self.profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(self.top)
+            lines.append(out.getvalue().strip())
+        return '\n'.join(lines)
+
+    def save(self, path):
+        """Write as_dict() as JSON; a .prof path instead dumps the raw cProfile statistics."""
+        if path.endswith('.prof'):
+            self.profiler.dump_stats(path)
+            return
+        with open(path, 'w') as file:
+            json.dump(self.as_dict(), file, indent=1)
@@ -0,0 +1,156 @@
+# Adaptive time step control for the explicit finite-difference solvers
+# Picks the largest dt that keeps the convective CFL number and the viscous
+# diffusion number of the forward Euler / central difference schemes within
+# their stability limits, and stops a run as soon as its fields blow up.
+
+# LIBRARIES
+import numpy as np
+
+
+class DivergenceError(RuntimeError):
+    """Raised when a solver field becomes non-finite or exceeds its sanity bound."""
+
+
+class TimeStepController:
+    """Chooses dt each step from the current velocity field.
+
+    With h the cell length, nu the viscosity, U = max|u| + max|v| and d the
+    number of dimensions, the explicit scheme is stable for
+
+        CFL = U dt / h      <= cfl_max
+        D   = nu dt / h**2  <= diffusion_max (1 / (2 d) by default)
+        U**2 dt / (2 nu)    <= 1    (central convection with forward Euler)
+
+    and dt is the largest value meeting all three times `safety`, grown by at
+    most `growth` per step and capped at dt_max. With fixed_dt the step size
+    is not adapted, but the numbers are still monitored. Every step is
+    recorded in `history`; log_every > 0 also prints every log_every-th step.
+    """
+
+    def __init__(self, cell_length, viscosity, dimensions=2, safety=0.8, cfl_max=1.0, diffusion_max=None,
+                 dt_max=np.inf, growth=1.5, velocity_limit=1e3, fixed_dt=None, log_every=0):
+        self.h = cell_length
+        self.nu = viscosity
+        self.safety = safety
+        self.cfl_max = cfl_max
+        self.diffusion_max = 1 / (2 * dimensions) if diffusion_max is None else diffusion_max
+        self.dt_max = dt_max
+        self.growth = growth
+        self.velocity_limit = velocity_limit                                # larger speeds count as divergence
+        self.fixed_dt = fixed_dt
+        self.log_every = log_every
+        self.dt = None                                                      # latest step size
+        self.cfl = 0.0                                                      # CFL number of the latest step
+        self.diffusion = 0.0                                                # diffusion number of the latest step
+        self.history = []                                                   # (step, time, dt, cfl, diffusion)
+
+    def stable_dt(self, speed):
+        """Largest dt within the stability limits for the convective speed max|u| + max|v|."""
+        limits = [self.diffusion_max * self.h**2 / self.nu, self.dt_max]
+        if speed > 0:
+            limits.append(self.cfl_max * self.h / speed)
+            limits.append(2 * self.nu / speed**2)
+        return self.safety * min(limits)
+
+    def next_dt(self, step, time, end_time=np.inf, advect=True, **velocities):
+        """Step size for the step starting at `time` from the named velocity components.
+
+        The last step is shortened to land on end_time. advect=False leaves
+        the convective limits out, for steps whose discrete convective term
+        vanishes. Raises DivergenceError if a velocity is not finite or faster
+        than velocity_limit.
+        """
+        self.check(step, time, **velocities)
+        speed = sum(float(np.max(np.abs(v))) for v in velocities.values()) if advect else 0.0
+        if self.fixed_dt is not None:
+            dt = self.fixed_dt
+        else:
+            dt = self.stable_dt(speed)
+            if self.dt is not None:
+                dt = min(dt, self.growth * self.dt)                         # no sudden jumps
+            dt = min(dt, end_time - time)
+
+        self.dt = dt
+        self.cfl = speed * dt / self.h
+        self.diffusion = self.nu * dt / self.h**2
+        self.history.append((step, time, dt, self.cfl, self.diffusion))
+        if self.log_every and step % self.log_every == 0:
+            print(self.report(step, time))
+        return dt
+
+    def report(self, step, time):
+        return f'step {step}: t = {time:.4g}, dt = {self.dt:.3e}, CFL = {self.cfl:.3f}, D = {self.diffusion:.3f}'
+
+    def check(self, step, time, **fields):
+        """Raise DivergenceError with a diagnostic if any field is non-finite or too large."""
+        for name, field in fields.items():
+            field = np.asarray(field)
+            peak = np.max(np.abs(field)) if field.size else 0.0             # NaN propagates through max
+            if peak <= self.velocity_limit:
+                continue
+            if not np.isfinite(peak):
+                index = np.unravel_index(np.argmin(np.isfinite(field)), field.shape)
+                reason = f'{name} is {field[index]} at index {tuple(int(i) for i in index)}'
+            else:
+                index = np.unravel_index(np.argmax(np.abs(field)), field.shape)
+                reason = f'|{name}| = {abs(field[index]):.3e} exceeds {self.velocity_limit:g} at index ' \
+                         f'{tuple(int(i) for i in index)}'
+            previous = f'last dt = {self.dt:.3e}, CFL = {self.cfl:.3f}, D = {self.diffusion:.3f}' \
+                if self.dt is not None else 'before the first step'
+            raise DivergenceError(f'solution diverged at step {step}, t = {time:.4g}: {reason} ({previous})')
+
+
+class EnsembleTimeStepController(TimeStepController):
+    """TimeStepController for a batch of independent members, one dt each.
+
+    `viscosity` holds one value per member. The velocities passed to
+    next_dt() carry the members on their leading axis and may cover only the
+    first n of them, the members still running; `time`, `advect` and the
+    returned step sizes are arrays over those n. `member_dt` keeps the latest
+    step of every member, `dt`, `cfl` and `diffusion` the smallest step and
+    the largest numbers of the latest call, which is what `history` records.
+    """
+
+    def __init__(self, cell_length, viscosity, **options):
+        super().__init__(cell_length, np.asarray(viscosity, dtype=float), **options)
+        self.member_dt = np.full(self.nu.shape, np.nan)                     # NaN before the first step
+
+    def stable_dt(self, speed, nu=None):
+        """Largest stable dt per member for the speeds max|u| + max|v| and viscosities nu."""
+        nu = self.nu if nu is None else nu
+        dt = np.minimum(self.diffusion_max * self.h**2 / nu, self.dt_max)
+        moving = speed > 0
+        speed = np.where(moving, speed, 1.0)
+        squared = np.float_power(speed, 2)                                  # libm pow, as float**2 in the scalar class
+        convective = np.minimum(self.cfl_max * self.h / speed, 2 * nu / squared)
+        return self.safety * np.where(moving, np.minimum(dt, convective), dt)
+
+    def next_dt(self, step, time, end_time=np.inf, advect=True, **velocities):
+        """Step sizes of the members running at the times `time`, see TimeStepController.next_dt."""
+        time = np.asarray(time, dtype=float)
+        n = len(time)
+        nu = self.nu[:n]
+        self.check(step, float(np.min(time)), **velocities)
+        speed = sum(np.max(np.abs(v), axis=tuple(range(1, v.ndim))) for v in velocities.values())
+        speed = np.where(advect, speed, 0.0)
+        if self.fixed_dt is not None:
+            dt = np.full(n, float(self.fixed_dt))
+        else:
+            dt = self.stable_dt(speed, nu)
+            dt = np.fmin(dt, self.growth * self.member_dt[:n])             # no sudden jumps, NaN at the start
+            dt = np.minimum(dt, end_time - time)
+
+        self.member_dt[:n] = dt
+        self.dt = float(np.min(dt))
+        self.cfl = float(np.max(speed * dt / self.h))
+        self.diffusion = float(np.max(nu * dt / self.h**2))
+        self.history.append((step, float(np.min(time)), self.dt, self.cfl, self.diffusion))
+        if self.log_every and step % self.log_every == 0:
+            print(self.report(step, float(np.min(time))))
+        return dt
+
+    def permute(self, order):
+        """Reorder the first len(order) members, as the ensemble solvers do when members finish."""
+        n = len(order)
+        self.nu[:n] = self.nu[order]
+        self.member_dt[:n] = self.member_dt[order]